@@ -1,26 +1,168 @@
-from django.contrib import admin
+from datetime import timedelta
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth.admin import UserAdmin
-from .models import User, CrewProfile, Department, Position, Document, Attendance, Shift, LeaveRequest, Task, Payroll, Performance, Announcement
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect, render
+from django.urls import path, reverse
+from django.utils.html import format_html
+from . import search
+from .announcements import send_announcement as deliver_announcement
+from .coverage import set_leave_status
+from .document_jobs import queue_documents
+from .exports import csv_response
+from .forms import RosterUploadForm, ShiftForm
+from .pagination import EstimatedCountPaginator
+from .roster_import import COLUMNS, import_roster, read_rows
+from .transitions import transition
+from .models import User, CrewProfile, Department, DepartmentMetrics, Position, Document, Attendance, AttendanceSummary, Shift, LeaveRequest, Task, Payroll, Performance, Announcement, StatusChange
+
+def export_action(kind):
+    def export_selected(modeladmin, request, queryset):
+        return csv_response(request, kind, queryset, f'{kind}-selected.csv')
+    export_selected.short_description = 'Export selected rows as CSV'
+    export_selected.__name__ = f'export_{kind}_csv'
+    return export_selected
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Sidebar filter on a foreign key that picks the value with the admin
+    autocomplete widget instead of listing every related row. The related
+    model's admin needs ``search_fields``, and the admin using the filter
+    needs ``AutocompleteFilterMixin`` for the widget's media.
+    """
+    template = 'admin/crew_app/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.title = field.verbose_name
+        self.admin_site = model_admin.admin_site
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def widget(self):
+        return AutocompleteSelect(self.field, self.admin_site, attrs={'id': f'filter_{self.lookup_kwarg}'})
+
+    def rendered_widget(self):
+        # Rendering looks up the label of the selected value only.
+        field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(), widget=self.widget(), required=False,
+        )
+        value = self.used_parameters.get(self.lookup_kwarg)
+        return field.widget.render(self.lookup_kwarg, value[-1] if value else None)
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.used_parameters,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': 'All',
+        }
+
+
+class AutocompleteFilterMixin:
+    """Adds the autocomplete widget media of ``AutocompleteFilter`` entries in ``list_filter``."""
+
+    @property
+    def media(self):
+        media = super().media
+        for entry in self.list_filter:
+            if isinstance(entry, tuple) and entry[1] is AutocompleteFilter:
+                field = self.model._meta.get_field(entry[0])
+                media += AutocompleteSelect(field, self.admin_site).media
+                break
+        return media
+
+
+class IndexedSearchMixin:
+    """
+    Answers the changelist search box (and autocomplete) from the search
+    index rather than ``icontains`` over ``search_fields``, which stay set
+    because the admin only shows the box, and allows autocomplete, when
+    they are.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_queryset(queryset, search_term), False
+
 
 # Register the custom User model with the admin site
 admin.site.register(User, UserAdmin)
 
 @admin.register(CrewProfile)
-class CrewProfileAdmin(admin.ModelAdmin):
+class CrewProfileAdmin(IndexedSearchMixin, AutocompleteFilterMixin, admin.ModelAdmin):
     list_display = ('crew_id', 'first_name', 'last_name', 'department', 'position', 'recruitment_status')
-    list_filter = ('recruitment_status', 'department', 'position')
-    search_fields = ('first_name', 'last_name', 'crew_id')
+    list_filter = ('recruitment_status', 'department', ('position', AutocompleteFilter))
+    # Position.__str__ names its department.
+    list_select_related = ('department', 'position__department')
+    search_fields = ('first_name', 'last_name', 'phone_number', 'crew_id')
+    autocomplete_fields = ('user', 'department', 'position')
     readonly_fields = ('crew_id', 'date_joined', 'last_modified')
     actions = ['approve_profile', 'reject_profile']
 
     def approve_profile(self, request, queryset):
-        queryset.update(recruitment_status='approved')
+        changed = transition(queryset, 'recruitment_status', 'approved', changed_by=request.user)
+        self.message_user(request, f'{changed} profile(s) approved.')
     approve_profile.short_description = 'Approve selected profiles'
 
     def reject_profile(self, request, queryset):
-        queryset.update(recruitment_status='rejected')
+        changed = transition(queryset, 'recruitment_status', 'rejected', changed_by=request.user)
+        self.message_user(request, f'{changed} profile(s) rejected.')
     reject_profile.short_description = 'Reject selected profiles'
 
+    def get_urls(self):
+        return [
+            path(
+                'import-roster/',
+                self.admin_site.admin_view(self.import_roster_view),
+                name='crew_app_crewprofile_import_roster',
+            ),
+        ] + super().get_urls()
+
+    def import_roster_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        errors = []
+        if request.method == 'POST':
+            form = RosterUploadForm(request.POST, request.FILES)
+            if form.is_valid():
+                roster = form.cleaned_data['roster']
+                try:
+                    # Hashed in this process: a pool per upload would multiply
+                    # the web server's processes. Large rosters belong to the
+                    # import_roster command.
+                    result = import_roster(
+                        read_rows(roster, roster.name),
+                        status=form.cleaned_data['status'],
+                        workers=0,
+                    )
+                except ValueError as e:
+                    self.message_user(request, str(e), messages.ERROR)
+                else:
+                    errors = result['errors']
+                    self.message_user(
+                        request,
+                        f"Imported {result['created']} crew members; {len(errors)} rows rejected.",
+                        messages.WARNING if errors else messages.SUCCESS,
+                    )
+                    if not errors:
+                        return redirect('admin:crew_app_crewprofile_changelist')
+        else:
+            form = RosterUploadForm()
+        return render(request, 'admin/crew_app/crewprofile/import_roster.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Import roster',
+            'opts': self.model._meta,
+            'form': form,
+            'columns': COLUMNS,
+            'errors': errors,
+        })
+
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'description', 'created_at')
@@ -31,71 +173,245 @@ class PositionAdmin(admin.ModelAdmin):
     list_display = ('title', 'department', 'description', 'created_at')
     search_fields = ('title', 'department__name')
     list_filter = ('department',)
+    list_select_related = ('department',)
 
 @admin.register(Document)
-class DocumentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'crew_profile', 'uploaded_at', 'is_verified')
+class DocumentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ('title', 'crew_profile', 'uploaded_at', 'is_verified', 'inspection', 'preview')
     search_fields = ('title', 'crew_profile__first_name', 'crew_profile__last_name')
-    list_filter = ('is_verified',)
-    actions = ['verify_document']
+    list_filter = ('is_verified', 'job__status')
+    list_select_related = ('crew_profile', 'job')
+    autocomplete_fields = ('crew_profile',)
+    readonly_fields = ('inspection', 'inspection_details', 'preview')
+    actions = ['verify_document', 'verify_passed_documents', 'reinspect_documents']
 
     def verify_document(self, request, queryset):
-        queryset.update(is_verified=True)
+        changed = transition(queryset, 'is_verified', True, changed_by=request.user)
+        self.message_user(request, f'{changed} document(s) verified.')
     verify_document.short_description = 'Verify selected documents'
 
+    def verify_passed_documents(self, request, queryset):
+        changed = transition(queryset.filter(job__status='done', job__flags=[]), 'is_verified', True, changed_by=request.user)
+        self.message_user(request, f'{changed} document(s) that passed inspection verified.')
+    verify_passed_documents.short_description = 'Verify selected documents that passed inspection'
+
+    def reinspect_documents(self, request, queryset):
+        queued = queue_documents(queryset)
+        self.message_user(request, f'{queued} document(s) queued for inspection.')
+    reinspect_documents.short_description = 'Inspect selected documents again'
+
+    @admin.display(description='Inspection', ordering='job__status')
+    def inspection(self, obj):
+        job = getattr(obj, 'job', None)
+        if job is None:
+            return 'Not queued'
+        if job.status != 'done':
+            return job.get_status_display()
+        if job.flags:
+            return format_html('<span style="color: #ba2121;">Flagged: {}</span>', ', '.join(job.flags))
+        return 'Passed'
+
+    @admin.display(description='Details')
+    def inspection_details(self, obj):
+        job = getattr(obj, 'job', None)
+        if job is None or job.status != 'done':
+            return job.error if job else '-'
+        return f'{job.mime_type or "unknown type"}, {job.size} bytes, {job.page_count or "?"} page(s)'
+
+    @admin.display(description='Preview')
+    def preview(self, obj):
+        job = getattr(obj, 'job', None)
+        if job is None or not job.thumbnail:
+            return '-'
+        return format_html(
+            '<a href="{}"><img src="{}" alt="" style="max-height: 80px;"></a>',
+            reverse('document_download', args=[obj.pk]),
+            reverse('document_thumbnail', args=[obj.pk]),
+        )
+
+class HoursWorkedFilter(admin.SimpleListFilter):
+    title = 'hours worked'
+    parameter_name = 'hours'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('short', 'Under 4 hours'),
+            ('regular', '4 to 8 hours'),
+            ('overtime', 'Over 8 hours'),
+            ('open', 'Not clocked out'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'short':
+            return queryset.filter(worked__lt=timedelta(hours=4))
+        if self.value() == 'regular':
+            return queryset.filter(worked__gte=timedelta(hours=4), worked__lte=timedelta(hours=8))
+        if self.value() == 'overtime':
+            return queryset.filter(worked__gt=timedelta(hours=8))
+        if self.value() == 'open':
+            return queryset.filter(clock_in__isnull=False, clock_out__isnull=True)
+        return queryset
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     list_display = ('crew', 'date', 'clock_in', 'clock_out', 'hours_worked')
     search_fields = ('crew__first_name', 'crew__last_name')
-    list_filter = ('date',)
+    list_filter = ('date', HoursWorkedFilter)
+    list_select_related = ('crew',)
+    autocomplete_fields = ('crew',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_action('attendance')]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_hours()
+
+    @admin.display(description='Hours worked', ordering='worked')
+    def hours_worked(self, obj):
+        return round(obj.hours_worked(), 2)
+
+@admin.register(DepartmentMetrics)
+class DepartmentMetricsAdmin(admin.ModelAdmin):
+    """HR dashboard figures, marked stale by signals and recomputed by the dashboard and refresh_hr_metrics; read-only here."""
+    list_display = (
+        'department', 'approved_crew', 'pending_crew', 'open_leave', 'overdue_tasks',
+        'payroll_month', 'payroll_total', 'average_rating', 'refreshed_at', 'stale',
+    )
+    list_select_related = ('department',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Avg. rating')
+    def average_rating(self, obj):
+        rating = obj.average_rating()
+        return None if rating is None else round(rating, 1)
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    """Monthly attendance report, maintained from attendance writes; read-only here."""
+    list_display = ('crew', 'month', 'days_present', 'hours_worked', 'late_arrivals', 'missing_clock_outs')
+    list_filter = ('month', 'crew__department')
+    list_select_related = ('crew',)
+    search_fields = ('crew__first_name', 'crew__last_name')
+    date_hierarchy = 'month'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_action('attendance_summary')]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Hours worked', ordering='total_worked')
+    def hours_worked(self, obj):
+        return round(obj.hours_worked(), 2)
 
 @admin.register(Shift)
-class ShiftAdmin(admin.ModelAdmin):
-    list_display = ('crew', 'start_time', 'end_time', 'description')
-    list_filter = ('crew', 'start_time')
+class ShiftAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
+    form = ShiftForm
+    list_display = ('crew', 'start_time', 'end_time', 'shift_duration', 'description')
+    list_filter = (('crew', AutocompleteFilter), 'start_time')
+    list_select_related = ('crew',)
     search_fields = ('crew__user__email', 'description')
+    autocomplete_fields = ('crew',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_duration()
+
+    @admin.display(description='Duration (hours)', ordering='duration')
+    def shift_duration(self, obj):
+        return round(obj.shift_duration(), 2)
 
 @admin.register(LeaveRequest)
 class LeaveRequestAdmin(admin.ModelAdmin):
     list_display = ('crew', 'start_date', 'end_date', 'reason', 'status')
     search_fields = ('crew__first_name', 'crew__last_name')
     list_filter = ('status', 'start_date', 'end_date')
-    actions = ['approve_leave', 'reject_leave']
+    list_select_related = ('crew',)
+    autocomplete_fields = ('crew',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['approve_leave', 'reject_leave', export_action('leave')]
 
     def approve_leave(self, request, queryset):
-        queryset.update(status='approved')
+        changed = set_leave_status(queryset, 'approved', changed_by=request.user)
+        self.message_user(request, f'{changed} leave request(s) approved.')
     approve_leave.short_description = 'Approve selected leave requests'
 
     def reject_leave(self, request, queryset):
-        queryset.update(status='rejected')
+        changed = set_leave_status(queryset, 'rejected', changed_by=request.user)
+        self.message_user(request, f'{changed} leave request(s) rejected.')
     reject_leave.short_description = 'Reject selected leave requests'
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'crew', 'status', 'deadline')
     search_fields = ('title', 'crew__first_name', 'crew__last_name')
     list_filter = ('status', 'deadline')
+    list_select_related = ('crew',)
+    autocomplete_fields = ('crew',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_action('tasks')]
 
 @admin.register(Payroll)
 class PayrollAdmin(admin.ModelAdmin):
     list_display = ('crew', 'month', 'basic_salary', 'overtime_pay', 'deductions', 'net_salary', 'payment_status', 'payment_date')
     search_fields = ('crew__first_name', 'crew__last_name')
     list_filter = ('month', 'payment_status')
+    list_select_related = ('crew',)
+    autocomplete_fields = ('crew',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [export_action('payroll')]
 
 @admin.register(Performance)
 class PerformanceAdmin(admin.ModelAdmin):
     list_display = ('crew', 'review_date', 'rating', 'comments', 'reviewed_by')
     search_fields = ('crew__first_name', 'crew__last_name', 'reviewed_by__username')
     list_filter = ('review_date', 'rating')
+    list_select_related = ('crew', 'reviewed_by')
+    autocomplete_fields = ('crew', 'reviewed_by')
 
 @admin.register(Announcement)
-class AnnouncementAdmin(admin.ModelAdmin):
+class AnnouncementAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('title', 'is_global', 'created_at', 'created_by')
     search_fields = ('title', 'content', 'created_by__username')
     list_filter = ('is_global', 'created_at')
+    list_select_related = ('created_by',)
+    autocomplete_fields = ('departments', 'created_by')
     actions = ['send_announcement']
 
     def send_announcement(self, request, queryset):
-        for announcement in queryset:
-            announcement.departments.all().crew_profile_set.send_announcement(announcement.title, announcement.content)
-    send_announcement.short_description = 'Send selected announcements'
\ No newline at end of file
+        delivered = sum(deliver_announcement(announcement) for announcement in queryset)
+        self.message_user(request, f'Announcements sent to {delivered} crew members.')
+    send_announcement.short_description = 'Send selected announcements'
+
+
+@admin.register(StatusChange)
+class StatusChangeAdmin(admin.ModelAdmin):
+    """Audit trail written by bulk status transitions; append-only, so read-only here."""
+    list_display = ('changed_at', 'content_type', 'object_id', 'field', 'old_value', 'new_value', 'changed_by')
+    list_filter = ('content_type', 'field', 'new_value', 'changed_at')
+    list_select_related = ('content_type', 'changed_by')
+    search_fields = ('=batch', '=object_id')
+    date_hierarchy = 'changed_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import Announcement, AnnouncementDelivery, AnnouncementFeedEntry, CrewProfile, Department
+
+DELIVERY_CHUNK_SIZE = getattr(settings, 'ANNOUNCEMENT_DELIVERY_CHUNK_SIZE', 1000)
+
+
+def feed_department_ids(announcement):
+    """Departments whose feed should list ``announcement``; ``None`` is the no-department bucket."""
+    if announcement.is_global:
+        return list(Department.objects.values_list('pk', flat=True)) + [None]
+    return list(announcement.departments.values_list('pk', flat=True))
+
+
+def rebuild_feed(announcement):
+    """Replace the feed entries of one announcement."""
+    entries = [
+        AnnouncementFeedEntry(
+            announcement=announcement,
+            department_id=department_id,
+            created_at=announcement.created_at,
+        )
+        for department_id in feed_department_ids(announcement)
+    ]
+    with transaction.atomic():
+        AnnouncementFeedEntry.objects.filter(announcement=announcement).delete()
+        AnnouncementFeedEntry.objects.bulk_create(entries)
+
+
+def backfill_department(department):
+    """Give a newly created department the global announcements it missed."""
+    AnnouncementFeedEntry.objects.bulk_create([
+        AnnouncementFeedEntry(
+            announcement=announcement,
+            department=department,
+            created_at=announcement.created_at,
+        )
+        for announcement in Announcement.objects.filter(is_global=True)
+    ])
+
+
+def _feed_entries(department_id, limit):
+    return AnnouncementFeedEntry.objects.filter(
+        department_id=department_id
+    ).select_related('announcement').prefetch_related(
+        'announcement__departments'
+    ).order_by('-created_at')[:limit]
+
+
+def department_feed(department_id, limit):
+    """Latest announcements visible to ``department_id`` with one indexed range query."""
+    return [entry.announcement for entry in _feed_entries(department_id, limit)]
+
+
+async def adepartment_feed(department_id, limit):
+    return [entry.announcement async for entry in _feed_entries(department_id, limit)]
+
+
+def send_announcement(announcement, chunk_size=DELIVERY_CHUNK_SIZE):
+    """
+    Deliver ``announcement`` to every crew member it targets.
+
+    Recipients are streamed in primary-key chunks and recorded with
+    ``bulk_create``; crew who already received it are skipped, so sending
+    again only reaches new members. Returns the number of crew targeted.
+    """
+    recipients = CrewProfile.objects.all()
+    if not announcement.is_global:
+        recipients = recipients.filter(department__in=announcement.departments.all())
+    recipients = recipients.order_by('pk').values_list('pk', flat=True)
+
+    targeted = 0
+    last_pk = 0
+    while True:
+        chunk = list(recipients.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        with transaction.atomic():
+            AnnouncementDelivery.objects.bulk_create(
+                [AnnouncementDelivery(announcement=announcement, crew_id=pk) for pk in chunk],
+                ignore_conflicts=True,
+            )
+        targeted += len(chunk)
+        last_pk = chunk[-1]
+    return targeted
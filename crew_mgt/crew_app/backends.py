@@ -1,13 +1,49 @@
-from django.contrib.auth.backends import ModelBackend
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password
+
+from .models import canonical_email
 
 User = get_user_model()
 
+
 class EmailAuthBackend(ModelBackend):
+    """
+    The only authentication backend: one indexed lookup on the normalized
+    email (or on the username, for staff accounts without an email login)
+    with the crew profile joined, and exactly one password hash per
+    attempt, including for unknown accounts.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
+        identifier = kwargs.get(User.EMAIL_FIELD, username)
+        if identifier is None or password is None:
+            return None
+        if '@' in identifier:
+            lookup = {User.EMAIL_FIELD: canonical_email(identifier)}
+        else:
+            lookup = {User.USERNAME_FIELD: identifier}
+
         try:
-            user = User.objects.get(email=username)
-            if user.check_password(password):
-                return user
+            user = User._default_manager.select_related('crew_profile').get(**lookup)
         except User.DoesNotExist:
+            # Hash anyway so a miss takes as long as a wrong password.
+            User().set_password(password)
             return None
+        if self._check_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def _check_password(self, user, password):
+        # PASSWORD_UPGRADE_ON_LOGIN rehashes passwords stored with an outdated
+        # hasher or iteration count. Turning it off keeps each login to one
+        # hash during a storm; `manage.py password_hashes` tracks what is left.
+        def setter(raw_password):
+            user.set_password(raw_password)
+            # An upgraded hash is not a password change.
+            user._password = None
+            user.save(update_fields=['password'])
+
+        upgrade = getattr(settings, 'PASSWORD_UPGRADE_ON_LOGIN', True)
+        return check_password(password, user.password, setter if upgrade else None)
@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import instrumentation
+
+KEY_PREFIX = 'crew_app'
+
+PROFILE = 'profile'
+DASHBOARD = 'dashboard'
+TASKS = 'tasks'
+SHIFTS = 'shifts'
+FRAGMENTS = (PROFILE, DASHBOARD, TASKS, SHIFTS)
+
+# Seconds each fragment may live. Signals invalidate on every write, so the
+# timeout only bounds time-dependent data such as "next shift".
+TIMEOUTS = {
+    PROFILE: 60 * 15,
+    DASHBOARD: 60,
+    TASKS: 60 * 15,
+    SHIFTS: 60 * 15,
+}
+TIMEOUTS.update(getattr(settings, 'CREW_CACHE_TIMEOUTS', {}))
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+_missing = object()
+
+
+def _record(fragment, outcome):
+    with _stats_lock:
+        _stats[(fragment, outcome)] += 1
+    instrumentation.record_cache(outcome)
+
+
+def cache_stats():
+    """Per-fragment hit and miss counts for this process."""
+    with _stats_lock:
+        return {
+            fragment: {'hits': _stats[(fragment, 'hit')], 'misses': _stats[(fragment, 'miss')]}
+            for fragment in FRAGMENTS
+        }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _version_key(crew_id, fragment):
+    return f'{KEY_PREFIX}:version:{crew_id}:{fragment}'
+
+
+def _global_version_key(name):
+    return f'{KEY_PREFIX}:version:global:{name}'
+
+
+def _current_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() so concurrent first readers agree on a single version.
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+async def _acurrent_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def _fragment_key(crew_id, fragment, versions, vary):
+    # Request inputs are hashed, so keys stay short and memcached-safe.
+    variant = hashlib.sha256(repr(tuple(str(v) for v in vary)).encode()).hexdigest()[:32]
+    return ':'.join([KEY_PREFIX, fragment, str(crew_id), *versions, variant])
+
+
+def crew_id_for_user(user):
+    """
+    The ``CrewProfile.crew_id`` of ``user``. The mapping never changes, so it
+    is cached to let a full fragment hit skip the profile lookup.
+    """
+    key = f'{KEY_PREFIX}:crew_id:{user.pk}'
+    crew_id = cache.get(key)
+    if crew_id is None:
+        from .models import CrewProfile
+
+        crew_id = CrewProfile.objects.filter(user=user).values_list('crew_id', flat=True).get()
+        cache.set(key, crew_id, None)
+    return crew_id
+
+
+def get_fragment(crew_id, fragment, build, vary=(), depends_on=()):
+    """
+    Return the cached value of ``fragment`` for one crew member, calling
+    ``build`` to compute and store it on a miss.
+
+    ``vary`` holds request inputs that select between variants (filters,
+    cursors). ``depends_on`` names global versions, such as announcements,
+    that are shared by every crew member.
+    """
+    versions = [_current_version(_version_key(crew_id, fragment))]
+    versions += [_current_version(_global_version_key(name)) for name in depends_on]
+    key = _fragment_key(crew_id, fragment, versions, vary)
+
+    value = cache.get(key, _missing)
+    if value is _missing:
+        _record(fragment, 'miss')
+        value = build()
+        cache.set(key, value, TIMEOUTS[fragment])
+    else:
+        _record(fragment, 'hit')
+    return value
+
+
+async def acrew_id_for_user(user):
+    """Async counterpart of ``crew_id_for_user``."""
+    key = f'{KEY_PREFIX}:crew_id:{user.pk}'
+    crew_id = await cache.aget(key)
+    if crew_id is None:
+        from .models import CrewProfile
+
+        crew_id = await CrewProfile.objects.filter(user=user).values_list('crew_id', flat=True).aget()
+        await cache.aset(key, crew_id, None)
+    return crew_id
+
+
+async def aget_fragment(crew_id, fragment, build, vary=(), depends_on=()):
+    """Async counterpart of ``get_fragment``; ``build`` is a coroutine function."""
+    versions = [await _acurrent_version(_version_key(crew_id, fragment))]
+    versions += [await _acurrent_version(_global_version_key(name)) for name in depends_on]
+    key = _fragment_key(crew_id, fragment, versions, vary)
+
+    value = await cache.aget(key, _missing)
+    if value is _missing:
+        _record(fragment, 'miss')
+        value = await build()
+        await cache.aset(key, value, TIMEOUTS[fragment])
+    else:
+        _record(fragment, 'hit')
+    return value
+
+
+def invalidate(crew_ids, fragments=FRAGMENTS):
+    """Retire the cached ``fragments`` of every crew member in ``crew_ids``."""
+    cache.set_many(
+        {
+            _version_key(crew_id, fragment): uuid.uuid4().hex
+            for crew_id in crew_ids
+            for fragment in fragments
+        },
+        None,
+    )
+
+
+def invalidate_global(name):
+    """Retire every fragment that declared ``depends_on=(name,)``."""
+    cache.set(_global_version_key(name), uuid.uuid4().hex, None)
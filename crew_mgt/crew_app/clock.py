@@ -0,0 +1,166 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import cache
+from .summaries import refresh_summaries
+from .models import Attendance, CrewProfile
+
+CLOCKED_IN = 'clocked_in'
+CLOCKED_OUT = 'clocked_out'
+ALREADY_CLOCKED_IN = 'already_clocked_in'
+ALREADY_CLOCKED_OUT = 'already_clocked_out'
+NOT_CLOCKED_IN = 'not_clocked_in'
+UNKNOWN_CREW = 'unknown_crew'
+
+CLOCK_FRAGMENTS = (cache.PROFILE, cache.DASHBOARD)
+
+
+def _recorded(crew_ids, keys):
+    """Bookkeeping after ``update()`` writes, which skip model signals."""
+    cache.invalidate(crew_ids, CLOCK_FRAGMENTS)
+    refresh_summaries(keys)
+
+
+def clock_in(profile, day, moment):
+    """
+    Record a clock-in with at most three statements and no read-modify-write.
+
+    A conditional ``UPDATE ... WHERE clock_in IS NULL`` claims an existing
+    blank row; otherwise the row is inserted, and a unique-key conflict from
+    a concurrent double-submit falls back to the conditional update again.
+    """
+    claimed = Attendance.objects.filter(
+        crew=profile, date=day, clock_in__isnull=True
+    ).update(clock_in=moment)
+    if not claimed:
+        try:
+            with transaction.atomic():
+                Attendance.objects.create(crew=profile, date=day, clock_in=moment)
+            # The insert's post_save signals refresh the cache and summary.
+            return CLOCKED_IN
+        except IntegrityError:
+            claimed = Attendance.objects.filter(
+                crew=profile, date=day, clock_in__isnull=True
+            ).update(clock_in=moment)
+
+    if not claimed:
+        return ALREADY_CLOCKED_IN
+    _recorded([profile.crew_id], [(profile.pk, day)])
+    return CLOCKED_IN
+
+
+def clock_out(profile, day, moment):
+    """Record a clock-out with one conditional ``UPDATE``; the state is only read to explain a refusal."""
+    updated = Attendance.objects.filter(
+        crew=profile, date=day, clock_in__isnull=False, clock_out__isnull=True
+    ).update(clock_out=moment)
+    if updated:
+        _recorded([profile.crew_id], [(profile.pk, day)])
+        return CLOCKED_OUT
+
+    clocked_out = Attendance.objects.filter(
+        crew=profile, date=day, clock_out__isnull=False
+    ).exists()
+    return ALREADY_CLOCKED_OUT if clocked_out else NOT_CLOCKED_IN
+
+
+def record_events(events):
+    """
+    Apply a batch of badge events from a kiosk terminal.
+
+    ``events`` is a list of ``(crew_id, action, moment)`` tuples where
+    ``action`` is ``'in'`` or ``'out'`` and ``crew_id`` is the
+    ``CrewProfile.crew_id``. The whole batch runs in one transaction with a
+    fixed number of statements: resolve crew, insert missing rows (ignoring
+    conflicts), read the rows back, one conditional ``CASE`` update each for
+    clock-ins and clock-outs, and a final read to report outcomes. The
+    earliest clock-in and clock-out per crew and day win; replaying a batch
+    reports its events as already recorded.
+
+    Returns one status per event, in input order.
+    """
+    crew_pks = dict(
+        CrewProfile.objects.filter(
+            crew_id__in={crew_id for crew_id, _, _ in events}
+        ).values_list('crew_id', 'pk')
+    )
+
+    keyed = []
+    first_in, first_out = {}, {}
+    for crew_id, action, moment in events:
+        pk = crew_pks.get(crew_id)
+        if pk is None:
+            keyed.append(None)
+            continue
+        key = (pk, timezone.localdate(moment))
+        keyed.append(key)
+        target = first_in if action == 'in' else first_out
+        if key not in target or moment < target[key]:
+            target[key] = moment
+
+    keys = set(first_in) | set(first_out)
+    if not keys:
+        return [UNKNOWN_CREW] * len(events)
+
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            [Attendance(crew_id=pk, date=day) for pk, day in first_in],
+            ignore_conflicts=True,
+        )
+        candidates = Attendance.objects.filter(
+            crew_id__in={pk for pk, _ in keys}, date__in={day for _, day in keys}
+        ).values_list('pk', 'crew_id', 'date', 'clock_in', 'clock_out')
+        row_ids, before = {}, {}
+        for pk, crew_pk, day, clock_in_at, clock_out_at in candidates:
+            if (crew_pk, day) in keys:
+                row_ids[crew_pk, day] = pk
+                before[crew_pk, day] = (clock_in_at, clock_out_at)
+        if first_in:
+            Attendance.objects.filter(
+                pk__in=[row_ids[key] for key in first_in], clock_in__isnull=True
+            ).update(clock_in=Case(
+                *[When(pk=row_ids[key], then=Value(moment)) for key, moment in first_in.items()]
+            ))
+        out_keys = [key for key in first_out if key in row_ids]
+        if out_keys:
+            Attendance.objects.filter(
+                pk__in=[row_ids[key] for key in out_keys],
+                clock_in__isnull=False,
+                clock_out__isnull=True,
+            ).update(clock_out=Case(
+                *[When(pk=row_ids[key], then=Value(first_out[key])) for key in out_keys]
+            ))
+        final = {
+            (crew_pk, day): (clock_in_at, clock_out_at)
+            for crew_pk, day, clock_in_at, clock_out_at in Attendance.objects.filter(
+                pk__in=row_ids.values()
+            ).values_list('crew_id', 'date', 'clock_in', 'clock_out')
+        }
+
+    results = []
+    touched = set()
+    reported = set()
+    for key, (_, action, moment) in zip(keyed, events):
+        if key is None:
+            results.append(UNKNOWN_CREW)
+            continue
+        clock_in_at, clock_out_at = final.get(key, (None, None))
+        was_in, was_out = before.get(key, (None, None))
+        if action == 'in':
+            won = was_in is None and clock_in_at == moment and (key, action) not in reported
+            status = CLOCKED_IN if won else ALREADY_CLOCKED_IN
+        elif clock_in_at is None:
+            won, status = False, NOT_CLOCKED_IN
+        else:
+            won = was_out is None and clock_out_at == moment and (key, action) not in reported
+            status = CLOCKED_OUT if won else ALREADY_CLOCKED_OUT
+        if won:
+            reported.add((key, action))
+            touched.add(key)
+        results.append(status)
+
+    if touched:
+        touched_crew = {pk for pk, _ in touched}
+        _recorded([crew_id for crew_id, pk in crew_pks.items() if pk in touched_crew], touched)
+    return results
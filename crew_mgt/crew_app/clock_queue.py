@@ -0,0 +1,155 @@
+"""
+Durable local queue for clock events.
+
+When ``CLOCK_INGESTION = 'queue'`` the clock views append events to a small
+SQLite file in WAL mode instead of writing ``Attendance`` rows in the
+request. ``process_clock_queue`` drains it in batches through
+``clock.record_events``. Delivery is at-least-once: a batch claimed by a
+worker that dies is reclaimed after ``CLAIM_TIMEOUT`` seconds, and replaying
+events is harmless because the first clock-in and clock-out always win.
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+
+from . import clock
+
+CLAIM_TIMEOUT = getattr(settings, 'CLOCK_QUEUE_CLAIM_TIMEOUT', 300)
+BATCH_SIZE = getattr(settings, 'CLOCK_QUEUE_BATCH_SIZE', 200)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clock_event (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    crew_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    moment TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    status TEXT,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS clock_event_pending ON clock_event (processed_at, claimed_at, id);
+"""
+
+_local = threading.local()
+
+
+def queue_enabled():
+    return getattr(settings, 'CLOCK_INGESTION', 'sync') == 'queue'
+
+
+def _connection():
+    path = str(settings.CLOCK_QUEUE_PATH)
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    connection = connections.get(path)
+    if connection is None:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # Every acknowledged event must survive a crash, so fsync each commit.
+        connection.execute('PRAGMA synchronous=FULL')
+        connection.executescript(SCHEMA)
+        connections[path] = connection
+    return connection
+
+
+def enqueue(crew_id, action, moment):
+    """Append one event and return its queue id as the acknowledgement."""
+    cursor = _connection().execute(
+        'INSERT INTO clock_event (crew_id, action, moment, enqueued_at) VALUES (?, ?, ?, ?)',
+        (str(crew_id), action, moment.isoformat(), time.time()),
+    )
+    return cursor.lastrowid
+
+
+def enqueue_many(events):
+    """Append ``(crew_id, action, moment)`` events in one commit; returns how many."""
+    connection = _connection()
+    enqueued_at = time.time()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.executemany(
+            'INSERT INTO clock_event (crew_id, action, moment, enqueued_at) VALUES (?, ?, ?, ?)',
+            [(str(crew_id), action, moment.isoformat(), enqueued_at) for crew_id, action, moment in events],
+        )
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    return len(events)
+
+
+def _claim(connection, worker, batch_size):
+    now = time.time()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(
+            """
+            UPDATE clock_event SET claimed_by = ?, claimed_at = ?
+            WHERE id IN (
+                SELECT id FROM clock_event
+                WHERE processed_at IS NULL AND (claimed_at IS NULL OR claimed_at < ?)
+                ORDER BY id LIMIT ?
+            )
+            """,
+            (worker, now, now - CLAIM_TIMEOUT, batch_size),
+        )
+        rows = connection.execute(
+            'SELECT id, crew_id, action, moment FROM clock_event '
+            'WHERE claimed_by = ? AND claimed_at = ? AND processed_at IS NULL ORDER BY id',
+            (worker, now),
+        ).fetchall()
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    return rows
+
+
+def drain(batch_size=BATCH_SIZE):
+    """
+    Claim up to ``batch_size`` pending events, apply them to ``Attendance``
+    with one batched upsert and mark them processed. Returns the number of
+    events handled.
+    """
+    connection = _connection()
+    worker = uuid.uuid4().hex
+    rows = _claim(connection, worker, batch_size)
+    if not rows:
+        return 0
+
+    events = [
+        (uuid.UUID(crew_id), action, datetime.fromisoformat(moment))
+        for _, crew_id, action, moment in rows
+    ]
+    statuses = clock.record_events(events)
+
+    processed_at = time.time()
+    connection.execute('BEGIN IMMEDIATE')
+    connection.executemany(
+        'UPDATE clock_event SET status = ?, processed_at = ? WHERE id = ?',
+        [(status, processed_at, row[0]) for status, row in zip(statuses, rows)],
+    )
+    connection.execute('COMMIT')
+    return len(rows)
+
+
+def pending_count():
+    return _connection().execute(
+        'SELECT COUNT(*) FROM clock_event WHERE processed_at IS NULL'
+    ).fetchone()[0]
+
+
+def purge(older_than):
+    """Delete processed events older than ``older_than`` seconds."""
+    cursor = _connection().execute(
+        'DELETE FROM clock_event WHERE processed_at IS NOT NULL AND processed_at < ?',
+        (time.time() - older_than,),
+    )
+    return cursor.rowcount
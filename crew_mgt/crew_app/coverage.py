@@ -0,0 +1,157 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import transitions
+from .models import CrewProfile, Department, LeaveCoverageDelta, LeaveRequest, Position, Shift
+
+GROUPINGS = {
+    'department': ('department_id', Department, 'name'),
+    'position': ('position_id', Position, 'title'),
+}
+MAX_CALENDAR_DAYS = 731
+
+
+def leave_deltas(rows, sign=1):
+    """
+    Difference-array entries for ``(department_id, position_id, start_date,
+    end_date)`` leave rows: ``sign`` on the first day, ``-sign`` the day
+    after the last.
+    """
+    deltas = Counter()
+    for department_id, position_id, start_date, end_date in rows:
+        if start_date > end_date:
+            continue
+        deltas[department_id, position_id, start_date] += sign
+        deltas[department_id, position_id, end_date + timedelta(days=1)] -= sign
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add ``deltas`` to the stored difference array with an atomic increment per key."""
+    with transaction.atomic():
+        for (department_id, position_id, day), delta in deltas.items():
+            if not delta:
+                continue
+            key = {'department_id': department_id, 'position_id': position_id, 'day': day}
+            first = LeaveCoverageDelta.objects.filter(**key).values('pk')[:1]
+            if LeaveCoverageDelta.objects.filter(pk__in=Subquery(first)).update(delta=F('delta') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    LeaveCoverageDelta.objects.create(delta=delta, **key)
+            except IntegrityError:
+                # Created concurrently; the row exists now.
+                LeaveCoverageDelta.objects.filter(pk__in=Subquery(first)).update(delta=F('delta') + delta)
+
+
+def set_leave_status(queryset, status, changed_by=None):
+    """
+    Move the leave requests in ``queryset`` to ``status`` through
+    ``transitions.transition`` and adjust the coverage counts of those
+    entering or leaving ``'approved'`` in the same transactions. Returns the
+    number of requests changed.
+    """
+    def adjust_coverage(rows):
+        if status != 'approved':
+            rows = [row for row in rows if row['status'] == 'approved']
+        apply_deltas(leave_deltas(
+            ((row['crew__department_id'], row['crew__position_id'], row['start_date'], row['end_date']) for row in rows),
+            sign=1 if status == 'approved' else -1,
+        ))
+
+    return transitions.transition(queryset, 'status', status, changed_by=changed_by, on_chunk=adjust_coverage)
+
+
+def move_crew_leave(crew, old_group, new_group):
+    """Re-file ``crew``'s approved leave after a department or position change."""
+    dates = list(crew.leave_requests.filter(status='approved').values_list('start_date', 'end_date'))
+    deltas = leave_deltas(((*old_group, *row) for row in dates), sign=-1)
+    deltas.update(leave_deltas((*new_group, *row) for row in dates))
+    apply_deltas(deltas)
+
+
+def rebuild_coverage():
+    """Recompute the whole difference array from approved leave. Returns the number of rows written."""
+    deltas = leave_deltas(
+        LeaveRequest.objects.filter(status='approved').values_list(
+            'crew__department_id', 'crew__position_id', 'start_date', 'end_date'
+        ).iterator()
+    )
+    with transaction.atomic():
+        LeaveCoverageDelta.objects.all().delete()
+        created = LeaveCoverageDelta.objects.bulk_create(
+            [
+                LeaveCoverageDelta(department_id=department_id, position_id=position_id, day=day, delta=delta)
+                for (department_id, position_id, day), delta in deltas.items()
+                if delta
+            ],
+            batch_size=1000,
+        )
+    return len(created)
+
+
+def coverage_calendar(start, end, group_by='department'):
+    """
+    Per-day headcount matrix from ``start`` to ``end`` inclusive, grouped by
+    department or position: crew on approved leave (a prefix sum over the
+    stored difference array) and crew scheduled on shift.
+
+    Runs a fixed number of aggregate queries however long the range is.
+    Returns ``{'days': [date, ...], 'groups': [{'id', 'name', 'headcount',
+    'on_leave': [int, ...], 'scheduled': [int, ...]}, ...]}``.
+    """
+    field, model, label = GROUPINGS[group_by]
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    baseline = dict(
+        LeaveCoverageDelta.objects.filter(day__lt=start).values(field).annotate(
+            total=Sum('delta')
+        ).order_by().values_list(field, 'total')
+    )
+    changes = {}
+    for group, day, delta in LeaveCoverageDelta.objects.filter(
+        day__gte=start, day__lte=end
+    ).values(field, 'day').annotate(total=Sum('delta')).order_by().values_list(field, 'day', 'total'):
+        changes.setdefault(group, [0] * len(days))[(day - start).days] += delta
+
+    # Bounds as aware datetimes rather than a __date lookup, which casts
+    # every row and so cannot use the start_time index.
+    first_moment = timezone.make_aware(datetime.combine(start, time.min))
+    last_moment = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    scheduled = {}
+    for group, day, crew in Shift.objects.filter(
+        start_time__gte=first_moment, start_time__lt=last_moment
+    ).annotate(day=TruncDate('start_time')).values(f'crew__{field}', 'day').annotate(
+        crew_count=Count('crew', distinct=True)
+    ).order_by().values_list(f'crew__{field}', 'day', 'crew_count'):
+        scheduled.setdefault(group, [0] * len(days))[(day - start).days] = crew
+
+    headcount = dict(
+        CrewProfile.objects.filter(recruitment_status='approved').values(field).annotate(
+            crew=Count('pk')
+        ).order_by().values_list(field, 'crew')
+    )
+
+    groups = set(baseline) | set(changes) | set(scheduled) | set(headcount)
+    names = dict(model.objects.filter(pk__in=[group for group in groups if group]).values_list('pk', label))
+
+    rows = []
+    for group in sorted(groups, key=lambda group: (group is None, names.get(group, ''))):
+        running = baseline.get(group, 0)
+        on_leave = []
+        for delta in changes.get(group, [0] * len(days)):
+            running += delta
+            on_leave.append(running)
+        rows.append({
+            'id': group,
+            'name': names.get(group, 'Unassigned'),
+            'headcount': headcount.get(group, 0),
+            'on_leave': on_leave,
+            'scheduled': scheduled.get(group, [0] * len(days)),
+        })
+    return {'days': days, 'groups': rows}
@@ -0,0 +1,110 @@
+import asyncio
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .announcements import adepartment_feed, department_feed
+from .models import Attendance, CrewProfile, Shift, Task
+
+ACTIVE_TASK_STATUSES = ['pending', 'in_progress']
+DASHBOARD_TASK_LIMIT = 3
+DASHBOARD_ANNOUNCEMENT_LIMIT = 2
+
+
+def portal_profile_queryset(today, now=None):
+    """
+    CrewProfile queryset annotated with today's attendance and the next shift.
+
+    Every scalar widget on the portal dashboard is folded into the profile
+    row as a correlated subquery, so a single SELECT replaces the separate
+    attendance and shift lookups.
+    """
+    now = now or timezone.now()
+    today_attendance = Attendance.objects.filter(crew=OuterRef('pk'), date=today)
+    next_shift = Shift.objects.filter(
+        crew=OuterRef('pk'), end_time__gte=now
+    ).order_by('start_time')
+
+    return CrewProfile.objects.select_related('department', 'position').annotate(
+        today_clock_in=Subquery(today_attendance.values('clock_in')[:1]),
+        today_clock_out=Subquery(today_attendance.values('clock_out')[:1]),
+        next_shift_start=Subquery(next_shift.values('start_time')[:1]),
+        next_shift_end=Subquery(next_shift.values('end_time')[:1]),
+    )
+
+
+def _dashboard_objects(profile, today):
+    """Unsaved attendance and next-shift instances from the profile annotations."""
+    attendance = Attendance(
+        crew=profile,
+        date=today,
+        clock_in=profile.today_clock_in,
+        clock_out=profile.today_clock_out,
+    )
+    next_shift = None
+    if profile.next_shift_start is not None:
+        next_shift = Shift(
+            crew=profile,
+            start_time=profile.next_shift_start,
+            end_time=profile.next_shift_end,
+        )
+    return attendance, next_shift
+
+
+def build_portal_context(user, today, now=None):
+    """
+    Collect every widget on the portal dashboard in a fixed number of queries:
+    the annotated profile, the active tasks, the announcement feed and the
+    prefetch of the announcements' departments.
+
+    Today's attendance is returned as an unsaved ``Attendance`` instance so
+    that rendering the dashboard never writes to the database. The context
+    is cached, so nothing in it refers to ``user``.
+    """
+    profile = portal_profile_queryset(today, now).get(user=user)
+    attendance, next_shift = _dashboard_objects(profile, today)
+
+    active_tasks = list(
+        Task.objects.filter(
+            crew=profile, status__in=ACTIVE_TASK_STATUSES
+        ).order_by('deadline')[:DASHBOARD_TASK_LIMIT]
+    )
+
+    announcements = department_feed(profile.department_id, DASHBOARD_ANNOUNCEMENT_LIMIT)
+
+    return {
+        'profile': profile,
+        'attendance': attendance,
+        'active_tasks': active_tasks,
+        'next_shift': next_shift,
+        'announcements': announcements,
+    }
+
+
+async def abuild_portal_context(user, today, now=None):
+    """
+    Async counterpart of ``build_portal_context``. The profile and the
+    active tasks do not depend on each other, so they are awaited together;
+    the announcement feed needs the profile's department.
+    """
+    tasks = Task.objects.filter(
+        crew__user=user, status__in=ACTIVE_TASK_STATUSES
+    ).order_by('deadline')[:DASHBOARD_TASK_LIMIT]
+
+    async def fetch_tasks():
+        return [task async for task in tasks]
+
+    profile, active_tasks = await asyncio.gather(
+        portal_profile_queryset(today, now).aget(user=user),
+        fetch_tasks(),
+    )
+    attendance, next_shift = _dashboard_objects(profile, today)
+    announcements = await adepartment_feed(profile.department_id, DASHBOARD_ANNOUNCEMENT_LIMIT)
+
+    return {
+        'profile': profile,
+        'attendance': attendance,
+        'active_tasks': active_tasks,
+        'next_shift': next_shift,
+        'announcements': announcements,
+    }
@@ -0,0 +1,144 @@
+"""
+Inspection of one stored document file: type sniffing, size limits, page
+count and a PNG thumbnail.
+
+This module runs in the ``document_jobs`` worker processes, so it imports
+nothing from Django and takes every limit as an argument. Thumbnails need
+Pillow for images and poppler's ``pdftoppm`` for PDFs; without them the
+other checks still run.
+"""
+import io
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+READ_SIZE = 1024 * 1024
+
+# Leading bytes of the formats crew upload, most specific first.
+SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'PK\x03\x04', 'application/zip'),
+]
+
+_PAGE = re.compile(rb'/Type\s{0,8}/Page(?![A-Za-z])')
+_COUNT = re.compile(rb'/Count\s{1,8}(\d{1,6})')
+_OVERLAP = 64
+
+
+def sniff(head):
+    """The MIME type named by the leading bytes ``head``, or ``None``."""
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def count_pdf_pages(file):
+    """
+    Pages in the PDF ``file``, read in chunks: the page objects when they
+    are stored plainly, else the largest ``/Count`` of the page tree (page
+    objects inside compressed object streams are not visible).
+    """
+    pages = largest_count = 0
+    tail = b''
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer = tail + chunk
+        # Matches starting in the last bytes are left for the next buffer,
+        # which sees what follows them.
+        limit = len(buffer) if not chunk else len(buffer) - _OVERLAP
+        pages += sum(1 for match in _PAGE.finditer(buffer) if match.start() < limit)
+        largest_count = max([largest_count, *(int(match.group(1)) for match in _COUNT.finditer(buffer))])
+        if not chunk:
+            break
+        tail = buffer[max(limit, 0):]
+    return pages or largest_count or None
+
+
+def _image_details(path, thumbnail_size):
+    try:
+        from PIL import Image
+    except ImportError:
+        return 1, None
+    with Image.open(path) as image:
+        pages = getattr(image, 'n_frames', 1)
+        image.thumbnail((thumbnail_size, thumbnail_size))
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, 'PNG')
+    return pages, output.getvalue()
+
+
+def _pdf_thumbnail(path, thumbnail_size):
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'page')
+        subprocess.run(
+            [pdftoppm, '-png', '-f', '1', '-l', '1', '-singlefile', '-scale-to', str(thumbnail_size), path, output],
+            check=True, capture_output=True, timeout=60,
+        )
+        with open(f'{output}.png', 'rb') as file:
+            return file.read()
+
+
+def inspect_file(path, original_name, max_size, allowed_types, max_pages, thumbnail_size):
+    """
+    Check the file at ``path``. Returns ``{'mime_type', 'size', 'page_count',
+    'thumbnail', 'flags'}`` where ``thumbnail`` is PNG bytes or ``None`` and
+    ``flags`` lists what a reviewer should look at.
+    """
+    result = {'mime_type': '', 'size': None, 'page_count': None, 'thumbnail': None, 'flags': []}
+    flags = result['flags']
+    try:
+        size = result['size'] = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            mime_type = sniff(file.read(16))
+            if mime_type == 'application/pdf' and size <= max_size:
+                file.seek(0)
+                result['page_count'] = count_pdf_pages(file)
+    except OSError:
+        flags.append('unreadable')
+        return result
+
+    result['mime_type'] = mime_type or ''
+    if size == 0:
+        flags.append('empty')
+    if size > max_size:
+        flags.append('too_large')
+    if mime_type not in allowed_types:
+        flags.append('type_not_allowed')
+    claimed_type = mimetypes.guess_type(original_name)[0]
+    if mime_type and claimed_type and claimed_type != mime_type:
+        flags.append('extension_mismatch')
+    if flags:
+        # Nothing more is worth decoding.
+        return result
+
+    try:
+        if mime_type == 'application/pdf':
+            if result['page_count'] is None:
+                flags.append('no_pages')
+            elif result['page_count'] > max_pages:
+                flags.append('too_many_pages')
+            else:
+                result['thumbnail'] = _pdf_thumbnail(path, thumbnail_size)
+        elif mime_type.startswith('image/'):
+            result['page_count'], result['thumbnail'] = _image_details(path, thumbnail_size)
+    except Exception:
+        # A file the decoders reject is for a human to look at.
+        flags.append('undecodable')
+    return result
@@ -0,0 +1,173 @@
+"""
+Background inspection of uploaded documents.
+
+Saving a document's file queues a ``DocumentJob`` (see ``signals``).
+``process_documents`` claims pending jobs in batches and runs
+``document_inspection.inspect_file`` on them in a bounded process pool, so
+decoding large scans never ties up a web worker. A job claimed by a worker
+that dies is reclaimed after ``DOCUMENT_JOB_TIMEOUT`` seconds and given up
+after ``DOCUMENT_JOB_ATTEMPTS`` tries.
+"""
+import multiprocessing
+from collections import Counter
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .document_inspection import inspect_file
+from .models import Document, DocumentJob
+from .workers import process_pool
+
+BATCH_SIZE = 20
+# Decoders can hold on to memory; recycle each process after this many files.
+MAX_TASKS_PER_CHILD = 50
+
+DEFAULT_ALLOWED_TYPES = ['application/pdf', 'image/jpeg', 'image/png', 'image/tiff']
+
+
+def _limits():
+    return (
+        getattr(settings, 'DOCUMENT_MAX_SIZE', 20 * 1024 * 1024),
+        getattr(settings, 'DOCUMENT_ALLOWED_TYPES', DEFAULT_ALLOWED_TYPES),
+        getattr(settings, 'DOCUMENT_MAX_PAGES', 50),
+        getattr(settings, 'DOCUMENT_THUMBNAIL_SIZE', 256),
+    )
+
+
+def queue_documents(documents):
+    """(Re)queue inspection of ``documents``, a queryset. Returns how many were queued."""
+    pks = list(documents.values_list('pk', flat=True))
+    with transaction.atomic():
+        queued = DocumentJob.objects.filter(document__in=pks).update(
+            status='pending', attempts=0, claimed_at=None, finished_at=None, error='',
+        )
+        existing = set(DocumentJob.objects.filter(document__in=pks).values_list('document_id', flat=True))
+        created = DocumentJob.objects.bulk_create([DocumentJob(document_id=pk) for pk in pks if pk not in existing])
+    return queued + len(created)
+
+
+def claim(batch_size=BATCH_SIZE):
+    """
+    Mark up to ``batch_size`` pending (or abandoned) jobs as running and
+    return them with their documents; abandoned jobs out of attempts fail.
+    """
+    now = timezone.now()
+    stale = Q(status='running', claimed_at__lt=now - timedelta(seconds=getattr(settings, 'DOCUMENT_JOB_TIMEOUT', 300)))
+    max_attempts = getattr(settings, 'DOCUMENT_JOB_ATTEMPTS', 3)
+    with transaction.atomic():
+        DocumentJob.objects.filter(stale, attempts__gte=max_attempts).update(
+            status='failed', finished_at=now, error='Abandoned by its worker too many times.',
+        )
+        pks = list(
+            DocumentJob.objects.filter(Q(status='pending') | stale).order_by('pk')
+            .select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size]
+        )
+        DocumentJob.objects.filter(pk__in=pks).update(status='running', claimed_at=now, attempts=F('attempts') + 1)
+    return list(DocumentJob.objects.filter(pk__in=pks).select_related('document'))
+
+
+def _finish(job, **fields):
+    # A job re-queued while it ran (its file replaced) is left for the next claim.
+    return DocumentJob.objects.filter(pk=job.pk, status='running', claimed_at=job.claimed_at).update(
+        finished_at=timezone.now(), **fields
+    )
+
+
+def record_result(job, result):
+    thumbnail = ''
+    if result['thumbnail']:
+        thumbnail = job.thumbnail.storage.save(
+            f"{job.thumbnail.field.upload_to}{job.document_id}.png", ContentFile(result['thumbnail'])
+        )
+    _finish(
+        job, status='done', error='', mime_type=result['mime_type'], size=result['size'],
+        page_count=result['page_count'], thumbnail=thumbnail, flags=result['flags'],
+    )
+    return 'flagged' if result['flags'] else 'passed'
+
+
+def record_failure(job, error):
+    failed = job.attempts >= getattr(settings, 'DOCUMENT_JOB_ATTEMPTS', 3)
+    _finish(job, status='failed' if failed else 'pending', error=f'{type(error).__name__}: {error}')
+    return 'failed' if failed else 'retried'
+
+
+def _arguments(job):
+    return (job.document.file.path, job.document.file.name, *_limits())
+
+
+class DocumentWorker:
+    """
+    Claims and inspects document jobs with a pool of ``workers`` processes,
+    or in this process when ``workers`` is 0. Use as a context manager.
+    """
+
+    def __init__(self, workers=None, batch_size=BATCH_SIZE):
+        self.workers = getattr(settings, 'DOCUMENT_WORKERS', 2) if workers is None else workers
+        self.batch_size = batch_size
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._shutdown()
+
+    def _shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def _pool(self):
+        if self.executor is None:
+            # Spawned children import only document_inspection, never Django.
+            self.executor = process_pool(
+                self.workers,
+                django=False,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=MAX_TASKS_PER_CHILD,
+            )
+        return self.executor
+
+    def run_once(self):
+        """Process one batch. Returns a ``Counter`` of outcomes: passed, flagged, retried, failed."""
+        outcomes = Counter()
+        jobs = claim(self.batch_size)
+        if not self.workers:
+            for job in jobs:
+                try:
+                    outcomes[record_result(job, inspect_file(*_arguments(job)))] += 1
+                except Exception as error:
+                    outcomes[record_failure(job, error)] += 1
+            return outcomes
+
+        futures = {}
+        for job in jobs:
+            try:
+                futures[self._pool().submit(inspect_file, *_arguments(job))] = job
+            except Exception as error:
+                outcomes[record_failure(job, error)] += 1
+        for future in as_completed(futures):
+            try:
+                outcomes[record_result(futures[future], future.result())] += 1
+            except Exception as error:
+                outcomes[record_failure(futures[future], error)] += 1
+                if isinstance(error, BrokenProcessPool):
+                    # A decoder crashed its process; start a fresh pool.
+                    self._shutdown()
+        return outcomes
+
+
+def pending_count():
+    return DocumentJob.objects.filter(status__in=['pending', 'running']).count()
+
+
+def unqueued_documents():
+    """Documents with a file but no inspection job."""
+    return Document.objects.exclude(file='').filter(job__isnull=True)
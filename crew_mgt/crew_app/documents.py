@@ -0,0 +1,228 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header
+
+CHUNK_SIZE = 64 * 1024
+
+_DIGEST_NAME = re.compile(r'/[0-9a-f]{2}/([0-9a-f]{64})(\.\w+)?$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class HashingUploadMixin:
+    """
+    Hash an upload's chunks as they stream in and attach the SHA-256 to the
+    resulting file as ``content_hash``, so storing it needs no second pass.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Before super(): the memory handler stops the chain from new_file().
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        passed_on = super().receive_data_chunk(raw_data, start)
+        if passed_on is None:
+            # This handler consumed the chunk.
+            self.hasher.update(raw_data)
+        return passed_on
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def content_hash(name):
+    """The SHA-256 a content-addressed file ``name`` was stored under, or ``None``."""
+    match = _DIGEST_NAME.search(name or '')
+    return match.group(1) if match else None
+
+
+def _digest(content):
+    hasher = hashlib.sha256()
+    for chunk in content.chunks(CHUNK_SIZE):
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage naming every file after the SHA-256 of its content, as
+    ``<upload_to>/<2 hex>/<sha256><ext>``: identical uploads share one file,
+    and a stored file never changes. Files may therefore be referenced by
+    several rows, so they are not deleted along with a row.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The name is chosen in _save() from the content.
+        return name
+
+    def _save(self, name, content):
+        # Uploads arrive hashed by the upload handlers above. Anything else is
+        # hashed here: in place when it is already on disk, otherwise while
+        # it is copied to a temporary file.
+        digest = getattr(content, 'content_hash', None)
+        if digest is None and hasattr(content, 'temporary_file_path'):
+            digest = _digest(content)
+        spooled = None
+        if digest is None:
+            spooled, digest = self._spool(content)
+
+        directory, original = posixpath.split(name)
+        extension = os.path.splitext(original)[1].lower()
+        name = posixpath.join(directory, digest[:2], f'{digest}{extension}')
+        path = self.path(name)
+        if os.path.exists(path):
+            if spooled is not None:
+                os.remove(spooled)
+            return name
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            # A rename when the upload's temporary file is on the same device.
+            file_move_safe(content.temporary_file_path(), path)
+        else:
+            if spooled is None:
+                spooled, _ = self._spool(content, digest)
+            os.replace(spooled, path)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        return name
+
+    def _spool(self, content, digest=None):
+        """
+        Copy ``content`` into a temporary file under the storage root, hashing
+        it on the way unless its ``digest`` is already known.
+        """
+        os.makedirs(self.location, exist_ok=True)
+        hasher = hashlib.sha256() if digest is None else None
+        descriptor, spooled = tempfile.mkstemp(dir=self.location, prefix='.upload-')
+        try:
+            with os.fdopen(descriptor, 'wb') as spool:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    spool.write(chunk)
+        except BaseException:
+            os.remove(spooled)
+            raise
+        return spooled, digest or hasher.hexdigest()
+
+
+def document_storage():
+    return ContentAddressedStorage()
+
+
+class _RangeFile:
+    """Read at most ``length`` bytes of ``file`` from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _byte_range(header, size):
+    """
+    ``(start, end)`` inclusive for a single-range ``Range`` header, ``None``
+    to serve the whole file, or ``False`` when the range is unsatisfiable.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: the last N bytes.
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def document_response(request, document, as_attachment=True):
+    """Serve ``document.file`` as a download named after the document's title."""
+    filename = f'{document.title}{os.path.splitext(document.file.name)[1]}'
+    return stored_file_response(request, document.file, filename, as_attachment)
+
+
+def stored_file_response(request, file, filename, as_attachment=True):
+    """
+    Serve the stored ``file``. With ``DOCUMENT_SENDFILE_HEADER`` set (e.g.
+    ``X-Accel-Redirect`` behind nginx), the web server sends the file and
+    handles ranges itself. Otherwise a ``FileResponse``, which WSGI servers
+    with ``wsgi.file_wrapper`` send with sendfile(), answering single
+    ``Range`` requests with 206. Content-addressed files never change, so
+    their hash is a strong ETag.
+    """
+    name = file.name
+    etag = content_hash(name)
+    etag = f'"{etag}"' if etag else None
+    if etag and request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={'ETag': etag})
+
+    sendfile_header = getattr(settings, 'DOCUMENT_SENDFILE_HEADER', None)
+    if sendfile_header:
+        response = HttpResponse(content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        response[sendfile_header] = getattr(settings, 'DOCUMENT_SENDFILE_PREFIX', '/protected/') + name
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    else:
+        storage = file.storage
+        file = storage.open(name, 'rb')
+        size = storage.size(name)
+        byte_range = None
+        if 'Range' in request.headers and request.headers.get('If-Range', etag) == etag:
+            byte_range = _byte_range(request.headers['Range'], size)
+        if byte_range is False:
+            file.close()
+            return HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+
+        if byte_range is None:
+            response = FileResponse(file, as_attachment=as_attachment, filename=filename)
+        else:
+            start, end = byte_range
+            file.seek(start)
+            # Up to the end of the file the real file object can still go
+            # through sendfile(); a shorter range is read in chunks.
+            body = file if end == size - 1 else _RangeFile(file, end - start + 1)
+            response = FileResponse(body, status=206, as_attachment=as_attachment, filename=filename)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    if etag:
+        response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
@@ -0,0 +1,154 @@
+import csv
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .models import Attendance, AttendanceSummary, Payroll, Task, LeaveRequest
+
+CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+# Spreadsheets evaluate a cell starting with one of these as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+CREW_COLUMNS = [
+    ('Crew ID', 'crew__crew_id'),
+    ('First name', 'crew__first_name'),
+    ('Last name', 'crew__last_name'),
+    ('Department', 'crew__department__name'),
+]
+
+
+def _cell(value):
+    if isinstance(value, timedelta):
+        return f'{value.total_seconds() / 3600:.2f}'
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+# Each export: base queryset, the field its date range applies to, and the
+# (header, lookup) columns read with values_list().
+EXPORTS = {
+    'attendance': {
+        'queryset': lambda: Attendance.objects.with_hours(),
+        'date_field': 'date',
+        'columns': CREW_COLUMNS + [
+            ('Date', 'date'),
+            ('Clock in', 'clock_in'),
+            ('Clock out', 'clock_out'),
+            ('Hours worked', 'worked'),
+        ],
+    },
+    'attendance_summary': {
+        'queryset': lambda: AttendanceSummary.objects.all(),
+        'date_field': 'month',
+        'columns': CREW_COLUMNS + [
+            ('Month', 'month'),
+            ('Days present', 'days_present'),
+            ('Hours worked', 'total_worked'),
+            ('Late arrivals', 'late_arrivals'),
+            ('Missing clock-outs', 'missing_clock_outs'),
+        ],
+    },
+    'payroll': {
+        'queryset': lambda: Payroll.objects.all(),
+        'date_field': 'month',
+        'columns': CREW_COLUMNS + [
+            ('Month', 'month'),
+            ('Basic salary', 'basic_salary'),
+            ('Overtime pay', 'overtime_pay'),
+            ('Deductions', 'deductions'),
+            ('Net salary', 'net_salary'),
+            ('Paid', 'payment_status'),
+            ('Payment date', 'payment_date'),
+        ],
+    },
+    'tasks': {
+        'queryset': lambda: Task.objects.all(),
+        'date_field': 'deadline__date',
+        'columns': CREW_COLUMNS + [
+            ('Title', 'title'),
+            ('Status', 'status'),
+            ('Deadline', 'deadline'),
+            ('Created', 'created_at'),
+            ('Updated', 'updated_at'),
+        ],
+    },
+    'leave': {
+        'queryset': lambda: LeaveRequest.objects.all(),
+        'date_field': 'start_date',
+        'columns': CREW_COLUMNS + [
+            ('Start date', 'start_date'),
+            ('End date', 'end_date'),
+            ('Reason', 'reason'),
+            ('Status', 'status'),
+            ('Requested', 'created_at'),
+        ],
+    },
+}
+
+
+class Echo:
+    """A file-like object whose ``write`` hands the value straight back."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(kind, start=None, end=None, department=None):
+    """The rows of export ``kind`` filtered by an inclusive date range and department."""
+    spec = EXPORTS[kind]
+    queryset = spec['queryset']()
+    if start is not None:
+        queryset = queryset.filter(**{f"{spec['date_field']}__gte": start})
+    if end is not None:
+        queryset = queryset.filter(**{f"{spec['date_field']}__lte": end})
+    if department is not None:
+        queryset = queryset.filter(crew__department=department)
+    return queryset
+
+
+def _rows(kind, queryset):
+    columns = EXPORTS[kind]['columns']
+    header = [header for header, _ in columns]
+    return header, queryset.order_by('pk').values_list(*[lookup for _, lookup in columns])
+
+
+def stream_rows(kind, queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield CSV lines for ``queryset`` using a server-side cursor, so memory
+    stays flat regardless of the number of rows.
+    """
+    writer = csv.writer(Echo())
+    header, rows = _rows(kind, queryset)
+    yield writer.writerow(header)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield writer.writerow([_cell(value) for value in row])
+
+
+async def astream_rows(kind, queryset, chunk_size=CHUNK_SIZE):
+    """
+    ``stream_rows`` for ASGI: each chunk of lines is read in the database
+    thread and sent from the event loop, one chunk at a time.
+    """
+    lines = stream_rows(kind, queryset, chunk_size)
+    next_chunk = sync_to_async(lambda: ''.join(islice(lines, chunk_size)))
+    try:
+        while chunk := await next_chunk():
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
+
+
+def csv_response(request, kind, queryset, filename):
+    # Under ASGI a synchronous iterator would be read into memory in full
+    # before the first byte is sent.
+    stream = astream_rows if isinstance(request, ASGIRequest) else stream_rows
+    response = StreamingHttpResponse(stream(kind, queryset), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,6 +1,10 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
-from .models import User, CrewProfile, Document
+from .models import User, CrewProfile, Department, Document, Shift, canonical_email
+from .coverage import MAX_CALENDAR_DAYS
+from .search import KINDS as SEARCH_KINDS
+from .scheduling import shift_conflict
 
 class CrewRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={
@@ -20,6 +24,10 @@ class CrewRegistrationForm(UserCreationForm):
         model = User
         fields = ('email', 'password1', 'password2')
 
+    def clean_email(self):
+        # Stored lowercased, so uniqueness is checked on that form.
+        return canonical_email(self.cleaned_data['email'])
+
 class CrewProfileForm(forms.ModelForm):
     date_of_birth = forms.DateField(widget=forms.DateInput(attrs={
         'class': 'form-control',
@@ -46,7 +54,72 @@ class DocumentUploadForm(forms.ModelForm):
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'file': forms.FileInput(attrs={'class': 'form-control'}),
         }
+
+    def clean_file(self):
+        # Refused here rather than left for inspection to flag.
+        file = self.cleaned_data['file']
+        max_size = getattr(settings, 'DOCUMENT_MAX_SIZE', None)
+        if max_size and file.size > max_size:
+            raise forms.ValidationError(f'Files may be at most {max_size // (1024 * 1024)} MB.')
+        return file
         
+class RosterUploadForm(forms.Form):
+    roster = forms.FileField(help_text='CSV or Excel (.xlsx) roster file.')
+    status = forms.ChoiceField(choices=CrewProfile.STATUS_CHOICES, initial='pending')
+
+class ExportFilterForm(forms.Form):
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    department = forms.ModelChoiceField(queryset=Department.objects.all(), required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+
+        if start and end and start > end:
+            raise forms.ValidationError("End date must be after start date")
+        return cleaned_data
+
+class ShiftForm(forms.ModelForm):
+    class Meta:
+        model = Shift
+        fields = ['crew', 'start_time', 'end_time', 'description']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        crew = cleaned_data.get('crew')
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+
+        if crew and start_time and end_time:
+            conflict = shift_conflict(crew, start_time, end_time, exclude_pk=self.instance.pk)
+            if conflict:
+                raise forms.ValidationError(conflict)
+        return cleaned_data
+
+class CoverageFilterForm(forms.Form):
+    start = forms.DateField()
+    end = forms.DateField()
+    group_by = forms.ChoiceField(choices=[('department', 'Department'), ('position', 'Position')], required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start = cleaned_data.get('start')
+        end = cleaned_data.get('end')
+
+        if start and end:
+            if start > end:
+                raise forms.ValidationError("End date must be after start date")
+            if (end - start).days >= MAX_CALENDAR_DAYS:
+                raise forms.ValidationError(f"The calendar covers at most {MAX_CALENDAR_DAYS} days")
+        cleaned_data['group_by'] = cleaned_data.get('group_by') or 'department'
+        return cleaned_data
+
+class SearchForm(forms.Form):
+    q = forms.CharField(max_length=100)
+    kind = forms.MultipleChoiceField(choices=[(kind, kind) for kind in SEARCH_KINDS], required=False)
+
 class LoginForm(forms.Form):
     email = forms.EmailField(widget=forms.EmailInput(attrs={
         'class': 'form-control',
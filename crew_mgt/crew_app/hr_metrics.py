@@ -0,0 +1,200 @@
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import CrewProfile, Department, DepartmentMetrics, LeaveRequest, Payroll, Performance, Task
+
+ALL = object()
+
+_pending = threading.local()
+
+
+def _scope(department_ids, prefix=''):
+    """Filter on ``{prefix}department`` matching ``department_ids``, where ``None`` is "no department"."""
+    if department_ids is None:
+        return Q()
+    scope = Q(**{f'{prefix}department_id__in': [pk for pk in department_ids if pk is not None]})
+    if None in department_ids:
+        scope |= Q(**{f'{prefix}department__isnull': True})
+    return scope
+
+
+def _metrics_rows(department_ids):
+    now = timezone.now()
+    rows = {}
+
+    def row(department_id):
+        return rows.setdefault(department_id, {
+            'pending_crew': 0, 'approved_crew': 0, 'rejected_crew': 0, 'open_leave': 0,
+            'overdue_tasks': 0, 'payroll_month': None, 'payroll_crew': 0,
+            'payroll_total': Decimal('0.00'), 'payroll_unpaid': Decimal('0.00'),
+            'rating_total': 0, 'rating_count': 0,
+        })
+
+    for department_id, pending, approved, rejected in CrewProfile.objects.filter(
+        _scope(department_ids)
+    ).values('department').annotate(
+        pending=Count('pk', filter=Q(recruitment_status='pending')),
+        approved=Count('pk', filter=Q(recruitment_status='approved')),
+        rejected=Count('pk', filter=Q(recruitment_status='rejected')),
+    ).order_by().values_list('department', 'pending', 'approved', 'rejected'):
+        row(department_id).update(pending_crew=pending, approved_crew=approved, rejected_crew=rejected)
+
+    for department_id, total in LeaveRequest.objects.filter(
+        _scope(department_ids, 'crew__'), status='pending'
+    ).values('crew__department').annotate(total=Count('pk')).order_by().values_list('crew__department', 'total'):
+        row(department_id)['open_leave'] = total
+
+    for department_id, total in Task.objects.filter(
+        _scope(department_ids, 'crew__'), deadline__lt=now
+    ).exclude(status='completed').values('crew__department').annotate(
+        total=Count('pk')
+    ).order_by().values_list('crew__department', 'total'):
+        row(department_id)['overdue_tasks'] = total
+
+    # Grouped by month too; months are few, and only each department's latest is kept.
+    for department_id, month, crew, total, unpaid in Payroll.objects.filter(
+        _scope(department_ids, 'crew__')
+    ).values('crew__department', 'month').annotate(
+        crew=Count('pk'),
+        total=Sum('net_salary'),
+        unpaid=Sum('net_salary', filter=Q(payment_status=False)),
+    ).order_by('month').values_list('crew__department', 'month', 'crew', 'total', 'unpaid'):
+        row(department_id).update(
+            payroll_month=month, payroll_crew=crew,
+            payroll_total=total or Decimal('0.00'), payroll_unpaid=unpaid or Decimal('0.00'),
+        )
+
+    for department_id, total, count in Performance.objects.filter(
+        _scope(department_ids, 'crew__')
+    ).values('crew__department').annotate(
+        total=Sum('rating'), count=Count('pk')
+    ).order_by().values_list('crew__department', 'total', 'count'):
+        row(department_id).update(rating_total=total, rating_count=count)
+
+    return rows
+
+
+def refresh_metrics(department_ids=None):
+    """
+    Recompute the ``DepartmentMetrics`` of ``department_ids`` (``None`` in
+    the list stands for crew without a department), or of every department
+    when omitted. Runs one GROUP BY per source table over the affected
+    departments only. Returns the number of rows written.
+    """
+    if department_ids is not None:
+        department_ids = set(department_ids)
+        if not department_ids:
+            return 0
+    departments = Department.objects.all()
+    if department_ids is not None:
+        departments = departments.filter(pk__in=[pk for pk in department_ids if pk is not None])
+    known = set(departments.values_list('pk', flat=True))
+
+    rows = _metrics_rows(department_ids)
+    now = timezone.now()
+    metrics = [
+        DepartmentMetrics(department_id=department_id, refreshed_at=now, **rows.get(department_id, {}))
+        for department_id in known
+    ]
+    # Crew without a department only get a row while there is something to show.
+    if (department_ids is None or None in department_ids) and None in rows:
+        metrics.append(DepartmentMetrics(department_id=None, refreshed_at=now, **rows[None]))
+
+    with transaction.atomic():
+        stale = DepartmentMetrics.objects.all()
+        if department_ids is not None:
+            stale = stale.filter(_scope(department_ids))
+        stale.delete()
+        DepartmentMetrics.objects.bulk_create(metrics)
+    return len(metrics)
+
+
+def _mark(department_ids):
+    rows = DepartmentMetrics.objects.all()
+    if department_ids is not ALL:
+        rows = rows.filter(_scope(department_ids))
+    marked = rows.update(stale=True)
+    if department_ids is ALL:
+        missing = set(Department.objects.filter(metrics__isnull=True).values_list('pk', flat=True))
+    elif marked < len(department_ids):
+        # Departments nobody has written to before get a stale row to find.
+        missing = set(department_ids) - set(rows.values_list('department_id', flat=True))
+        missing = set(Department.objects.filter(pk__in=missing).values_list('pk', flat=True)) | (missing & {None})
+    else:
+        return
+    DepartmentMetrics.objects.bulk_create([
+        DepartmentMetrics(department_id=department_id, refreshed_at=timezone.now(), stale=True)
+        for department_id in missing
+    ])
+
+
+def _flush():
+    department_ids = getattr(_pending, 'department_ids', None)
+    _pending.department_ids = None
+    if department_ids is not None:
+        _mark(ALL if ALL in department_ids else department_ids)
+
+
+def mark_stale(department_ids=ALL):
+    """
+    Mark the metrics of ``department_ids`` stale once the current transaction
+    commits (immediately outside one). A write costs one UPDATE however large
+    its department; ``refresh_stale`` recomputes the marked rows later, so
+    many writes to a department are refreshed once.
+    """
+    pending = getattr(_pending, 'department_ids', None)
+    if pending is None:
+        pending = _pending.department_ids = set()
+    if department_ids is ALL:
+        pending.add(ALL)
+    else:
+        pending.update(department_ids)
+    # A rolled back transaction drops its callback but not the pending ids,
+    # so register on every call; the first callback to run flushes them all.
+    transaction.on_commit(_flush)
+
+
+def refresh_stale():
+    """Recompute the metrics marked stale. Returns the number of rows written."""
+    department_ids = set(DepartmentMetrics.objects.filter(stale=True).values_list('department_id', flat=True))
+    return refresh_metrics(department_ids)
+
+
+def dashboard_metrics():
+    """
+    The HR dashboard figures, read from ``DepartmentMetrics`` in one query,
+    after recomputing any stale departments. Payroll totals cover the most
+    recent payroll month.
+    """
+    metrics = DepartmentMetrics.objects.select_related('department').order_by('department__name')
+    departments = list(metrics)
+    stale = {department.department_id for department in departments if department.stale}
+    if stale:
+        refresh_metrics(stale)
+        departments = list(metrics.all())
+    # Crew without a department sort last.
+    departments.sort(key=lambda metrics: metrics.department_id is None)
+
+    totals = {field: sum(getattr(metrics, field) for metrics in departments) for field in (
+        'pending_crew', 'approved_crew', 'rejected_crew', 'open_leave', 'overdue_tasks',
+        'rating_total', 'rating_count',
+    )}
+    payroll_month = max((m.payroll_month for m in departments if m.payroll_month), default=None)
+    current = [m for m in departments if payroll_month and m.payroll_month == payroll_month]
+    totals.update(
+        headcount=totals['pending_crew'] + totals['approved_crew'] + totals['rejected_crew'],
+        average_rating=totals['rating_total'] / totals['rating_count'] if totals['rating_count'] else None,
+        payroll_month=payroll_month,
+        payroll_crew=sum(m.payroll_crew for m in current),
+        payroll_total=sum((m.payroll_total for m in current), Decimal('0.00')),
+        payroll_unpaid=sum((m.payroll_unpaid for m in current), Decimal('0.00')),
+    )
+    return {
+        'departments': departments,
+        'totals': totals,
+        'refreshed_at': min((metrics.refreshed_at for metrics in departments), default=None),
+    }
@@ -0,0 +1,200 @@
+"""
+Per-request SQL, template and cache measurements.
+
+``RequestMetricsMiddleware`` opens a ``RequestMetrics`` for each request in
+a context variable. A database execute wrapper installed on every
+connection, the ``InstrumentedDjangoTemplates`` backend and
+``crew_app.cache`` add to it, including from the threads async views run
+their queries in. Finished requests are aggregated per view into
+process-local counters and histograms, served in the Prometheus text format
+by ``render_metrics``.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = contextvars.ContextVar('crew_request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache = Counter()
+        self.statements = Counter()
+
+    def most_repeated(self):
+        """``(sql, count)`` of the statement run most often, a likely N+1."""
+        return self.statements.most_common(1)[0] if self.statements else (None, 0)
+
+
+def start():
+    """Begin measuring the current request; pass the result to ``stop``."""
+    return _current.set(RequestMetrics())
+
+
+def stop(token):
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def record_cache(outcome):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache[outcome] += 1
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_time += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.statements[sql] += 1
+
+
+def install(connection):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def install_on_open_connections():
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+
+
+@receiver(connection_created, dispatch_uid='crew_request_metrics')
+def _install_on_new_connection(sender, connection, **kwargs):
+    install(connection)
+
+
+class InstrumentedTemplate:
+    """A backend template whose ``render()`` time counts towards the request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+# Aggregates for the /metrics endpoint, per process.
+
+_counters = Counter()
+_histograms = {}
+_lock = threading.Lock()
+
+
+def _observe(name, labels, value, buckets):
+    histogram = _histograms.get((name, labels))
+    if histogram is None:
+        histogram = _histograms[name, labels] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            histogram['buckets'][index] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+def record_request(view, method, status, metrics, duration, over_budget):
+    with _lock:
+        _counters['crew_http_requests_total', (('view', view), ('method', method), ('status', str(status)))] += 1
+        _counters['crew_db_queries_total', (('view', view),)] += metrics.queries
+        _counters['crew_db_query_seconds_total', (('view', view),)] += metrics.sql_time
+        _counters['crew_template_render_seconds_total', (('view', view),)] += metrics.template_time
+        for outcome, count in metrics.cache.items():
+            _counters['crew_cache_requests_total', (('view', view), ('outcome', outcome))] += count
+        if over_budget:
+            _counters['crew_query_budget_exceeded_total', (('view', view),)] += 1
+        _observe('crew_http_request_duration_seconds', (('view', view),), duration, DURATION_BUCKETS)
+        _observe('crew_db_queries_per_request', (('view', view),), metrics.queries, QUERY_BUCKETS)
+
+
+def reset_metrics():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+METRIC_HELP = {
+    'crew_http_requests_total': ('counter', 'Requests served, by view, method and status.'),
+    'crew_db_queries_total': ('counter', 'SQL statements executed, by view.'),
+    'crew_db_query_seconds_total': ('counter', 'Time spent executing SQL, by view.'),
+    'crew_template_render_seconds_total': ('counter', 'Time spent rendering templates, by view.'),
+    'crew_cache_requests_total': ('counter', 'Portal fragment cache lookups, by view and outcome.'),
+    'crew_query_budget_exceeded_total': ('counter', 'Requests over their query budget, by view.'),
+    'crew_http_request_duration_seconds': ('histogram', 'Request latency, by view.'),
+    'crew_db_queries_per_request': ('histogram', 'SQL statements per request, by view.'),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name, labels, value):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels)
+        return f'{name}{{{label_text}}} {value}'
+    return f'{name} {value}'
+
+
+def render_metrics():
+    """All aggregates of this process in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items())
+        histograms = [(key, {**value, 'buckets': list(value['buckets'])}) for key, value in histograms]
+
+    lines = []
+    for name, (kind, help_text) in METRIC_HELP.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == 'counter':
+            lines += [_series(name, labels, value) for (metric, labels), value in counters if metric == name]
+            continue
+        buckets = DURATION_BUCKETS if name == 'crew_http_request_duration_seconds' else QUERY_BUCKETS
+        for (metric, labels), histogram in histograms:
+            if metric != name:
+                continue
+            for bound, count in zip(buckets, histogram['buckets']):
+                lines.append(_series(f'{name}_bucket', (*labels, ('le', bound)), count))
+            lines.append(_series(f'{name}_bucket', (*labels, ('le', '+Inf')), histogram['count']))
+            lines.append(_series(f'{name}_sum', labels, histogram['sum']))
+            lines.append(_series(f'{name}_count', labels, histogram['count']))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,102 @@
+import random
+import secrets
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import override_settings
+
+from crew_app.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Authenticate many concurrent logins, a share of them with wrong '
+        'passwords or unknown emails, and report throughput, latency and '
+        'queries per attempt. The accounts are created for the run, with a '
+        'random password that is never stored, and deleted after it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Benchmark accounts to create.')
+        parser.add_argument('--attempts', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--failures', type=float, default=0.2, help='Share of attempts that should fail.')
+        parser.add_argument(
+            '--with-model-backend', action='store_true',
+            help="Also run with Django's ModelBackend listed first, for comparison.",
+        )
+
+    def handle(self, *args, **options):
+        password = secrets.token_urlsafe(16)
+        email = f'bench-login-{secrets.token_hex(4)}-{{}}@example.com'
+        encoded = make_password(password)
+        User.objects.bulk_create([
+            User(username=email.format(i), email=email.format(i), password=encoded, is_crew=True)
+            for i in range(options['users'])
+        ])
+        try:
+            attempts = self._attempts(email, password, options)
+            self.stdout.write(self._run('configured backends', attempts, options['threads']))
+            if options['with_model_backend']:
+                backends = ['django.contrib.auth.backends.ModelBackend', *settings.AUTHENTICATION_BACKENDS]
+                with override_settings(AUTHENTICATION_BACKENDS=backends):
+                    self.stdout.write(self._run('ModelBackend first', attempts, options['threads']))
+        finally:
+            User.objects.filter(email__in=[email.format(i) for i in range(options['users'])]).delete()
+
+    def _attempts(self, email, password, options):
+        rng = random.Random(0)
+        attempts = []
+        for _ in range(options['attempts']):
+            address = email.format(rng.randrange(options['users']))
+            if rng.random() < options['failures']:
+                # Half wrong passwords, half unknown accounts.
+                if rng.random() < 0.5:
+                    attempts.append((address, 'wrong-password'))
+                else:
+                    attempts.append((address.replace('bench', 'nobody'), password))
+            else:
+                attempts.append((address.upper(), password))
+        return attempts
+
+    def _run(self, label, attempts, threads):
+        queries = []
+        lock = threading.Lock()
+
+        def attempt(credentials):
+            executed = 0
+
+            def count(execute, *args):
+                nonlocal executed
+                executed += 1
+                return execute(*args)
+
+            close_old_connections()
+            started = time.perf_counter()
+            with connection.execute_wrapper(count):
+                user = authenticate(None, username=credentials[0], password=credentials[1])
+            latency = time.perf_counter() - started
+            with lock:
+                queries.append(executed)
+            return latency, user is not None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(attempt, attempts))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _ in results)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        return (
+            f'{label}: {len(latencies) / elapsed:.1f} logins/s, '
+            f'p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, '
+            f'{statistics.mean(queries):.2f} queries/attempt, '
+            f'{sum(ok for _, ok in results)} of {len(results)} succeeded'
+        )
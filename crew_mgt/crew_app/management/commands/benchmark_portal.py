@@ -0,0 +1,122 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from crew_app import cache as crew_cache
+from crew_app.models import CrewProfile
+from crew_app.seed import seed_dataset
+
+PORTAL_URLS = ['crew_portal', 'profile', 'tasks', 'attendance', 'shift']
+
+
+def _summary(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    return (
+        f'{label}: {len(latencies) / elapsed:.0f} req/s, '
+        f'p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the portal views through the WSGI handler with a pool of '
+        'worker threads and through the ASGI handler with concurrent '
+        'coroutines, and compare throughput and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-crew', type=int, default=0, help='Crew profiles to seed first.')
+        parser.add_argument('--users', type=int, default=50, help='Distinct crew members to log in as.')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads.')
+        parser.add_argument('--concurrency', type=int, default=100, help='Concurrent ASGI requests.')
+        parser.add_argument('--cold', action='store_true', help='Invalidate cached fragments before every request.')
+
+    def handle(self, *args, **options):
+        # The test clients send 'testserver' as the host, as the test runner allows.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self._benchmark(options)
+
+    def _benchmark(self, options):
+        if options['seed_crew']:
+            seed_dataset(options['seed_crew'], stdout=self.stdout)
+
+        profiles = list(
+            CrewProfile.objects.filter(recruitment_status='approved')
+            .select_related('user').order_by('pk')[:options['users']]
+        )
+        if not profiles:
+            raise CommandError('No approved crew; run with --seed-crew N.')
+        paths = [reverse(name) for name in PORTAL_URLS]
+        jobs = list(islice(cycle([(profile, path) for path in paths for profile in profiles]), options['requests']))
+        self.cold = options['cold']
+
+        clients = {}
+        for profile in profiles:
+            client = Client()
+            client.force_login(profile.user)
+            clients[profile.pk] = client
+        async_clients = {}
+        for profile in profiles:
+            client = AsyncClient()
+            client.cookies = clients[profile.pk].cookies
+            async_clients[profile.pk] = client
+
+        self.stdout.write(self._run_wsgi(jobs, clients, options['threads']))
+        self.stdout.write(self._run_asgi(jobs, async_clients, options['concurrency']))
+
+    def _request(self, client, profile, path):
+        if self.cold:
+            crew_cache.invalidate([profile.crew_id])
+        started = time.perf_counter()
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path} returned {response.status_code}')
+        return time.perf_counter() - started
+
+    def _run_wsgi(self, jobs, clients, threads):
+        def run(job):
+            profile, path = job
+            try:
+                return self._request(clients[profile.pk], profile, path)
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(run, jobs))
+        return _summary(f'WSGI ({threads} threads)', latencies, time.perf_counter() - started)
+
+    def _run_asgi(self, jobs, clients, concurrency):
+        async def run(job, semaphore):
+            profile, path = job
+            async with semaphore:
+                # One sync thread per request, as ASGIHandler does.
+                async with ThreadSensitiveContext():
+                    if self.cold:
+                        crew_cache.invalidate([profile.crew_id])
+                    started = time.perf_counter()
+                    response = await clients[profile.pk].get(path)
+                    if response.status_code != 200:
+                        raise CommandError(f'{path} returned {response.status_code}')
+                    return time.perf_counter() - started
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(run(job, semaphore) for job in jobs))
+
+        started = time.perf_counter()
+        latencies = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        connections.close_all()
+        return _summary(f'ASGI ({concurrency} concurrent)', latencies, elapsed)
@@ -0,0 +1,208 @@
+import json
+import logging
+import secrets
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+
+from crew_app import urls as crew_urls
+from crew_app.models import CrewProfile, User
+
+# Served without signing in.
+ANONYMOUS = {'home', 'register', 'login', 'crew_login', 'metrics'}
+# Ending the session would sign the benchmark out.
+SKIPPED = {'logout'}
+
+
+def _percentile(latencies, fraction):
+    latencies = sorted(latencies)
+    return latencies[max(int(len(latencies) * fraction + 0.5) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time GET requests to every URL in crew_app/urls.py and every admin '
+        'changelist, recording query counts and p50/p95 latency, and compare '
+        'them with a stored baseline. POST-only views are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per URL.')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare with.')
+        parser.add_argument('--save', help='Write this run\'s results to this JSON file.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Fractional p50 slowdown reported as a regression (default 0.2).',
+        )
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request.')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on any regression.')
+
+    def handle(self, *args, **options):
+        # The test client sends 'testserver' as the host, as the test runner allows.
+        # POST-only views answer the probing GET with a logged 405.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = self._benchmark(options)
+        finally:
+            request_logger.setLevel(level)
+
+        meta = {
+            'requests': options['requests'],
+            'cold': options['cold'],
+            'crew': CrewProfile.objects.count(),
+            'database': connection.vendor,
+        }
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump({'meta': meta, 'results': results}, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Saved results to {options["save"]}.')
+        if options['baseline']:
+            regressions = self._compare(results, options['baseline'], options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regression(s): {", ".join(regressions)}')
+
+    def _clients(self):
+        profile = (
+            CrewProfile.objects.filter(recruitment_status='approved').select_related('user').order_by('pk').first()
+        )
+        if profile is None:
+            raise CommandError('No approved crew; run seed_data first.')
+        # An account for this run only; it cannot sign in and is deleted after.
+        username = f'benchmark-admin-{secrets.token_hex(4)}'
+        hr = User.objects.create(
+            username=username, email=f'{username}@example.com', password=make_password(None),
+            is_staff=True, is_superuser=True, is_hr=True,
+        )
+        clients = {'anonymous': Client(), 'crew': Client(), 'hr': Client()}
+        clients['crew'].force_login(profile.user)
+        clients['hr'].force_login(hr)
+        return profile, clients, hr
+
+    def _targets(self, profile):
+        """``(label, role, path, params)`` for every URL worth timing."""
+        today = date.today()
+        task = profile.tasks.order_by('pk').first()
+        document = profile.documents.order_by('pk').first()
+        kwargs = {
+            'export_csv': {'kind': 'attendance'},
+            'update_task': {'task_id': task.pk} if task else None,
+            'document_download': {'document_id': document.pk} if document else None,
+            'document_thumbnail': {'document_id': document.pk} if document else None,
+        }
+        params = {
+            'search': {'q': profile.last_name},
+            'coverage_calendar': {'start': (today - timedelta(days=30)).isoformat(), 'end': today.isoformat()},
+        }
+
+        targets = []
+        for pattern in crew_urls.urlpatterns:
+            name = pattern.name
+            if name in SKIPPED:
+                continue
+            if name is None:
+                path = f'/{pattern.pattern}'
+                name = path
+            else:
+                try:
+                    path = reverse(name, kwargs=kwargs.get(name) or {})
+                except NoReverseMatch:
+                    self.stdout.write(f'{name}: skipped, no sample object to link to')
+                    continue
+            if name in ANONYMOUS or pattern.name is None:
+                role = 'anonymous'
+            elif str(pattern.pattern).startswith('portal/') or name in ('recruitment_status', 'document_download', 'document_thumbnail'):
+                role = 'crew'
+            else:
+                role = 'hr'
+            targets.append((name, role, path, params.get(name, {})))
+
+        for model in admin.site._registry:
+            opts = model._meta
+            targets.append((
+                f'admin:{opts.app_label}_{opts.model_name}_changelist', 'hr',
+                reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'), {},
+            ))
+        return targets
+
+    def _benchmark(self, options):
+        profile, clients, hr = self._clients()
+        try:
+            return self._measure(profile, clients, options)
+        finally:
+            hr.delete()
+
+    def _measure(self, profile, clients, options):
+        results = {}
+        self.stdout.write(f'{"URL":<52} {"status":>6} {"queries":>7} {"p50 ms":>8} {"p95 ms":>8}')
+        for label, role, path, params in self._targets(profile):
+            client = clients[role]
+            response = client.get(path, params)  # warm-up
+            response.close()
+            if response.status_code == 405:
+                self.stdout.write(f'{label:<52} skipped, not served over GET')
+                continue
+
+            latencies = []
+            for _ in range(options['requests']):
+                if options['cold']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.get(path, params)
+                    latencies.append(time.perf_counter() - started)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                    response.close()
+            results[label] = {
+                'status': response.status_code,
+                'queries': len(queries),
+                'p50_ms': round(statistics.median(latencies) * 1000, 2),
+                'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+            }
+            row = results[label]
+            self.stdout.write(f'{label:<52} {row["status"]:>6} {row["queries"]:>7} {row["p50_ms"]:>8} {row["p95_ms"]:>8}')
+        return results
+
+    def _compare(self, results, path, tolerance):
+        with open(path) as file:
+            baseline = json.load(file)['results']
+
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared with {path}'))
+        for label, row in results.items():
+            before = baseline.get(label)
+            if before is None:
+                self.stdout.write(f'{label}: new')
+                continue
+            # p95 over a few requests is mostly noise; p50 and queries decide.
+            slower = row['p50_ms'] > before['p50_ms'] * (1 + tolerance)
+            more_queries = row['queries'] > before['queries']
+            line = (
+                f'{label}: queries {before["queries"]} -> {row["queries"]}, '
+                f'p50 {before["p50_ms"]} -> {row["p50_ms"]} ms, p95 {before["p95_ms"]} -> {row["p95_ms"]} ms'
+            )
+            if slower or more_queries or row['status'] != before['status']:
+                regressions.append(label)
+                self.stdout.write(self.style.ERROR(f'{line} REGRESSION'))
+            elif row['p50_ms'] < before['p50_ms'] * (1 - tolerance) or row['queries'] < before['queries']:
+                self.stdout.write(self.style.SUCCESS(f'{line} improved'))
+            else:
+                self.stdout.write(line)
+        for label in baseline.keys() - results.keys():
+            self.stdout.write(f'{label}: no longer measured')
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('No regressions.'))
+        return regressions
@@ -0,0 +1,105 @@
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from crew_app import clock
+from crew_app.models import Attendance, CrewProfile, User
+
+
+def _throwaway_crew(count):
+    """Approved crew members that cannot sign in, for this run only."""
+    run = uuid.uuid4().hex[:8]
+    User.objects.bulk_create([
+        User(username=f'clock-load-{run}-{n}', email=f'clock-load-{run}-{n}@example.com',
+             password=make_password(None), is_crew=True)
+        for n in range(count)
+    ])
+    users = list(User.objects.filter(username__startswith=f'clock-load-{run}-').order_by('pk'))
+    CrewProfile.objects.bulk_create([
+        CrewProfile(
+            user=user, first_name='Load', last_name=f'Test {n}', phone_number='0',
+            date_of_birth=date(1990, 1, 1), address='-', recruitment_status='approved',
+        )
+        for n, user in enumerate(users)
+    ])
+    return users, list(CrewProfile.objects.filter(user__in=users).order_by('pk'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent, duplicated clock-in requests at the '
+        'configured database and check that every crew member ends up with '
+        'exactly one attendance row carrying the first clock-in. The crew '
+        'are created for the run and deleted, with their attendance, after it; '
+        'existing crew and attendance are never touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crew', type=int, default=200, help='Throwaway crew members to clock.')
+        parser.add_argument('--duplicates', type=int, default=3, help='Submissions per crew member per action.')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--batch', type=int, default=0, help='Send events in kiosk batches of this size instead.')
+
+    def handle(self, *args, **options):
+        if options['crew'] < 1:
+            raise CommandError('--crew must be at least 1.')
+        users, profiles = _throwaway_crew(options['crew'])
+        try:
+            self._run(profiles, options)
+        finally:
+            # Cascades to the profiles and their attendance.
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def _run(self, profiles, options):
+        day = timezone.localdate()
+        jobs = [(profile, 'in') for profile in profiles for _ in range(options['duplicates'])]
+        random.shuffle(jobs)
+        outcomes = []
+        outcomes_lock = threading.Lock()
+
+        def run(job_slice):
+            close_old_connections()
+            try:
+                if options['batch']:
+                    events = [(profile.crew_id, action, timezone.now()) for profile, action in job_slice]
+                    statuses = clock.record_events(events)
+                else:
+                    statuses = [
+                        clock.clock_in(profile, day, timezone.now()) for profile, _ in job_slice
+                    ]
+                with outcomes_lock:
+                    outcomes.extend(statuses)
+            finally:
+                close_old_connections()
+
+        size = options['batch'] or 1
+        slices = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(run, slices))
+        elapsed = time.perf_counter() - started
+
+        rows = Attendance.objects.filter(crew__in=profiles, date=day)
+        problems = []
+        if rows.count() != len(profiles):
+            problems.append(f'{rows.count()} attendance rows for {len(profiles)} crew members')
+        if rows.filter(clock_in__isnull=True).exists():
+            problems.append('rows without a clock-in')
+        if outcomes.count(clock.CLOCKED_IN) != len(profiles):
+            problems.append(f'{outcomes.count(clock.CLOCKED_IN)} successful clock-ins reported')
+
+        self.stdout.write(
+            f'{len(jobs)} clock-ins in {elapsed:.2f}s '
+            f'({len(jobs) / elapsed:.0f}/s) across {options["threads"]} threads'
+        )
+        if problems:
+            raise CommandError('; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('Every crew member has exactly one clock-in.'))
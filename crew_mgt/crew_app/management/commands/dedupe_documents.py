@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from crew_app.documents import content_hash
+from crew_app.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        'Move documents uploaded before content-addressed storage into it, '
+        'so identical files are kept once, and delete the old copies.'
+    )
+
+    def handle(self, *args, **options):
+        storage = Document._meta.get_field('file').storage
+        moved = missing = 0
+        names = (
+            Document.objects.exclude(file='').order_by().values_list('file', flat=True).distinct().iterator()
+        )
+        for name in names:
+            if content_hash(name) is not None:
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Missing file: {name}')
+                continue
+            with storage.open(name, 'rb') as file:
+                new_name = storage.save(name, file)
+            Document.objects.filter(file=name).update(file=new_name)
+            storage.delete(name)
+            moved += 1
+
+        remaining = Document.objects.exclude(file='').values('file').distinct().count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} files into content-addressed storage ({missing} missing); '
+            f'{remaining} distinct files remain.'
+        ))
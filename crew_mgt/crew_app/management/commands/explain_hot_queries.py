@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crew_app.models import CrewProfile, Attendance, Shift, Task, LeaveRequest, Performance
+from crew_app.seed import seed_dataset
+
+
+def hot_queries(profile):
+    """The per-crew access patterns the composite indexes are built for."""
+    return [
+        ('Attendance history', Attendance.objects.filter(crew=profile).order_by('-date')[:10]),
+        ('Shift history', Shift.objects.filter(crew=profile).order_by('-start_time')[:10]),
+        ('Active tasks', Task.objects.filter(
+            crew=profile, status__in=['pending', 'in_progress']
+        ).order_by('deadline')[:10]),
+        ('Recent leave', LeaveRequest.objects.filter(crew=profile).order_by('-created_at')[:5]),
+        ('Pending leave', LeaveRequest.objects.filter(
+            crew=profile, status='pending'
+        ).order_by('start_date')),
+        ('Latest review', Performance.objects.filter(crew=profile).order_by('-review_date')[:1]),
+        ('Pending profiles', CrewProfile.objects.filter(recruitment_status='pending')[:50]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Optionally seed a large dataset, then print query plans and timings for the hot per-crew queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-crew', type=int, default=0, help='Crew profiles to seed first.')
+        parser.add_argument('--seed-days', type=int, default=365, help='Days of history per seeded crew member.')
+        parser.add_argument('--repeat', type=int, default=50, help='Executions per query when timing.')
+
+    def handle(self, *args, **options):
+        if options['seed_crew']:
+            seed_dataset(options['seed_crew'], options['seed_days'], stdout=self.stdout)
+
+        profile = CrewProfile.objects.order_by('pk').last()
+        if profile is None:
+            self.stderr.write('No crew profiles found; run with --seed-crew.')
+            return
+
+        for label, queryset in hot_queries(profile):
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options['repeat'] * 1000
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: {elapsed:.3f} ms'))
+            self.stdout.write(queryset.explain())
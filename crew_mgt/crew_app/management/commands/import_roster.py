@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from crew_app.models import CrewProfile
+from crew_app.roster_import import COLUMNS, import_roster, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import crew from a CSV or Excel roster with the columns: '
+        + ', '.join(COLUMNS) + '.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file (.csv or .xlsx).')
+        parser.add_argument(
+            '--status', default='pending',
+            choices=[value for value, _ in CrewProfile.STATUS_CHOICES],
+            help='Recruitment status for imported crew.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (0 = inline).')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as roster:
+                result = import_roster(
+                    read_rows(roster, options['path']),
+                    status=options['status'],
+                    chunk_size=options['chunk_size'],
+                    workers=options['workers'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for line_number, message in result['errors']:
+            self.stderr.write(f'Line {line_number}: {message}')
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['created']} crew members; {len(result['errors'])} rows rejected."
+        ))
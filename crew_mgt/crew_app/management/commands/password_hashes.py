@@ -0,0 +1,36 @@
+from collections import Counter
+
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.core.management.base import BaseCommand
+
+from crew_app.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Report how many passwords are stored with each hasher and how many '
+        'still need upgrading to the first entry of PASSWORD_HASHERS. '
+        'Outdated hashes are upgraded when their owner logs in, unless '
+        'PASSWORD_UPGRADE_ON_LOGIN is off.'
+    )
+
+    def handle(self, *args, **options):
+        preferred = get_hasher()
+        algorithms = Counter()
+        outdated = 0
+        for encoded in User.objects.values_list('password', flat=True).iterator():
+            try:
+                hasher = identify_hasher(encoded)
+            except ValueError:
+                # Unusable passwords and unknown formats.
+                algorithms['(unusable)'] += 1
+                continue
+            algorithms[hasher.algorithm] += 1
+            if hasher.algorithm != preferred.algorithm or hasher.must_update(encoded):
+                outdated += 1
+
+        for algorithm, count in algorithms.most_common():
+            self.stdout.write(f'{algorithm}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{outdated} of {sum(algorithms.values())} passwords need upgrading to {preferred.algorithm}.'
+        ))
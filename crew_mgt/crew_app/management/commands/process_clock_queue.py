@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from crew_app import clock_queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Drain queued clock events into attendance rows in batches. Runs '
+        'until interrupted unless --once is given; several workers may run '
+        'against the same queue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=clock_queue.BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0.5, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument(
+            '--purge-after', type=int, default=7 * 24 * 3600,
+            help='Delete processed events older than this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        last_purge = 0.0
+        try:
+            while True:
+                close_old_connections()
+                handled = clock_queue.drain(options['batch_size'])
+                total += handled
+                if handled:
+                    self.stdout.write(f'Processed {handled} clock events ({clock_queue.pending_count()} pending).')
+                    continue
+                if time.monotonic() - last_purge > 3600:
+                    clock_queue.purge(options['purge_after'])
+                    last_purge = time.monotonic()
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} clock events.'))
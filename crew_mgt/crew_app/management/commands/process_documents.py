@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from crew_app import document_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Inspect uploaded documents in a bounded process pool: type sniffing, '
+        'size and page limits, thumbnails. Runs until interrupted unless '
+        '--once is given; several workers may run against the same jobs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Pool processes; 0 inspects in this process.')
+        parser.add_argument('--batch-size', type=int, default=document_jobs.BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when no job is pending.')
+        parser.add_argument('--once', action='store_true', help='Exit once no job is pending.')
+        parser.add_argument('--queue-missing', action='store_true', help='First queue documents that have no job.')
+
+    def handle(self, *args, **options):
+        if options['queue_missing']:
+            queued = document_jobs.queue_documents(document_jobs.unqueued_documents())
+            self.stdout.write(f'Queued {queued} documents.')
+
+        totals = {}
+        with document_jobs.DocumentWorker(options['workers'], options['batch_size']) as worker:
+            try:
+                while True:
+                    close_old_connections()
+                    outcomes = worker.run_once()
+                    for outcome, count in outcomes.items():
+                        totals[outcome] = totals.get(outcome, 0) + count
+                    if outcomes:
+                        summary = ', '.join(f'{count} {outcome}' for outcome, count in sorted(outcomes.items()))
+                        self.stdout.write(f'Inspected documents: {summary} ({document_jobs.pending_count()} pending).')
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                pass
+        summary = ', '.join(f'{count} {outcome}' for outcome, count in sorted(totals.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f'Document inspection finished: {summary}.'))
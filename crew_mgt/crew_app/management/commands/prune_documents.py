@@ -0,0 +1,63 @@
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from crew_app.documents import content_hash
+from crew_app.models import Document, DocumentJob
+
+# Every field stored in the content-addressed document storage.
+FILE_FIELDS = [(Document, 'file'), (DocumentJob, 'thumbnail')]
+
+
+def _walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from _walk(storage, posixpath.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete content-addressed document files no row references any more. '
+        'Rows share files, so a file is only removed once its reference count '
+        'across documents and thumbnails drops to zero.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=24, metavar='HOURS',
+            help='Keep files younger than this, which an upload may be about to reference.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report without deleting.')
+
+    def handle(self, *args, **options):
+        references = Counter()
+        for model, field_name in FILE_FIELDS:
+            rows = model.objects.exclude(**{field_name: ''}).order_by().values_list(field_name, flat=True)
+            references.update(rows.iterator())
+
+        cutoff = timezone.now() - timedelta(hours=options['min_age'])
+        kept = deleted = 0
+        for model, field_name in FILE_FIELDS:
+            field = model._meta.get_field(field_name)
+            directory = field.upload_to.rstrip('/')
+            if not field.storage.exists(directory):
+                continue
+            for name in _walk(field.storage, directory):
+                if content_hash(name) is None or references[name]:
+                    kept += 1
+                    continue
+                if field.storage.get_modified_time(name) > cutoff:
+                    kept += 1
+                    continue
+                if not options['dry_run']:
+                    field.storage.delete(name)
+                deleted += 1
+                self.stdout.write(f'Unreferenced: {name}')
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} unreferenced files; kept {kept}.'))
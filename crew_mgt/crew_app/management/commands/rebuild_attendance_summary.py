@@ -0,0 +1,74 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max, Min
+
+from crew_app.models import Attendance
+from crew_app.summaries import months_between, rebuild_month
+from crew_app.workers import process_pool
+
+
+def _rebuild(month):
+    try:
+        return month, rebuild_month(month)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild monthly attendance summaries from raw attendance, one month '
+        'per worker process. On SQLite, which allows one writer at a time, '
+        'months are rebuilt in this process unless --workers is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First month, as YYYY-MM. Defaults to the earliest attendance.')
+        parser.add_argument('--end', help='Last month, as YYYY-MM. Defaults to the latest attendance.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Worker processes; 0 rebuilds in this process. Defaults to one per CPU, or 0 on SQLite.',
+        )
+
+    def _month(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError('Months must be in YYYY-MM format.')
+
+    def handle(self, *args, **options):
+        bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+        start = self._month(options['start']) if options['start'] else bounds['first']
+        end = self._month(options['end']) if options['end'] else bounds['last']
+        if start is None or end is None:
+            self.stdout.write('No attendance to summarise.')
+            return
+        months = months_between(start, end)
+
+        workers = options['workers']
+        if workers is None and connection.vendor == 'sqlite':
+            workers = 0
+
+        started = time.perf_counter()
+        total = 0
+        pool = None
+        if workers == 0:
+            results = ((month, rebuild_month(month)) for month in months)
+        else:
+            # Forked workers must not share this process's connection.
+            connections.close_all()
+            pool = process_pool(workers)
+            results = pool.map(_rebuild, months)
+        try:
+            for month, written in results:
+                total += written
+                self.stdout.write(f'{month:%Y-%m}: {written} summaries')
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {total} summaries across {len(months)} months in {time.perf_counter() - started:.2f}s.'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from crew_app.coverage import rebuild_coverage
+
+
+class Command(BaseCommand):
+    help = 'Recompute the leave coverage difference array from approved leave requests.'
+
+    def handle(self, *args, **options):
+        written = rebuild_coverage()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt leave coverage: {written} rows.'))
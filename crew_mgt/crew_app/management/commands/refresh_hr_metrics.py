@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from crew_app.hr_metrics import refresh_metrics, refresh_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the HR dashboard figures for every department. Writes '
+        'only mark their departments stale, and the dashboard recomputes '
+        'those when read; run this on a schedule (every few minutes) so '
+        'overdue task counts follow the clock. With --stale, recompute only '
+        'the departments marked stale.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true', help='Only recompute departments marked stale.')
+
+    def handle(self, *args, **options):
+        written = refresh_stale() if options['stale'] else refresh_metrics()
+        self.stdout.write(self.style.SUCCESS(f'Refreshed HR metrics for {written} departments.'))
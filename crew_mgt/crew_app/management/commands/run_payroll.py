@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from crew_app.models import Department
+from crew_app.payroll import CHUNK_SIZE, run_payroll
+
+
+class Command(BaseCommand):
+    help = 'Create or refresh payroll rows for every approved crew member for a month.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help='Month to run, as YYYY-MM.')
+        parser.add_argument('--department', help='Limit the run to one department, by name.')
+        parser.add_argument(
+            '--default-basic-salary',
+            help='Basic salary for crew members without a previous payroll.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=getattr(settings, 'PAYROLL_CHUNK_SIZE', CHUNK_SIZE),
+            help='Rows per bulk write transaction (default: PAYROLL_CHUNK_SIZE).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            month = datetime.strptime(options['month'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError('Month must be in YYYY-MM format.')
+
+        department = None
+        if options['department']:
+            try:
+                department = Department.objects.get(name=options['department'])
+            except Department.DoesNotExist:
+                raise CommandError(f"Department '{options['department']}' does not exist.")
+
+        result = run_payroll(
+            month,
+            department=department,
+            default_basic_salary=options['default_basic_salary'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Payroll for {result['month']:%B %Y}: {result['created']} created, "
+            f"{result['updated']} updated, {len(result['skipped'])} skipped."
+        ))
@@ -0,0 +1,58 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crew_app.models import Department
+from crew_app.scheduling import parse_template, schedule_shifts
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate shifts from a JSON roster template for whole departments '
+        'over a date range, skipping anything that clashes with existing '
+        'shifts or approved leave.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('template', help='JSON file: a list of {"weekdays", "start", "end", "description"} slots.')
+        parser.add_argument('start', help='First day, as YYYY-MM-DD.')
+        parser.add_argument('end', help='Last day, as YYYY-MM-DD.')
+        parser.add_argument('--department', action='append', help='Department name; repeat for several. Defaults to all.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created without saving.')
+        parser.add_argument('--show-conflicts', type=int, default=20, help='How many conflicts to list.')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+        if end < start:
+            raise CommandError('The end date must not be before the start date.')
+
+        try:
+            with open(options['template']) as file:
+                template = parse_template(json.load(file))
+        except (OSError, json.JSONDecodeError, ValueError) as e:
+            raise CommandError(f'Could not read the template: {e}')
+
+        departments = None
+        if options['department']:
+            departments = list(Department.objects.filter(name__in=options['department']))
+            missing = set(options['department']) - {department.name for department in departments}
+            if missing:
+                raise CommandError(f"Unknown department(s): {', '.join(sorted(missing))}.")
+
+        started = time.perf_counter()
+        result = schedule_shifts(template, start, end, departments=departments, dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        for crew_id, shift_start, shift_end, reason in result['conflicts'][:options['show_conflicts']]:
+            self.stdout.write(f'{crew_id}: {shift_start:%Y-%m-%d %H:%M}-{shift_end:%H:%M} clashes with {reason}')
+        verb = 'would be created' if options['dry_run'] else 'created'
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} shifts {verb}, {len(result['conflicts'])} skipped for conflicts "
+            f'in {elapsed:.2f}s.'
+        ))
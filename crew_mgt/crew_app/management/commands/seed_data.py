@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crew_app.models import Attendance, CrewProfile, Payroll, Performance, Shift, Task
+from crew_app.seed import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic dataset with bulk inserts: departments, '
+        'positions, crew profiles and their attendance, shifts, tasks, leave, '
+        'payroll and reviews. Adds to existing data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crew', type=int, default=1000, help='Crew profiles to create.')
+        parser.add_argument('--days', type=int, default=365, help='Days of history per crew member.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for a repeatable dataset.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        seed_dataset(options['crew'], options['days'], seed=options['seed'], stdout=self.stdout)
+        elapsed = time.perf_counter() - started
+        for model in (CrewProfile, Attendance, Shift, Task, Payroll, Performance):
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {model.objects.count()}')
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {elapsed:.1f}s.'))
@@ -0,0 +1,132 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import SESSION_KEY, logout
+from django.shortcuts import redirect
+from django.utils.deprecation import MiddlewareMixin
+
+from . import instrumentation
+
+LAST_ACTIVITY_KEY = '_last_activity'
+
+logger = logging.getLogger(__name__)
+
+
+class InactivityTimeoutMiddleware(MiddlewareMixin):
+    """
+    Log a signed-in user out of the paths in ``SESSION_INACTIVITY_PATHS``
+    after ``SESSION_INACTIVITY_TIMEOUT`` seconds without a request. Views
+    named in ``SESSION_INACTIVITY_EXEMPT_URLS``, such as the kiosk
+    ``clock_batch`` endpoint, are neither timed out nor counted as activity.
+
+    The activity timestamp is only rewritten once it is at least
+    ``SESSION_ACTIVITY_RESOLUTION`` seconds old, so most page views leave
+    the session unmodified and the session store is not written. A timeout
+    may therefore be detected up to that many seconds late.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.timeout = getattr(settings, 'SESSION_INACTIVITY_TIMEOUT', 600)
+        self.resolution = getattr(settings, 'SESSION_ACTIVITY_RESOLUTION', 60)
+        self.paths = tuple(getattr(settings, 'SESSION_INACTIVITY_PATHS', ['/portal/']))
+        self.exempt = set(getattr(settings, 'SESSION_INACTIVITY_EXEMPT_URLS', ['clock_batch']))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # A view hook, so exemptions can go by URL name.
+        if (
+            not request.path.startswith(self.paths)
+            or request.resolver_match.view_name in self.exempt
+            or SESSION_KEY not in request.session
+        ):
+            return None
+
+        now = int(time.time())
+        last_activity = request.session.get(LAST_ACTIVITY_KEY)
+        if last_activity is not None and now - last_activity > self.timeout:
+            logout(request)
+            messages.info(request, 'You were signed out after a period of inactivity.')
+            return redirect('crew_login')
+
+        if last_activity is None or now - last_activity >= self.resolution:
+            request.session[LAST_ACTIVITY_KEY] = now
+            # Outlive the timeout by the resolution, so the store never
+            # drops a session this middleware still considers active.
+            request.session.set_expiry(self.timeout + self.resolution)
+        return None
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure each request's SQL statements and time, template render time and
+    portal cache lookups (see ``crew_app.instrumentation``), add them to the
+    per-view metrics served at ``/metrics/`` and, unless
+    ``REQUEST_METRICS_SERVER_TIMING`` is false, to a ``Server-Timing`` header.
+
+    A view running more queries than its entry in ``QUERY_BUDGETS`` (by URL
+    name), or else ``QUERY_BUDGET``, is logged with its most repeated
+    statement. Place this first in ``MIDDLEWARE`` so other middleware's
+    queries count too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget = getattr(settings, 'QUERY_BUDGET', 25)
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True)
+        instrumentation.install_on_open_connections()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics = instrumentation.stop(token)
+        self.finish(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics = instrumentation.stop(token)
+        self.finish(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    def finish(self, request, response, metrics, duration):
+        # Unmatched paths share one label, so scanners cannot grow the series.
+        view = request.resolver_match.view_name if request.resolver_match else 'unresolved'
+        budget = self.budgets.get(view, self.budget)
+        over_budget = budget is not None and metrics.queries > budget
+        if over_budget:
+            statement, repeats = metrics.most_repeated()
+            logger.warning(
+                '%s %s (%s) ran %d queries, over its budget of %d, in %.1f ms of SQL; '
+                'most repeated (%dx): %s',
+                request.method, request.path, view, metrics.queries, budget, metrics.sql_time * 1000,
+                repeats, statement,
+            )
+        instrumentation.record_request(view, request.method, response.status_code, metrics, duration, over_budget)
+
+        if self.server_timing:
+            timings = [
+                f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.queries} queries"',
+                f'tpl;dur={metrics.template_time * 1000:.1f}',
+            ]
+            if metrics.cache:
+                timings.append(f'cache;desc="{metrics.cache["hit"]} hits / {metrics.cache["miss"]} misses"')
+            timings.append(f'total;dur={duration * 1000:.1f}')
+            response.headers['Server-Timing'] = ', '.join(timings)
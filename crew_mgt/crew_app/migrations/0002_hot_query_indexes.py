@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='crewprofile',
+            index=models.Index(fields=['recruitment_status', 'last_name', 'first_name'], name='crewprofile_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['crew', '-created_at'], name='leave_crew_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['crew', 'status', 'start_date'], name='leave_crew_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performance',
+            index=models.Index(fields=['crew', '-review_date'], name='perf_crew_review_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['crew', '-start_time'], name='shift_crew_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['crew', 'status', 'deadline'], name='task_crew_status_deadline_idx'),
+        ),
+    ]
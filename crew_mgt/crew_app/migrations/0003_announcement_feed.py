@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_feed(apps, schema_editor):
+    Announcement = apps.get_model('crew_app', 'Announcement')
+    Department = apps.get_model('crew_app', 'Department')
+    AnnouncementFeedEntry = apps.get_model('crew_app', 'AnnouncementFeedEntry')
+
+    all_departments = list(Department.objects.values_list('pk', flat=True)) + [None]
+    entries = []
+    for announcement in Announcement.objects.prefetch_related('departments'):
+        if announcement.is_global:
+            department_ids = all_departments
+        else:
+            department_ids = [department.pk for department in announcement.departments.all()]
+        entries.extend(
+            AnnouncementFeedEntry(
+                announcement=announcement,
+                department_id=department_id,
+                created_at=announcement.created_at,
+            )
+            for department_id in department_ids
+        )
+    AnnouncementFeedEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivered_at', models.DateTimeField(auto_now_add=True)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='crew_app.announcement')),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='announcement_deliveries', to='crew_app.crewprofile')),
+            ],
+            options={
+                'ordering': ['-delivered_at'],
+                'unique_together': {('announcement', 'crew')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='crew_app.announcement')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='announcement_feed', to='crew_app.department')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['department', '-created_at'], name='feed_department_created_idx')],
+            },
+        ),
+        migrations.RunPython(build_feed, migrations.RunPython.noop),
+    ]
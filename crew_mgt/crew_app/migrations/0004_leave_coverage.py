@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:35
+
+import django.db.models.deletion
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def build_coverage(apps, schema_editor):
+    LeaveRequest = apps.get_model('crew_app', 'LeaveRequest')
+    LeaveCoverageDelta = apps.get_model('crew_app', 'LeaveCoverageDelta')
+
+    deltas = Counter()
+    for department_id, position_id, start_date, end_date in LeaveRequest.objects.filter(
+        status='approved', start_date__lte=models.F('end_date')
+    ).values_list('crew__department_id', 'crew__position_id', 'start_date', 'end_date').iterator():
+        deltas[department_id, position_id, start_date] += 1
+        deltas[department_id, position_id, end_date + timedelta(days=1)] -= 1
+    LeaveCoverageDelta.objects.bulk_create(
+        [
+            LeaveCoverageDelta(department_id=department_id, position_id=position_id, day=day, delta=delta)
+            for (department_id, position_id, day), delta in deltas.items()
+            if delta
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0003_announcement_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveCoverageDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('delta', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leave_coverage', to='crew_app.department')),
+                ('position', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='leave_coverage', to='crew_app.position')),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['day'], name='coverage_day_idx')],
+                'unique_together': {('department', 'position', 'day')},
+            },
+        ),
+        migrations.RunPython(build_coverage, migrations.RunPython.noop),
+    ]
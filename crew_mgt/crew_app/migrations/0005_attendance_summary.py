@@ -0,0 +1,65 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:37
+
+import django.db.models.deletion
+from datetime import time
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Trunc
+
+
+def build_summaries(apps, schema_editor):
+    Attendance = apps.get_model('crew_app', 'Attendance')
+    AttendanceSummary = apps.get_model('crew_app', 'AttendanceSummary')
+
+    late_after = time.fromisoformat(getattr(settings, 'ATTENDANCE_LATE_AFTER', '09:00'))
+    rows = Attendance.objects.order_by().annotate(month=Trunc('date', 'month')).values('crew', 'month').annotate(
+        days_present=Count('pk', filter=Q(clock_in__isnull=False)),
+        total_worked=Sum(ExpressionWrapper(F('clock_out') - F('clock_in'), output_field=DurationField())),
+        late_arrivals=Count('pk', filter=Q(clock_in__time__gt=late_after)),
+        missing_clock_outs=Count('pk', filter=Q(clock_in__isnull=False, clock_out__isnull=True)),
+    )
+    AttendanceSummary.objects.bulk_create(
+        [
+            AttendanceSummary(
+                crew_id=row['crew'],
+                month=row['month'],
+                days_present=row['days_present'],
+                total_worked=row['total_worked'],
+                late_arrivals=row['late_arrivals'],
+                missing_clock_outs=row['missing_clock_outs'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0004_leave_coverage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('days_present', models.PositiveIntegerField(default=0)),
+                ('total_worked', models.DurationField(blank=True, null=True)),
+                ('late_arrivals', models.PositiveIntegerField(default=0)),
+                ('missing_clock_outs', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('crew', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='crew_app.crewprofile')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month'], name='attendance_summary_month_idx')],
+                'unique_together': {('crew', 'month')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def build_metrics(apps, schema_editor):
+    Department = apps.get_model('crew_app', 'Department')
+    DepartmentMetrics = apps.get_model('crew_app', 'DepartmentMetrics')
+    CrewProfile = apps.get_model('crew_app', 'CrewProfile')
+    LeaveRequest = apps.get_model('crew_app', 'LeaveRequest')
+    Task = apps.get_model('crew_app', 'Task')
+    Payroll = apps.get_model('crew_app', 'Payroll')
+    Performance = apps.get_model('crew_app', 'Performance')
+
+    now = timezone.now()
+    rows = {pk: {} for pk in Department.objects.values_list('pk', flat=True)}
+    for row in CrewProfile.objects.values('department').annotate(
+        pending_crew=Count('pk', filter=Q(recruitment_status='pending')),
+        approved_crew=Count('pk', filter=Q(recruitment_status='approved')),
+        rejected_crew=Count('pk', filter=Q(recruitment_status='rejected')),
+    ).order_by():
+        rows.setdefault(row.pop('department'), {}).update(row)
+    for department, total in LeaveRequest.objects.filter(status='pending').values('crew__department').annotate(
+        total=Count('pk')
+    ).order_by().values_list('crew__department', 'total'):
+        rows.setdefault(department, {})['open_leave'] = total
+    for department, total in Task.objects.filter(deadline__lt=now).exclude(status='completed').values(
+        'crew__department'
+    ).annotate(total=Count('pk')).order_by().values_list('crew__department', 'total'):
+        rows.setdefault(department, {})['overdue_tasks'] = total
+    for row in Payroll.objects.values('crew__department', 'month').annotate(
+        payroll_crew=Count('pk'),
+        payroll_total=Sum('net_salary'),
+        payroll_unpaid=Sum('net_salary', filter=Q(payment_status=False)),
+    ).order_by('month'):
+        department = row.pop('crew__department')
+        row['payroll_month'] = row.pop('month')
+        row['payroll_unpaid'] = row['payroll_unpaid'] or 0
+        rows.setdefault(department, {}).update(row)
+    for department, total, count in Performance.objects.values('crew__department').annotate(
+        total=Sum('rating'), count=Count('pk')
+    ).order_by().values_list('crew__department', 'total', 'count'):
+        rows.setdefault(department, {}).update(rating_total=total, rating_count=count)
+
+    DepartmentMetrics.objects.bulk_create([
+        DepartmentMetrics(department_id=department, refreshed_at=now, **values)
+        for department, values in rows.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0005_attendance_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pending_crew', models.PositiveIntegerField(default=0)),
+                ('approved_crew', models.PositiveIntegerField(default=0)),
+                ('rejected_crew', models.PositiveIntegerField(default=0)),
+                ('open_leave', models.PositiveIntegerField(default=0)),
+                ('overdue_tasks', models.PositiveIntegerField(default=0)),
+                ('payroll_month', models.DateField(blank=True, null=True)),
+                ('payroll_crew', models.PositiveIntegerField(default=0)),
+                ('payroll_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payroll_unpaid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+                ('department', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='crew_app.department')),
+            ],
+            options={
+                'verbose_name_plural': 'department metrics',
+            },
+        ),
+        migrations.RunPython(build_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases use the search fallback backend.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS crew_app_search USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, title, body, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    documents = {
+        ('crew', 1, 'CrewProfile'): lambda crew: (f'{crew.first_name} {crew.last_name}', f'{crew.phone_number} {crew.crew_id}'),
+        ('document', 2, 'Document'): lambda document: (
+            document.title, f'{document.crew_profile.first_name} {document.crew_profile.last_name}'
+        ),
+        ('announcement', 3, 'Announcement'): lambda announcement: (announcement.title, announcement.content),
+        ('task', 4, 'Task'): lambda task: (task.title, f'{task.description} {task.crew.first_name} {task.crew.last_name}'),
+    }
+    related = {'Document': ['crew_profile'], 'Task': ['crew']}
+    with schema_editor.connection.cursor() as cursor:
+        for (kind, code, model_name), document in documents.items():
+            objects = apps.get_model('crew_app', model_name).objects.select_related(*related.get(model_name, []))
+            rows = [(obj.pk * 8 + code, kind, obj.pk, *document(obj)) for obj in objects.iterator()]
+            cursor.executemany(
+                'INSERT INTO crew_app_search (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS crew_app_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0006_department_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
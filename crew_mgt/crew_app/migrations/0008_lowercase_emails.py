@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def lowercase_emails(apps, schema_editor):
+    User = apps.get_model('crew_app', 'User')
+    # Accounts whose emails differ only by case cannot all be lowercased;
+    # they are left as they are for an administrator to merge.
+    clashing = set(
+        User.objects.annotate(canonical=Lower('email')).values('canonical').annotate(
+            accounts=Count('pk')
+        ).filter(accounts__gt=1).values_list('canonical', flat=True)
+    )
+    for user in User.objects.exclude(email=Lower('email')).only('pk', 'email').iterator():
+        canonical = user.email.strip().lower()
+        if canonical not in clashing:
+            User.objects.filter(pk=user.pk).update(email=canonical)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
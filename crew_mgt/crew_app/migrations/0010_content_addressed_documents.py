@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:06
+
+import crew_app.documents
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0009_status_change_audit'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(storage=crew_app.documents.document_storage, upload_to='crew_documents/'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:09
+
+import crew_app.documents
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def queue_existing_documents(apps, schema_editor):
+    Document = apps.get_model('crew_app', 'Document')
+    DocumentJob = apps.get_model('crew_app', 'DocumentJob')
+    DocumentJob.objects.bulk_create(
+        [DocumentJob(document_id=pk) for pk in Document.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0010_content_addressed_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('thumbnail', models.FileField(blank=True, storage=crew_app.documents.document_storage, upload_to='document_thumbnails/')),
+                ('flags', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='crew_app.document')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'claimed_at'], name='document_job_queue_idx')],
+            },
+        ),
+        migrations.RunPython(queue_existing_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0011_document_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='departmentmetrics',
+            name='stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
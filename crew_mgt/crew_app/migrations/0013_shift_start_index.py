@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crew_app', '0012_department_metrics_stale'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['start_time', 'crew'], name='shift_start_crew_idx'),
+        ),
+    ]
@@ -1,7 +1,67 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Trunc
 import uuid
 
+from .documents import document_storage
+
+
+def _elapsed(start_field, end_field):
+    return ExpressionWrapper(F(end_field) - F(start_field), output_field=DurationField())
+
+
+class AttendanceQuerySet(models.QuerySet):
+    def with_hours(self):
+        """Annotate each row with ``worked``, the clock-in to clock-out interval."""
+        return self.annotate(worked=_elapsed('clock_in', 'clock_out'))
+
+    def totals(self, period=None):
+        """
+        Per-crew totals computed in a single GROUP BY.
+
+        ``period`` may be ``'week'`` or ``'month'`` to split totals by the
+        truncated attendance date. Rows missing either clock time contribute
+        to ``days`` but not to ``total_worked``.
+        """
+        fields = ['crew']
+        queryset = self.order_by()
+        if period is not None:
+            queryset = queryset.annotate(period=Trunc('date', period))
+            fields.append('period')
+        return queryset.values(*fields).annotate(
+            total_worked=Sum(_elapsed('clock_in', 'clock_out')),
+            days=Count('id'),
+        ).order_by(*fields)
+
+
+class ShiftQuerySet(models.QuerySet):
+    def with_duration(self):
+        """Annotate each row with ``duration``, the scheduled shift length."""
+        return self.annotate(duration=_elapsed('start_time', 'end_time'))
+
+    def totals(self, period=None):
+        """
+        Per-crew scheduled time computed in a single GROUP BY, optionally
+        split by ``'week'`` or ``'month'`` of the shift start.
+        """
+        fields = ['crew']
+        queryset = self.order_by()
+        if period is not None:
+            queryset = queryset.annotate(period=Trunc('start_time', period))
+            fields.append('period')
+        return queryset.values(*fields).annotate(
+            total_duration=Sum(_elapsed('start_time', 'end_time')),
+            shifts=Count('id'),
+        ).order_by(*fields)
+
+
+def canonical_email(email):
+    """Emails are stored and looked up lowercased, so logins need no case-insensitive scan."""
+    return email.strip().lower()
+
+
 class User(AbstractUser):
     email = models.EmailField(unique=True)
     is_crew = models.BooleanField(default=False)
@@ -10,6 +70,11 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        if self.email:
+            self.email = canonical_email(self.email)
+        super().save(*args, **kwargs)
+
     groups = models.ManyToManyField(
         'auth.Group',
         related_name='crew_app_user_groups',
@@ -106,6 +171,13 @@ class CrewProfile(models.Model):
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # admin_dashboard lists profiles by status in the default ordering
+            models.Index(
+                fields=['recruitment_status', 'last_name', 'first_name'],
+                name='crewprofile_status_name_idx',
+            ),
+        ]
 
 class Document(models.Model):
     crew_profile = models.ForeignKey(
@@ -114,7 +186,7 @@ class Document(models.Model):
         related_name='documents'
     )
     title = models.CharField(max_length=100)
-    file = models.FileField(upload_to='crew_documents/')
+    file = models.FileField(upload_to='crew_documents/', storage=document_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_verified = models.BooleanField(default=False)
 
@@ -131,7 +203,11 @@ class Attendance(models.Model):
     clock_in = models.DateTimeField(null=True, blank=True)
     clock_out = models.DateTimeField(null=True, blank=True)
 
+    objects = AttendanceQuerySet.as_manager()
+
     class Meta:
+        # The (crew, date) unique index already serves per-crew history
+        # ordered by -date, so no extra index is declared here.
         unique_together = ['crew', 'date']
         ordering = ['-date']
 
@@ -139,10 +215,45 @@ class Attendance(models.Model):
         return f"{self.crew.crew_id} - {self.date}"
 
     def hours_worked(self):
+        worked = getattr(self, 'worked', None)
+        if worked is not None:
+            return worked.total_seconds() / 3600
         if self.clock_in and self.clock_out:
             return (self.clock_out - self.clock_in).total_seconds() / 3600
         return 0
 
+class AttendanceSummary(models.Model):
+    """
+    One crew member's attendance for one month, kept up to date from
+    ``Attendance`` writes so reports never aggregate raw history.
+    """
+    crew = models.ForeignKey(
+        CrewProfile,
+        on_delete=models.CASCADE,
+        related_name='attendance_summaries'
+    )
+    month = models.DateField()
+    days_present = models.PositiveIntegerField(default=0)
+    total_worked = models.DurationField(null=True, blank=True)
+    late_arrivals = models.PositiveIntegerField(default=0)
+    missing_clock_outs = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['crew', 'month']
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month'], name='attendance_summary_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.crew.crew_id} - {self.month:%Y-%m}"
+
+    def hours_worked(self):
+        if self.total_worked is None:
+            return 0
+        return self.total_worked.total_seconds() / 3600
+
 class Shift(models.Model):
     crew = models.ForeignKey(
         CrewProfile, 
@@ -153,14 +264,24 @@ class Shift(models.Model):
     end_time = models.DateTimeField()
     description = models.TextField(blank=True)
 
+    objects = ShiftQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.crew.crew_id} - {self.start_time.date()}"
 
     def shift_duration(self):
+        duration = getattr(self, 'duration', None)
+        if duration is not None:
+            return duration.total_seconds() / 3600
         return (self.end_time - self.start_time).total_seconds() / 3600
 
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['crew', '-start_time'], name='shift_crew_start_idx'),
+            # Range scans across all crew (coverage calendar, scheduling).
+            models.Index(fields=['start_time', 'crew'], name='shift_start_crew_idx'),
+        ]
 
 class LeaveRequest(models.Model):
     STATUS_CHOICES = [
@@ -190,6 +311,10 @@ class LeaveRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['crew', '-created_at'], name='leave_crew_created_idx'),
+            models.Index(fields=['crew', 'status', 'start_date'], name='leave_crew_status_start_idx'),
+        ]
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -226,6 +351,9 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['deadline']
+        indexes = [
+            models.Index(fields=['crew', 'status', 'deadline'], name='task_crew_status_deadline_idx'),
+        ]
 
 class Payroll(models.Model):
     crew = models.ForeignKey(
@@ -282,6 +410,9 @@ class Performance(models.Model):
 
     class Meta:
         ordering = ['-review_date']
+        indexes = [
+            models.Index(fields=['crew', '-review_date'], name='perf_crew_review_idx'),
+        ]
 
 class Announcement(models.Model):
     title = models.CharField(max_length=200)
@@ -303,4 +434,207 @@ class Announcement(models.Model):
         return self.title
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class AnnouncementFeedEntry(models.Model):
+    """
+    Precomputed per-department announcement feed.
+
+    Global announcements are fanned out to every department plus the
+    ``department=None`` bucket used by crew without a department, so every
+    reader is served by one range scan on (department, -created_at).
+    """
+    announcement = models.ForeignKey(
+        Announcement,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='announcement_feed'
+    )
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.announcement} - {self.department or 'No department'}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['department', '-created_at'], name='feed_department_created_idx'),
+        ]
+
+
+class AnnouncementDelivery(models.Model):
+    announcement = models.ForeignKey(
+        Announcement,
+        on_delete=models.CASCADE,
+        related_name='deliveries'
+    )
+    crew = models.ForeignKey(
+        CrewProfile,
+        on_delete=models.CASCADE,
+        related_name='announcement_deliveries'
+    )
+    delivered_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.announcement} - {self.crew_id}"
+
+    class Meta:
+        ordering = ['-delivered_at']
+        unique_together = ['announcement', 'crew']
+
+
+class LeaveCoverageDelta(models.Model):
+    """
+    Persistent difference array of approved leave per department, position
+    and day: ``+1`` on a leave's first day and ``-1`` the day after its last.
+    The number of crew off on any day is the running sum up to that day, so
+    approving leave touches two rows however long the leave is.
+    """
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='leave_coverage'
+    )
+    position = models.ForeignKey(
+        Position,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='leave_coverage'
+    )
+    day = models.DateField()
+    delta = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.department or 'No department'} / {self.position or 'No position'} - {self.day}: {self.delta:+d}"
+
+    class Meta:
+        ordering = ['day']
+        unique_together = ['department', 'position', 'day']
+        indexes = [
+            models.Index(fields=['day'], name='coverage_day_idx'),
+        ]
+
+
+class DepartmentMetrics(models.Model):
+    """
+    HR dashboard figures for one department (or crew without one), so the
+    dashboard reads one row per department. Writes to the underlying rows
+    only mark their department ``stale``; stale rows are recomputed when the
+    dashboard is next read and by the ``refresh_hr_metrics`` command.
+    """
+    department = models.OneToOneField(
+        Department,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='metrics'
+    )
+    pending_crew = models.PositiveIntegerField(default=0)
+    approved_crew = models.PositiveIntegerField(default=0)
+    rejected_crew = models.PositiveIntegerField(default=0)
+    open_leave = models.PositiveIntegerField(default=0)
+    overdue_tasks = models.PositiveIntegerField(default=0)
+    payroll_month = models.DateField(null=True, blank=True)
+    payroll_crew = models.PositiveIntegerField(default=0)
+    payroll_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payroll_unpaid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+    stale = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name_plural = 'department metrics'
+
+    def __str__(self):
+        return f"{self.department or 'No department'} - {self.refreshed_at:%Y-%m-%d %H:%M}"
+
+    def headcount(self):
+        return self.pending_crew + self.approved_crew + self.rejected_crew
+
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_total / self.rating_count
+
+
+class StatusChange(models.Model):
+    """
+    Append-only audit trail of the status transitions applied through
+    ``crew_app.transitions``; one row per object changed, grouped by the
+    ``batch`` of the action that changed it.
+    """
+    batch = models.UUIDField(db_index=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.PROTECT, related_name='+')
+    object_id = models.PositiveBigIntegerField()
+    field = models.CharField(max_length=50)
+    old_value = models.CharField(max_length=50)
+    new_value = models.CharField(max_length=50)
+    changed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='status_changes'
+    )
+    changed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-changed_at', '-id']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='status_change_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model} {self.object_id}: {self.field} {self.old_value} -> {self.new_value}"
+
+
+class DocumentJob(models.Model):
+    """
+    Background inspection of one uploaded document, queued when its file
+    is saved and processed by ``process_documents``: the sniffed type, page
+    count, a thumbnail and the flags a reviewer should look at.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='job'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    thumbnail = models.FileField(upload_to='document_thumbnails/', storage=document_storage, blank=True)
+    flags = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'claimed_at'], name='document_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} - {self.status}"
+
+    def passed(self):
+        return self.status == 'done' and not self.flags
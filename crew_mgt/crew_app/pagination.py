@@ -0,0 +1,184 @@
+import collections.abc
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'crew_app.pagination.cursor'
+
+# Unfiltered tables the planner believes hold at least this many rows are
+# counted from its statistics instead of with COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = getattr(settings, 'ESTIMATED_COUNT_THRESHOLD', 100_000)
+
+ROW_ESTIMATE_SQL = {
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+    'mysql': 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+}
+
+
+def valid_cursor(token):
+    """
+    ``token`` if it is a cursor this site signed, else ``None`` (the first
+    page). Cache keys vary on the result, so junk query strings cannot each
+    get an entry of their own.
+    """
+    if not token:
+        return None
+    try:
+        signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+    return token
+
+
+class KeysetPage(collections.abc.Sequence):
+    """A page of results with opaque cursors to its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self)} objects>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a unique ordering such as ``('-date', '-id')``.
+
+    Each page is fetched with a ``WHERE (key) < (cursor)`` seek and a LIMIT,
+    so neither deep pages nor the total row count cost anything extra.
+    Cursors are signed so clients cannot forge arbitrary filter values;
+    a missing or tampered cursor falls back to the first page.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _encode(self, obj, direction):
+        values = []
+        for name, _ in self.fields:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps([direction, values], salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, token):
+        if not token:
+            return None
+        try:
+            direction, raw_values = signing.loads(token, salt=CURSOR_SALT)
+            opts = self.queryset.model._meta
+            values = [
+                opts.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, raw_values, strict=True)
+            ]
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+        if direction not in ('next', 'previous'):
+            return None
+        return direction, values
+
+    def _seek(self, values, backwards):
+        """Rows strictly after ``values`` in the ordering (before, if ``backwards``)."""
+        condition = Q()
+        for position, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != backwards else 'gt'
+            branch = Q(**{f'{name}__{lookup}': values[position]})
+            for earlier, (earlier_name, _) in enumerate(self.fields[:position]):
+                branch &= Q(**{earlier_name: values[earlier]})
+            condition |= branch
+        return condition
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _page_query(self, cursor):
+        """The decoded cursor and the sliced queryset that fetches its page."""
+        state = self._decode(cursor)
+        limit = self.per_page + 1
+        if state is None or state[0] == 'next':
+            queryset = self.queryset.order_by(*self.ordering)
+            if state is not None:
+                queryset = queryset.filter(self._seek(state[1], backwards=False))
+        else:
+            queryset = self.queryset.order_by(*self._reversed_ordering()).filter(
+                self._seek(state[1], backwards=True)
+            )
+        return state, queryset[:limit]
+
+    def _build_page(self, state, rows):
+        has_more = len(rows) > self.per_page
+        if state is None or state[0] == 'next':
+            rows = rows[:self.per_page]
+            next_cursor = self._encode(rows[-1], 'next') if has_more else None
+            previous_cursor = self._encode(rows[0], 'previous') if state is not None and rows else None
+        else:
+            rows = rows[:self.per_page][::-1]
+            previous_cursor = self._encode(rows[0], 'previous') if has_more else None
+            next_cursor = self._encode(rows[-1], 'next') if rows else None
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def get_page(self, cursor=None):
+        state, queryset = self._page_query(cursor)
+        return self._build_page(state, list(queryset))
+
+    async def aget_page(self, cursor=None):
+        state, queryset = self._page_query(cursor)
+        return self._build_page(state, [obj async for obj in queryset])
+
+
+def estimated_row_count(model, using='default'):
+    """
+    The planner's row estimate for ``model``'s table, or ``None`` where the
+    backend keeps none (SQLite) or has not analysed the table yet.
+    """
+    connection = connections[using]
+    sql = ROW_ESTIMATE_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for the admin changelists of very large tables. Counting a
+    whole table scans it on PostgreSQL and InnoDB, so an unfiltered queryset
+    above ``ESTIMATED_COUNT_THRESHOLD`` rows takes the planner's estimate;
+    filtered querysets and small tables are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is not None and not queryset.query.has_filters():
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
@@ -0,0 +1,153 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from . import cache, hr_metrics
+from .models import AttendanceSummary, CrewProfile, Payroll, Shift
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+STANDARD_MONTHLY_HOURS = Decimal(str(getattr(settings, 'PAYROLL_STANDARD_MONTHLY_HOURS', 160)))
+OVERTIME_MULTIPLIER = Decimal(str(getattr(settings, 'PAYROLL_OVERTIME_MULTIPLIER', '1.5')))
+CHUNK_SIZE = getattr(settings, 'PAYROLL_CHUNK_SIZE', 500)
+
+
+def month_bounds(month):
+    """Return the first day of ``month`` and the first day of the following month."""
+    start = month.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _hours(duration):
+    if duration is None:
+        return ZERO
+    return Decimal(duration.total_seconds()) / Decimal(3600)
+
+
+def compute_net_salary(basic_salary, overtime_pay, deductions):
+    """Same arithmetic as ``Payroll.save``."""
+    return basic_salary + overtime_pay - deductions
+
+
+def compute_overtime_pay(basic_salary, worked_hours, scheduled_hours):
+    """
+    Hours worked beyond the scheduled shift hours, paid at the hourly rate
+    derived from the basic salary times the overtime multiplier.
+    """
+    overtime_hours = max(worked_hours - scheduled_hours, ZERO)
+    hourly_rate = basic_salary / STANDARD_MONTHLY_HOURS
+    return (overtime_hours * hourly_rate * OVERTIME_MULTIPLIER).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def run_payroll(month, department=None, default_basic_salary=None, chunk_size=CHUNK_SIZE):
+    """
+    Create or refresh the ``Payroll`` rows of every approved crew member for
+    ``month``, optionally limited to one ``Department``.
+
+    Inputs are gathered with a fixed number of queries: one for the crew
+    roster (with the previous payroll carried forward as subqueries), one
+    for the month's ``AttendanceSummary`` rows, a GROUP BY for shift hours,
+    and one for rows that already exist for the month. Pay is then computed column by column and
+    written with ``bulk_create``/``bulk_update`` in chunked transactions.
+
+    Existing rows keep their basic salary and deductions, so manual HR edits
+    survive a re-run; only overtime and net salary are recomputed. New rows
+    carry both values forward from the crew member's latest payroll, falling
+    back to ``default_basic_salary``. Crew with neither are skipped.
+    """
+    start, end = month_bounds(month)
+
+    previous = Payroll.objects.filter(crew=OuterRef('pk'), month__lt=start).order_by('-month')
+    crew = CrewProfile.objects.filter(recruitment_status='approved')
+    if department is not None:
+        crew = crew.filter(department=department)
+    roster = list(
+        crew.annotate(
+            previous_basic=Subquery(previous.values('basic_salary')[:1]),
+            previous_deductions=Subquery(previous.values('deductions')[:1]),
+        ).values_list('pk', 'crew_id', 'previous_basic', 'previous_deductions').order_by('pk')
+    )
+    # Filter child tables by subquery rather than an id list, which would hit
+    # the bound-parameter limit on large rosters.
+    crew_ids = crew.values('pk')
+
+    worked = {
+        crew_id: _hours(total_worked)
+        for crew_id, total_worked in AttendanceSummary.objects.filter(
+            crew_id__in=crew_ids, month=start,
+        ).values_list('crew_id', 'total_worked')
+    }
+    scheduled = {
+        row['crew']: _hours(row['total_duration'])
+        for row in Shift.objects.filter(
+            crew_id__in=crew_ids, start_time__gte=_aware(start), start_time__lt=_aware(end),
+        ).totals()
+    }
+    existing = {
+        payroll.crew_id: payroll
+        for payroll in Payroll.objects.filter(crew_id__in=crew_ids, month=start)
+    }
+
+    default_basic = Decimal(default_basic_salary) if default_basic_salary is not None else None
+    to_create, to_update, skipped = [], [], []
+    written = []
+    for crew_id, crew_uuid, previous_basic, previous_deductions in roster:
+        payroll = existing.get(crew_id)
+        if payroll is not None:
+            basic, deductions = payroll.basic_salary, payroll.deductions
+        else:
+            basic = previous_basic if previous_basic is not None else default_basic
+            deductions = previous_deductions if previous_deductions is not None else ZERO
+            if basic is None:
+                skipped.append(crew_id)
+                continue
+
+        overtime = compute_overtime_pay(
+            basic, worked.get(crew_id, ZERO), scheduled.get(crew_id, ZERO)
+        )
+        net = compute_net_salary(basic, overtime, deductions)
+        written.append(crew_uuid)
+
+        if payroll is not None:
+            payroll.overtime_pay = overtime
+            payroll.net_salary = net
+            to_update.append(payroll)
+        else:
+            to_create.append(Payroll(
+                crew_id=crew_id,
+                month=start,
+                basic_salary=basic,
+                overtime_pay=overtime,
+                deductions=deductions,
+                net_salary=net,
+            ))
+
+    for offset in range(0, len(to_create), chunk_size):
+        with transaction.atomic():
+            Payroll.objects.bulk_create(to_create[offset:offset + chunk_size])
+    for offset in range(0, len(to_update), chunk_size):
+        with transaction.atomic():
+            Payroll.objects.bulk_update(
+                to_update[offset:offset + chunk_size], ['overtime_pay', 'net_salary']
+            )
+    # Bulk writes skip model signals, so retire the cached profiles and
+    # mark the dashboard figures stale here.
+    cache.invalidate(written, [cache.PROFILE])
+    hr_metrics.mark_stale([department.pk] if department is not None else hr_metrics.ALL)
+
+    return {
+        'month': start,
+        'created': len(to_create),
+        'updated': len(to_update),
+        'skipped': skipped,
+    }
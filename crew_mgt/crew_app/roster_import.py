@@ -0,0 +1,189 @@
+import csv
+import io
+import os
+from itertools import islice
+
+from django import forms
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from . import hr_metrics, search
+from .forms import CrewProfileForm
+from .models import User, CrewProfile, Department, Position
+from .workers import process_pool
+
+CHUNK_SIZE = getattr(settings, 'ROSTER_IMPORT_CHUNK_SIZE', 500)
+
+COLUMNS = [
+    'email', 'password', 'first_name', 'last_name', 'phone_number',
+    'date_of_birth', 'address', 'department', 'position',
+]
+
+
+class RosterRowForm(CrewProfileForm):
+    """
+    ``CrewProfileForm`` rules for one roster row, with department and
+    position given by name and resolved from preloaded lookup maps rather
+    than a ``ModelChoiceField`` query per row.
+    """
+    email = forms.EmailField(max_length=254)
+    password = forms.CharField(required=False)
+    department = forms.CharField(required=False)
+    position = forms.CharField(required=False)
+
+    class Meta(CrewProfileForm.Meta):
+        # Resolved by name below; kept off the model fields so model
+        # validation does not re-check each foreign key with a query.
+        fields = [
+            name for name in CrewProfileForm.Meta.fields
+            if name not in ('department', 'position')
+        ]
+
+    def __init__(self, *args, departments, positions, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.departments = departments
+        self.positions = positions
+
+    def clean_department(self):
+        name = self.cleaned_data['department'].strip()
+        if not name:
+            return None
+        try:
+            return self.departments[name.lower()]
+        except KeyError:
+            raise forms.ValidationError(f"Unknown department '{name}'.")
+
+    def clean_position(self):
+        title = self.cleaned_data['position'].strip()
+        if not title:
+            return None
+        department = self.cleaned_data.get('department')
+        if department is None:
+            raise forms.ValidationError('A position needs a department.')
+        try:
+            return self.positions[(department.pk, title.lower())]
+        except KeyError:
+            raise forms.ValidationError(f"Unknown position '{title}' in {department}.")
+
+
+def read_rows(file, filename=''):
+    """
+    Yield ``(line_number, row)`` pairs from a CSV or Excel roster without
+    loading the whole file. ``file`` is a binary file object.
+    """
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError('Reading Excel rosters requires openpyxl to be installed.')
+        sheet = load_workbook(file, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(cell or '').strip().lower() for cell in next(rows, ())]
+        for line_number, values in enumerate(rows, start=2):
+            yield line_number, {
+                column: '' if value is None else (value.date().isoformat() if hasattr(value, 'date') else str(value))
+                for column, value in zip(header, values)
+            }
+        return
+
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    for row in reader:
+        yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def _hash(password):
+    return make_password(password or None)
+
+
+def import_roster(rows, status='pending', chunk_size=CHUNK_SIZE, workers=None, dry_run=False):
+    """
+    Validate and insert roster ``rows`` as produced by ``read_rows``.
+
+    Rows are processed ``chunk_size`` at a time: each chunk costs one email
+    lookup, its passwords are hashed in a process pool, and its users and
+    profiles are inserted with ``bulk_create`` in one transaction. Invalid
+    rows are reported and skipped without affecting the rest.
+
+    Returns ``{'created': int, 'errors': [(line_number, message), ...]}``.
+    """
+    departments = {department.name.lower(): department for department in Department.objects.all()}
+    positions = {
+        (position.department_id, position.title.lower()): position
+        for position in Position.objects.all()
+    }
+    result = {'created': 0, 'errors': []}
+    seen_emails = set()
+    rows = iter(rows)
+
+    # ``workers=0`` hashes in this process, which suits small uploads.
+    pool = None if workers == 0 else process_pool(workers)
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            valid = []
+            for line_number, row in chunk:
+                form = RosterRowForm(row, departments=departments, positions=positions)
+                if not form.is_valid():
+                    message = '; '.join(
+                        f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()
+                    )
+                    result['errors'].append((line_number, message))
+                    continue
+                email = form.cleaned_data['email'].lower()
+                if email in seen_emails:
+                    result['errors'].append((line_number, f'email: {email} appears more than once.'))
+                    continue
+                seen_emails.add(email)
+                valid.append((line_number, email, form))
+
+            taken = set(
+                User.objects.filter(email__in=[email for _, email, _ in valid]).values_list('email', flat=True)
+            )
+            accepted = []
+            for line_number, email, form in valid:
+                if email in taken:
+                    result['errors'].append((line_number, f'email: {email} is already registered.'))
+                else:
+                    accepted.append((email, form))
+            if dry_run:
+                result['created'] += len(accepted)
+                continue
+            if not accepted:
+                continue
+
+            passwords = [form.cleaned_data['password'] for _, form in accepted]
+            if pool is None:
+                hashes = map(_hash, passwords)
+            else:
+                hashes = pool.map(
+                    _hash, passwords,
+                    chunksize=max(len(passwords) // (workers or os.cpu_count() or 1), 1),
+                )
+            users = [
+                User(username=email, email=email, password=password, is_crew=True)
+                for (email, _), password in zip(accepted, hashes)
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                profiles = []
+                for user, (_, form) in zip(users, accepted):
+                    profile = form.save(commit=False)
+                    profile.user = user
+                    profile.department = form.cleaned_data['department']
+                    profile.position = form.cleaned_data['position']
+                    profile.recruitment_status = status
+                    profiles.append(profile)
+                CrewProfile.objects.bulk_create(profiles)
+                search.index_objects(profiles)
+                hr_metrics.mark_stale({profile.department_id for profile in profiles})
+            result['created'] += len(profiles)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return result
@@ -0,0 +1,196 @@
+import bisect
+from datetime import datetime, time, timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache
+from .models import CrewProfile, LeaveRequest, Shift
+
+CHUNK_SIZE = getattr(settings, 'SCHEDULING_CHUNK_SIZE', 1000)
+
+SHIFT = 'shift'
+LEAVE = 'leave'
+
+
+class ShiftSlot(NamedTuple):
+    """One line of a roster template: a shift worked on the given weekdays (Monday is 0)."""
+    weekdays: frozenset
+    start: time
+    end: time
+    description: str = ''
+
+    def interval(self, day):
+        """The aware (start, end) of this slot on ``day``; an end before the start runs past midnight."""
+        start = timezone.make_aware(datetime.combine(day, self.start))
+        end_day = day + timedelta(days=1) if self.end <= self.start else day
+        return start, timezone.make_aware(datetime.combine(end_day, self.end))
+
+
+def parse_template(rows):
+    """
+    Build ``ShiftSlot`` objects from plain data such as a JSON roster file:
+    ``[{"weekdays": [0, 1, 2, 3, 4], "start": "08:00", "end": "16:00",
+    "description": "Day watch"}, ...]``. Raises ``ValueError`` on bad rows.
+    """
+    slots = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            weekdays = frozenset(int(day) for day in row['weekdays'])
+            if not weekdays or not weekdays <= set(range(7)):
+                raise ValueError('weekdays must be numbers from 0 (Monday) to 6')
+            slots.append(ShiftSlot(
+                weekdays,
+                time.fromisoformat(row['start']),
+                time.fromisoformat(row['end']),
+                row.get('description', ''),
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Template slot {number}: {e}')
+    return slots
+
+
+class IntervalIndex:
+    """
+    Disjoint, sorted ``[start, end)`` intervals for one crew member.
+
+    Overlapping inputs are merged when the index is built, so an overlap test
+    is a single binary search against the neighbouring intervals.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start < self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def overlaps(self, start, end):
+        position = bisect.bisect_left(self.starts, start)
+        if position and self.ends[position - 1] > start:
+            return True
+        return position < len(self.starts) and self.starts[position] < end
+
+    def add(self, start, end):
+        """Insert an interval known not to overlap any existing one."""
+        position = bisect.bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+
+
+def _leave_interval(start_date, end_date):
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+    )
+
+
+def build_indexes(crew_pks, start, end):
+    """
+    Per-crew interval indexes of existing shifts and approved leave that touch
+    ``[start, end)``, read with one query each. ``crew_pks`` may be a list or
+    a ``values('pk')`` subquery.
+    """
+    shifts, leave = {}, {}
+    for crew_pk, shift_start, shift_end in Shift.objects.filter(
+        crew__in=crew_pks, start_time__lt=end, end_time__gt=start
+    ).order_by().values_list('crew_id', 'start_time', 'end_time'):
+        shifts.setdefault(crew_pk, []).append((shift_start, shift_end))
+    for crew_pk, leave_start, leave_end in LeaveRequest.objects.filter(
+        crew__in=crew_pks, status='approved',
+        start_date__lte=timezone.localdate(end), end_date__gte=timezone.localdate(start),
+    ).order_by().values_list('crew_id', 'start_date', 'end_date'):
+        leave.setdefault(crew_pk, []).append(_leave_interval(leave_start, leave_end))
+    return (
+        {crew_pk: IntervalIndex(intervals) for crew_pk, intervals in shifts.items()},
+        {crew_pk: IntervalIndex(intervals) for crew_pk, intervals in leave.items()},
+    )
+
+
+def shift_conflict(crew, start, end, exclude_pk=None):
+    """
+    Why a single shift for ``crew`` cannot be booked, or ``None``. Used when a
+    shift is entered by hand.
+    """
+    if end <= start:
+        return 'The shift must end after it starts.'
+    clashes = Shift.objects.filter(crew=crew, start_time__lt=end, end_time__gt=start)
+    if exclude_pk is not None:
+        clashes = clashes.exclude(pk=exclude_pk)
+    if clashes.exists():
+        return 'This crew member already has a shift at that time.'
+    on_leave = LeaveRequest.objects.filter(
+        crew=crew, status='approved',
+        start_date__lte=timezone.localdate(end), end_date__gte=timezone.localdate(start),
+    )
+    leave = IntervalIndex(_leave_interval(*dates) for dates in on_leave.values_list('start_date', 'end_date'))
+    if leave.overlaps(start, end):
+        return 'This crew member is on approved leave at that time.'
+    return None
+
+
+def schedule_shifts(template, start_date, end_date, departments=None, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Generate the shifts of roster ``template`` for every approved crew member
+    of ``departments`` (all departments if omitted) from ``start_date`` to
+    ``end_date`` inclusive.
+
+    The crew rows are locked, existing shifts and approved leave for the
+    whole range are loaded into per-crew interval indexes, and each candidate
+    shift is checked with a binary search. Accepted shifts join the index
+    as they are accepted, so overlapping template slots cannot double-book
+    either. They are then written with ``bulk_create``.
+
+    Returns ``{'created': int, 'conflicts': [(crew_id, start, end, reason), ...]}``.
+    """
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    candidates = sorted(
+        (slot.interval(day) + (slot.description,)
+         for day in days for slot in template if day.weekday() in slot.weekdays),
+        key=lambda candidate: candidate[0],
+    )
+    result = {'created': 0, 'conflicts': []}
+    if not candidates:
+        return result
+    range_start = candidates[0][0]
+    range_end = max(end for _, end, _ in candidates)
+
+    crew = CrewProfile.objects.filter(recruitment_status='approved')
+    if departments is not None:
+        crew = crew.filter(department__in=departments)
+
+    with transaction.atomic():
+        # Lock the roster so a concurrent run cannot book the same people
+        # between the checks and the insert.
+        roster = list(crew.select_for_update().order_by('pk').values_list('pk', 'crew_id'))
+        shift_index, leave_index = build_indexes(crew.values('pk'), range_start, range_end)
+
+        accepted = []
+        for crew_pk, crew_id in roster:
+            booked = shift_index.setdefault(crew_pk, IntervalIndex())
+            away = leave_index.get(crew_pk)
+            for start, end, description in candidates:
+                if away is not None and away.overlaps(start, end):
+                    result['conflicts'].append((crew_id, start, end, LEAVE))
+                elif booked.overlaps(start, end):
+                    result['conflicts'].append((crew_id, start, end, SHIFT))
+                else:
+                    booked.add(start, end)
+                    accepted.append(Shift(crew_id=crew_pk, start_time=start, end_time=end, description=description))
+
+        if not dry_run:
+            Shift.objects.bulk_create(accepted, batch_size=chunk_size)
+        result['created'] = len(accepted)
+
+    if not dry_run and accepted:
+        booked_crew = {shift.crew_id for shift in accepted}
+        cache.invalidate(
+            [crew_id for crew_pk, crew_id in roster if crew_pk in booked_crew],
+            [cache.DASHBOARD, cache.SHIFTS],
+        )
+    return result
@@ -0,0 +1,240 @@
+import functools
+import re
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Announcement, CrewProfile, Document, Task
+
+INDEX_TABLE = 'crew_app_search'
+BATCH_SIZE = 500
+MAX_RESULTS = 50
+
+_TOKEN = re.compile(r'\w+')
+
+
+class SearchKind(NamedTuple):
+    code: int
+    model: type
+    document: Callable  # instance -> (title, body)
+    fields: tuple  # columns searched by the fallback backend
+    related: tuple = ()  # select_related() needed by ``document``
+
+
+def _name(crew):
+    return f'{crew.first_name} {crew.last_name}'
+
+
+# Documents and tasks also carry their owner's name, which their admin
+# searches have always matched.
+KINDS = {
+    'crew': SearchKind(
+        1, CrewProfile,
+        lambda crew: (_name(crew), f'{crew.phone_number} {crew.crew_id}'),
+        ('first_name', 'last_name', 'phone_number', 'crew_id'),
+    ),
+    'document': SearchKind(
+        2, Document,
+        lambda document: (document.title, _name(document.crew_profile)),
+        ('title', 'crew_profile__first_name', 'crew_profile__last_name'),
+        ('crew_profile',),
+    ),
+    'announcement': SearchKind(
+        3, Announcement, lambda announcement: (announcement.title, announcement.content), ('title', 'content'),
+    ),
+    'task': SearchKind(
+        4, Task,
+        lambda task: (task.title, f'{task.description} {_name(task.crew)}'),
+        ('title', 'description', 'crew__first_name', 'crew__last_name'),
+        ('crew',),
+    ),
+}
+KIND_FOR_MODEL = {kind.model: name for name, kind in KINDS.items()}
+
+
+def _rowid(kind, pk):
+    # One index row per object, addressable without a lookup on kind and id.
+    return pk * 8 + KINDS[kind].code
+
+
+def match_expression(query):
+    """
+    An FTS5 query matching every word of ``query`` as a prefix, so "ada ok"
+    finds "Ada Okafor". Returns ``None`` when ``query`` holds no words.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+class SearchBackend:
+    """Interface for search backends; see ``SQLiteFTSBackend``."""
+
+    def index(self, kind, objects):
+        raise NotImplementedError
+
+    def remove(self, kind, pks):
+        raise NotImplementedError
+
+    def clear(self, kind=None):
+        raise NotImplementedError
+
+    def filter(self, queryset, kind, query):
+        """``queryset`` narrowed to the ``kind`` objects matching ``query``."""
+        raise NotImplementedError
+
+    def search(self, query, kinds=None, limit=MAX_RESULTS):
+        """Best matches as ``[{'kind', 'id', 'title'}, ...]``."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    An FTS5 table in the application database (created by migration 0007).
+    It shares the application's transactions, so the index commits or rolls
+    back with the rows it describes.
+    """
+
+    def index(self, kind, objects):
+        rows = []
+        for obj in objects:
+            title, body = KINDS[kind].document(obj)
+            rows.append((_rowid(kind, obj.pk), kind, obj.pk, title, body))
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {INDEX_TABLE} (rowid, kind, object_id, title, body) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+    def remove(self, kind, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [(_rowid(kind, pk),) for pk in pks])
+
+    def clear(self, kind=None):
+        with connection.cursor() as cursor:
+            if kind is None:
+                cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+            else:
+                cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE kind = %s', [kind])
+
+    def filter(self, queryset, kind, query):
+        expression = match_expression(query)
+        if expression is None:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT object_id FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s AND kind = %s',
+            [expression, kind],
+        ))
+
+    def search(self, query, kinds=None, limit=MAX_RESULTS):
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        sql = f'SELECT kind, object_id, title FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s'
+        params = [expression]
+        if kinds:
+            sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += list(kinds)
+        sql += ' ORDER BY rank LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [{'kind': kind, 'id': object_id, 'title': title} for kind, object_id, title in cursor.fetchall()]
+
+
+class DatabaseBackend(SearchBackend):
+    """
+    Fallback without an index: ``icontains`` over the source columns. Keeps
+    search working on databases without FTS5 until a dedicated backend is
+    configured.
+    """
+
+    def index(self, kind, objects):
+        pass
+
+    def remove(self, kind, pks):
+        pass
+
+    def clear(self, kind=None):
+        pass
+
+    def _condition(self, kind, query):
+        condition = Q()
+        for token in _TOKEN.findall(query):
+            any_field = Q()
+            for field in KINDS[kind].fields:
+                any_field |= Q(**{f'{field}__icontains': token})
+            condition &= any_field
+        return condition
+
+    def filter(self, queryset, kind, query):
+        return queryset.filter(self._condition(kind, query))
+
+    def search(self, query, kinds=None, limit=MAX_RESULTS):
+        if not _TOKEN.search(query):
+            return []
+        results = []
+        for name in kinds or KINDS:
+            kind = KINDS[name]
+            matches = kind.model._default_manager.select_related(*kind.related).filter(self._condition(name, query))
+            for obj in matches[:limit - len(results)]:
+                results.append({'kind': name, 'id': obj.pk, 'title': kind.document(obj)[0]})
+            if len(results) >= limit:
+                break
+        return results
+
+
+@functools.cache
+def get_backend():
+    """The backend named by ``CREW_SEARCH_BACKEND``, defaulting to FTS5 on SQLite."""
+    path = getattr(settings, 'CREW_SEARCH_BACKEND', None)
+    if path is None:
+        path = 'crew_app.search.SQLiteFTSBackend' if connection.vendor == 'sqlite' else 'crew_app.search.DatabaseBackend'
+    return import_string(path)()
+
+
+def index_objects(objects):
+    """Add or refresh ``objects``, all of one indexed model, in the search index."""
+    objects = list(objects)
+    if objects:
+        get_backend().index(KIND_FOR_MODEL[type(objects[0])], objects)
+
+
+def search(query, kinds=None, limit=MAX_RESULTS):
+    return get_backend().search(query, kinds=kinds, limit=limit)
+
+
+def filter_queryset(queryset, query):
+    """Narrow a queryset of an indexed model to the objects matching ``query``."""
+    return get_backend().filter(queryset, KIND_FOR_MODEL[queryset.model], query)
+
+
+def rebuild_index(kinds=None, batch_size=BATCH_SIZE):
+    """Re-index every object of ``kinds`` (all kinds by default). Returns ``{kind: count}``."""
+    backend = get_backend()
+    counts = {}
+    for name in kinds or KINDS:
+        kind = KINDS[name]
+        count = 0
+        with transaction.atomic():
+            backend.clear(name)
+            batch = []
+            objects = kind.model._default_manager.select_related(*kind.related).order_by()
+            for obj in objects.iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) == batch_size:
+                    backend.index(name, batch)
+                    count += len(batch)
+                    batch = []
+            backend.index(name, batch)
+            count += len(batch)
+        counts[name] = count
+    return counts
@@ -0,0 +1,170 @@
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import hr_metrics, search, summaries
+from .coverage import rebuild_coverage
+from .models import (
+    User, CrewProfile, Department, Position, Attendance, Shift, LeaveRequest,
+    Task, Payroll, Performance
+)
+
+BATCH_SIZE = 2000
+# Crew members whose history is inserted per transaction.
+CREW_PER_TRANSACTION = 50
+REVIEW_INTERVAL_DAYS = 90
+
+DEPARTMENTS = {
+    'Deck': ['Deckhand', 'Bosun', 'Able Seaman'],
+    'Engine': ['Oiler', 'Motorman', 'Engineer'],
+    'Catering': ['Cook', 'Steward', 'Messman'],
+    'Safety': ['Safety Officer', 'Medic'],
+}
+
+
+def _bulk_create(model, objects, batch_size=BATCH_SIZE):
+    for offset in range(0, len(objects), batch_size):
+        model.objects.bulk_create(objects[offset:offset + batch_size])
+
+
+def _crew_history(rows, crew_id, rng, first_day, days, months):
+    """Append one crew member's generated history to ``rows``, a list per model."""
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        start = timezone.make_aware(datetime.combine(day, time(8, rng.randrange(30))))
+        rows[Shift].append(Shift(crew_id=crew_id, start_time=start, end_time=start + timedelta(hours=8)))
+        if rng.random() < 0.9:
+            rows[Attendance].append(Attendance(
+                crew_id=crew_id,
+                date=day,
+                clock_in=start + timedelta(minutes=rng.randrange(-10, 20)),
+                clock_out=start + timedelta(hours=8, minutes=rng.randrange(-30, 120)),
+            ))
+    rows[Task].extend(
+        Task(
+            crew_id=crew_id,
+            title=f'Task {n}',
+            description='Seeded task',
+            status=rng.choice(['pending', 'in_progress', 'completed']),
+            deadline=timezone.now() + timedelta(days=rng.randrange(-days, 30)),
+        )
+        for n in range(max(days // 30, 1))
+    )
+    rows[LeaveRequest].extend(
+        LeaveRequest(
+            crew_id=crew_id,
+            start_date=first_day + timedelta(days=start),
+            end_date=first_day + timedelta(days=start + rng.randrange(1, 10)),
+            reason='Seeded leave',
+            status=rng.choice(['pending', 'approved', 'rejected']),
+        )
+        for start in rng.sample(range(days), k=min(3, days))
+    )
+    basic_salary = Decimal(rng.randrange(800, 3000))
+    for month in months:
+        overtime_pay = Decimal(rng.randrange(0, 300))
+        deductions = Decimal(rng.randrange(0, 100))
+        paid = month != months[-1]
+        rows[Payroll].append(Payroll(
+            crew_id=crew_id,
+            month=month,
+            basic_salary=basic_salary,
+            overtime_pay=overtime_pay,
+            deductions=deductions,
+            # bulk_create skips Payroll.save(), which computes this.
+            net_salary=basic_salary + overtime_pay - deductions,
+            payment_status=paid,
+            payment_date=timezone.make_aware(datetime.combine(month, time(12))) if paid else None,
+        ))
+    rows[Performance].extend(
+        Performance(
+            crew_id=crew_id,
+            review_date=first_day + timedelta(days=offset),
+            rating=rng.choice([2, 3, 3, 4, 4, 5]),
+            comments='Seeded review',
+        )
+        for offset in range(REVIEW_INTERVAL_DAYS, days + 1, REVIEW_INTERVAL_DAYS)
+    )
+
+
+def seed_dataset(crew_count=1000, days=365, seed=None, stdout=None):
+    """
+    Insert a synthetic roster with ``days`` of attendance, shifts, tasks,
+    leave, monthly payroll and quarterly reviews per crew member using
+    ``bulk_create``. Existing rows are left untouched.
+
+    Generated users get an unusable password, so a seeded database never
+    holds accounts anyone can sign in to (benchmarks use ``force_login``),
+    and seeding cost is dominated by inserts rather than PBKDF2. Reviews are
+    left without a reviewer rather than creating an HR account.
+    """
+    rng = random.Random(seed)
+    password = make_password(None)
+    tag = rng.randrange(16 ** 8)
+
+    with transaction.atomic():
+        departments = {}
+        positions = []
+        for name, titles in DEPARTMENTS.items():
+            department, _ = Department.objects.get_or_create(name=name)
+            departments[name] = department
+            for title in titles:
+                position, _ = Position.objects.get_or_create(title=title, department=department)
+                positions.append(position)
+
+        users = [
+            User(
+                username=f'seed-{tag:08x}-{i}@example.com',
+                email=f'seed-{tag:08x}-{i}@example.com',
+                password=password,
+                is_crew=True,
+            )
+            for i in range(crew_count)
+        ]
+        _bulk_create(User, users)
+        users = User.objects.filter(username__startswith=f'seed-{tag:08x}-')
+
+        profiles = []
+        for user in users:
+            position = rng.choice(positions)
+            profiles.append(CrewProfile(
+                user=user,
+                first_name=rng.choice(['Ada', 'Tunde', 'Ngozi', 'Emeka', 'Bisi', 'Kemi']),
+                last_name=rng.choice(['Okafor', 'Adeyemi', 'Balogun', 'Eze', 'Nwosu', 'Bello']),
+                phone_number=f'080{rng.randrange(10 ** 8):08d}',
+                date_of_birth=date(1970, 1, 1) + timedelta(days=rng.randrange(12000)),
+                address='Seeded address',
+                department=position.department,
+                position=position,
+                recruitment_status=rng.choice(['approved'] * 8 + ['pending', 'rejected']),
+            ))
+        _bulk_create(CrewProfile, profiles)
+    if stdout:
+        stdout.write(f'Seeded {crew_count} crew profiles')
+
+    profile_ids = list(
+        CrewProfile.objects.filter(user__username__startswith=f'seed-{tag:08x}-').values_list('pk', flat=True)
+    )
+    first_day = date.today() - timedelta(days=days)
+    months = summaries.months_between(first_day, date.today())
+    for offset in range(0, len(profile_ids), CREW_PER_TRANSACTION):
+        rows = {model: [] for model in (Attendance, Shift, Task, LeaveRequest, Payroll, Performance)}
+        for crew_id in profile_ids[offset:offset + CREW_PER_TRANSACTION]:
+            _crew_history(rows, crew_id, rng, first_day, days, months)
+        with transaction.atomic():
+            for model, objects in rows.items():
+                _bulk_create(model, objects)
+    # bulk_create skips the signals that maintain the derived tables.
+    for month in months:
+        summaries.rebuild_month(month)
+    rebuild_coverage()
+    hr_metrics.refresh_metrics()
+    search.rebuild_index(['crew', 'task'])
+    if stdout:
+        stdout.write(f'Seeded {days} days of history per crew member')
+
+    return profile_ids
@@ -0,0 +1,271 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache
+from .announcements import backfill_department, rebuild_feed
+from .coverage import apply_deltas, leave_deltas, move_crew_leave
+from .document_jobs import queue_documents
+from .hr_metrics import mark_stale
+from .search import KIND_FOR_MODEL, get_backend as search_backend, index_objects
+from .summaries import refresh_summaries
+from .transitions import status_changed
+from .models import (
+    User, CrewProfile, Attendance, Shift, LeaveRequest, Task, Payroll, Performance,
+    Announcement, Department, Document, DocumentJob
+)
+
+# Which cached fragments each crew-owned model appears in.
+FRAGMENT_DEPENDENCIES = {
+    Attendance: (cache.PROFILE, cache.DASHBOARD),
+    Task: (cache.PROFILE, cache.DASHBOARD, cache.TASKS),
+    LeaveRequest: (cache.PROFILE,),
+    Payroll: (cache.PROFILE,),
+    Performance: (cache.PROFILE,),
+    Shift: (cache.DASHBOARD, cache.SHIFTS),
+}
+
+
+def _crew_changed(sender, instance, **kwargs):
+    try:
+        crew_id = instance.crew.crew_id
+    except CrewProfile.DoesNotExist:
+        # The crew member is being deleted along with their rows.
+        return
+    cache.invalidate([crew_id], FRAGMENT_DEPENDENCIES[sender])
+
+
+for model in FRAGMENT_DEPENDENCIES:
+    post_save.connect(_crew_changed, sender=model, dispatch_uid=f'crew_cache_save_{model.__name__}')
+    post_delete.connect(_crew_changed, sender=model, dispatch_uid=f'crew_cache_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=CrewProfile, dispatch_uid='crew_cache_save_CrewProfile')
+@receiver(post_delete, sender=CrewProfile, dispatch_uid='crew_cache_delete_CrewProfile')
+def _profile_changed(sender, instance, **kwargs):
+    cache.invalidate([instance.crew_id])
+
+
+@receiver(post_save, sender=User, dispatch_uid='crew_cache_save_User')
+def _user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Signing in only updates last_login, which no fragment shows.
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    # Fragments show the crew member's own email and their reviewers' names.
+    cache.invalidate(CrewProfile.objects.filter(user=instance).values_list('crew_id', flat=True))
+    cache.invalidate(
+        Performance.objects.filter(reviewed_by=instance).order_by().values_list('crew__crew_id', flat=True).distinct(),
+        [cache.PROFILE],
+    )
+
+
+@receiver(post_save, sender=Announcement, dispatch_uid='crew_cache_save_Announcement')
+@receiver(post_delete, sender=Announcement, dispatch_uid='crew_cache_delete_Announcement')
+@receiver(m2m_changed, sender=Announcement.departments.through, dispatch_uid='crew_cache_m2m_Announcement')
+def _announcements_changed(sender, **kwargs):
+    cache.invalidate_global('announcements')
+
+
+@receiver(post_save, sender=Announcement, dispatch_uid='announcement_feed_save')
+def _rebuild_announcement_feed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rebuild_feed(instance)
+
+
+@receiver(m2m_changed, sender=Announcement.departments.through, dispatch_uid='announcement_feed_m2m')
+def _rebuild_announcement_feed_departments(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse and action == 'post_clear':
+        # Cleared from the Department side; the removed announcements are no
+        # longer known, but only this department's targeted entries can go.
+        instance.announcement_feed.filter(announcement__is_global=False).delete()
+    elif reverse:
+        for announcement in Announcement.objects.filter(pk__in=pk_set):
+            rebuild_feed(announcement)
+    else:
+        rebuild_feed(instance)
+
+
+@receiver(post_save, sender=Department, dispatch_uid='announcement_feed_department')
+def _backfill_department_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        backfill_department(instance)
+
+
+# Leave coverage: saves made outside coverage.set_leave_status (the admin
+# change form, the shell) adjust the difference array here.
+
+def _approved_range(status, start_date, end_date):
+    return (start_date, end_date) if status == 'approved' else None
+
+
+@receiver(pre_save, sender=LeaveRequest, dispatch_uid='leave_coverage_pre_save')
+def _remember_leave_range(sender, instance, raw=False, **kwargs):
+    instance._coverage_before = None
+    if instance.pk and not raw:
+        before = LeaveRequest.objects.filter(pk=instance.pk).values_list(
+            'status', 'start_date', 'end_date'
+        ).first()
+        if before is not None:
+            instance._coverage_before = _approved_range(*before)
+
+
+@receiver(post_save, sender=LeaveRequest, dispatch_uid='leave_coverage_save')
+def _update_leave_coverage(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_coverage_before', None)
+    after = _approved_range(instance.status, instance.start_date, instance.end_date)
+    if before == after:
+        return
+    group = (instance.crew.department_id, instance.crew.position_id)
+    deltas = leave_deltas([(*group, *before)] if before else [], sign=-1)
+    deltas.update(leave_deltas([(*group, *after)] if after else []))
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=LeaveRequest, dispatch_uid='leave_coverage_delete')
+def _remove_leave_coverage(sender, instance, **kwargs):
+    if instance.status != 'approved':
+        return
+    try:
+        crew = instance.crew
+    except CrewProfile.DoesNotExist:
+        return
+    apply_deltas(leave_deltas([(crew.department_id, crew.position_id, instance.start_date, instance.end_date)], sign=-1))
+
+
+@receiver(pre_save, sender=CrewProfile, dispatch_uid='leave_coverage_crew_pre_save')
+def _remember_crew_group(sender, instance, raw=False, **kwargs):
+    # One lookup serves coverage (department, position) and search (name).
+    instance._coverage_group = instance._search_name = None
+    if instance.pk and not raw:
+        before = CrewProfile.objects.filter(pk=instance.pk).values_list(
+            'department_id', 'position_id', 'first_name', 'last_name'
+        ).first()
+        if before is not None:
+            instance._coverage_group, instance._search_name = before[:2], before[2:]
+
+
+@receiver(post_save, sender=CrewProfile, dispatch_uid='leave_coverage_crew_save')
+def _move_crew_coverage(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_coverage_group', None)
+    after = (instance.department_id, instance.position_id)
+    if not raw and before is not None and tuple(before) != after:
+        move_crew_leave(instance, before, after)
+
+
+# Monthly attendance summaries. The clock module writes with update() and
+# refreshes them itself.
+
+@receiver(pre_save, sender=Attendance, dispatch_uid='attendance_summary_pre_save')
+def _remember_attendance_date(sender, instance, raw=False, **kwargs):
+    instance._summary_before = None
+    if instance.pk and not raw:
+        instance._summary_before = Attendance.objects.filter(pk=instance.pk).values_list(
+            'crew_id', 'date'
+        ).first()
+
+
+@receiver(post_save, sender=Attendance, dispatch_uid='attendance_summary_save')
+@receiver(post_delete, sender=Attendance, dispatch_uid='attendance_summary_delete')
+def _refresh_attendance_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    keys = [(instance.crew_id, instance.date)]
+    before = getattr(instance, '_summary_before', None)
+    if before is not None:
+        keys.append(before)
+    refresh_summaries(keys)
+
+
+# HR dashboard metrics: the departments a write touches are marked stale
+# once its transaction commits and recomputed when the dashboard is read.
+
+@receiver(post_save, sender=CrewProfile, dispatch_uid='hr_metrics_crew_save')
+@receiver(post_delete, sender=CrewProfile, dispatch_uid='hr_metrics_crew_delete')
+def _crew_metrics_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    departments = {instance.department_id}
+    before = getattr(instance, '_coverage_group', None)
+    if before is not None:
+        departments.add(before[0])
+    mark_stale(departments)
+
+
+def _crew_row_metrics_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        department_id = instance.crew.department_id
+    except CrewProfile.DoesNotExist:
+        # Deleted with the crew member, whose own signal covers it.
+        return
+    mark_stale([department_id])
+
+
+for model in (LeaveRequest, Task, Payroll, Performance):
+    post_save.connect(_crew_row_metrics_changed, sender=model, dispatch_uid=f'hr_metrics_save_{model.__name__}')
+    post_delete.connect(_crew_row_metrics_changed, sender=model, dispatch_uid=f'hr_metrics_delete_{model.__name__}')
+
+
+# Search index.
+
+def _index_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_objects([instance])
+
+
+def _index_removed(sender, instance, **kwargs):
+    search_backend().remove(KIND_FOR_MODEL[sender], [instance.pk])
+
+
+for model in (CrewProfile, Document, Announcement, Task):
+    post_save.connect(_index_changed, sender=model, dispatch_uid=f'search_index_save_{model.__name__}')
+    post_delete.connect(_index_removed, sender=model, dispatch_uid=f'search_index_delete_{model.__name__}')
+
+
+@receiver(post_save, sender=CrewProfile, dispatch_uid='search_index_crew_name')
+def _reindex_crew_name(sender, instance, raw=False, **kwargs):
+    # Documents and tasks are indexed under their owner's name.
+    before = getattr(instance, '_search_name', None)
+    if raw or before is None or tuple(before) == (instance.first_name, instance.last_name):
+        return
+    index_objects(instance.documents.select_related('crew_profile'))
+    index_objects(instance.tasks.select_related('crew'))
+
+
+# Bulk status transitions (crew_app.transitions) bypass save(), so the
+# derived data their rows feed is refreshed once per batch instead.
+
+@receiver(status_changed, sender=CrewProfile, dispatch_uid='transition_crew_status')
+def _crew_status_changed(sender, rows, **kwargs):
+    cache.invalidate({row['crew_id'] for row in rows})
+    mark_stale({row['department_id'] for row in rows})
+
+
+@receiver(status_changed, sender=LeaveRequest, dispatch_uid='transition_leave_status')
+def _leave_status_changed(sender, rows, **kwargs):
+    cache.invalidate({row['crew__crew_id'] for row in rows}, FRAGMENT_DEPENDENCIES[LeaveRequest])
+    mark_stale({row['crew__department_id'] for row in rows})
+
+
+# Document inspection, queued for the process_documents workers whenever a
+# document gets a new file.
+
+@receiver(pre_save, sender=Document, dispatch_uid='document_job_pre_save')
+def _remember_document_file(sender, instance, raw=False, **kwargs):
+    instance._file_before = None
+    if instance.pk and not raw:
+        instance._file_before = Document.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=Document, dispatch_uid='document_job_save')
+def _queue_document_job(sender, instance, created, raw=False, **kwargs):
+    if raw or not instance.file:
+        return
+    if created:
+        DocumentJob.objects.create(document=instance)
+    elif getattr(instance, '_file_before', None) != instance.file.name:
+        queue_documents(Document.objects.filter(pk=instance.pk))
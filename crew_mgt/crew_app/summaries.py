@@ -0,0 +1,88 @@
+from datetime import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Trunc
+
+from .models import Attendance, AttendanceSummary
+from .payroll import month_bounds
+
+# Clock-ins after this local time count as late arrivals.
+LATE_AFTER = time.fromisoformat(getattr(settings, 'ATTENDANCE_LATE_AFTER', '09:00'))
+
+SUMMARY_FIELDS = ['days_present', 'total_worked', 'late_arrivals', 'missing_clock_outs']
+
+
+def summary_rows(queryset):
+    """
+    Per crew and month aggregates of an ``Attendance`` queryset in one GROUP
+    BY: days clocked in, total worked time, late clock-ins and clock-ins
+    still without a clock-out (today's open row included).
+    """
+    return queryset.order_by().annotate(month=Trunc('date', 'month')).values('crew', 'month').annotate(
+        days_present=Count('pk', filter=Q(clock_in__isnull=False)),
+        total_worked=Sum(ExpressionWrapper(F('clock_out') - F('clock_in'), output_field=DurationField())),
+        late_arrivals=Count('pk', filter=Q(clock_in__time__gt=LATE_AFTER)),
+        missing_clock_outs=Count('pk', filter=Q(clock_in__isnull=False, clock_out__isnull=True)),
+    ).order_by('crew', 'month')
+
+
+def _summaries(rows):
+    return [
+        AttendanceSummary(crew_id=row['crew'], month=row['month'], **{field: row[field] for field in SUMMARY_FIELDS})
+        for row in rows
+    ]
+
+
+def refresh_summaries(keys):
+    """
+    Recompute the summaries of ``(crew_pk, day)`` pairs, where ``day`` is any
+    date in the month, with one aggregate over the affected months and one
+    upsert. Months left without attendance lose their summary row.
+    """
+    keys = {(crew_pk, day.replace(day=1)) for crew_pk, day in keys}
+    if not keys:
+        return
+    first = min(month for _, month in keys)
+    _, end = month_bounds(max(month for _, month in keys))
+
+    rows = [
+        row for row in summary_rows(Attendance.objects.filter(
+            crew_id__in={crew_pk for crew_pk, _ in keys}, date__gte=first, date__lt=end,
+        ))
+        if (row['crew'], row['month']) in keys
+    ]
+    # A single upsert statement needs no surrounding transaction.
+    AttendanceSummary.objects.bulk_create(
+        _summaries(rows),
+        update_conflicts=True,
+        unique_fields=['crew', 'month'],
+        update_fields=SUMMARY_FIELDS + ['updated_at'],
+    )
+    gone = keys - {(row['crew'], row['month']) for row in rows}
+    if gone:
+        emptied = Q()
+        for crew_pk, month in gone:
+            emptied |= Q(crew_id=crew_pk, month=month)
+        AttendanceSummary.objects.filter(emptied).delete()
+
+
+def months_between(start, end):
+    """First days of every month from ``start``'s to ``end``'s, inclusive."""
+    month = start.replace(day=1)
+    months = []
+    while month <= end:
+        months.append(month)
+        month = month_bounds(month)[1]
+    return months
+
+
+def rebuild_month(month, chunk_size=1000):
+    """Replace every summary of ``month`` from raw attendance. Returns the number of rows written."""
+    start, end = month_bounds(month)
+    summaries = _summaries(summary_rows(Attendance.objects.filter(date__gte=start, date__lt=end)))
+    with transaction.atomic():
+        AttendanceSummary.objects.filter(month=start).delete()
+        AttendanceSummary.objects.bulk_create(summaries, batch_size=chunk_size)
+    return len(summaries)
@@ -1,3 +1,1674 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import clock, clock_queue, instrumentation
+from .announcements import department_feed, send_announcement
+from .cache import cache_stats, reset_cache_stats
+from .coverage import coverage_calendar, rebuild_coverage, set_leave_status
+from .dashboard import build_portal_context
+from .seed import seed_dataset
+from . import document_inspection
+from .document_jobs import DocumentWorker, claim, record_result
+from .documents import content_hash
+from .forms import ShiftForm
+from .hr_metrics import dashboard_metrics, refresh_metrics, refresh_stale
+from .pagination import EstimatedCountPaginator, KeysetPaginator, estimated_row_count
+from .roster_import import import_roster, read_rows
+from .scheduling import IntervalIndex, parse_template, schedule_shifts
+from .search import DatabaseBackend, filter_queryset, rebuild_index, search
+from .transitions import status_changed, transition
+from .backends import EmailAuthBackend
+from .summaries import rebuild_month
+from .payroll import run_payroll
+from .workers import init_worker, process_pool
+from .models import (
+    User, CrewProfile, Department, Position, Attendance, Shift, Task,
+    Announcement, AnnouncementDelivery, Payroll, LeaveRequest, Performance,
+    AttendanceSummary, DepartmentMetrics, StatusChange, Document, DocumentJob
+)
+
+
+def create_crew(email='crew@example.com', department=None, position=None, **kwargs):
+    user = User.objects.create_user(username=email, email=email, password='pass12345', is_crew=True)
+    defaults = {
+        'first_name': 'Ada',
+        'last_name': 'Okafor',
+        'phone_number': '08000000000',
+        'date_of_birth': date(1990, 1, 1),
+        'address': '1 Marina Road',
+        'department': department,
+        'position': position,
+        'recruitment_status': 'approved',
+    }
+    defaults.update(kwargs)
+    return CrewProfile.objects.create(user=user, **defaults)
+
+
+class CrewPortalDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Deck')
+        cls.other_department = Department.objects.create(name='Engine')
+        cls.position = Position.objects.create(title='Deckhand', department=cls.department)
+        cls.profile = create_crew(department=cls.department, position=cls.position)
+        cls.today = date.today()
+        now = timezone.now()
+
+        Attendance.objects.create(crew=cls.profile, date=cls.today, clock_in=now - timedelta(hours=2))
+        for offset in range(5):
+            Task.objects.create(
+                crew=cls.profile, title=f'Task {offset}', description='Check lines',
+                deadline=now + timedelta(days=offset),
+            )
+        Shift.objects.create(crew=cls.profile, start_time=now - timedelta(days=2), end_time=now - timedelta(days=2, hours=-8))
+        cls.next_shift = Shift.objects.create(crew=cls.profile, start_time=now + timedelta(days=1), end_time=now + timedelta(days=1, hours=8))
+        Shift.objects.create(crew=cls.profile, start_time=now + timedelta(days=3), end_time=now + timedelta(days=3, hours=8))
+
+        targeted = Announcement.objects.create(title='Deck drill', content='Muster at 0800')
+        targeted.departments.add(cls.department, cls.other_department)
+        Announcement.objects.create(title='Global notice', content='Payday moved', is_global=True)
+        hidden = Announcement.objects.create(title='Engine only', content='Oil change')
+        hidden.departments.add(cls.other_department)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_context_is_built_in_fixed_number_of_queries(self):
+        # profile + annotations, active tasks, announcements, announcement departments
+        with self.assertNumQueries(4):
+            context = build_portal_context(self.profile.user, self.today)
+
+        self.assertEqual(context['profile'], self.profile)
+        self.assertIsNotNone(context['attendance'].clock_in)
+        self.assertIsNone(context['attendance'].clock_out)
+        self.assertEqual(len(context['active_tasks']), 3)
+        self.assertEqual(context['next_shift'].start_time, self.next_shift.start_time)
+        self.assertEqual(
+            [a.title for a in context['announcements']],
+            ['Global notice', 'Deck drill'],
+        )
+
+    def test_dashboard_does_not_create_attendance(self):
+        Attendance.objects.all().delete()
+        build_portal_context(self.profile.user, self.today)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_portal_view_query_count(self):
+        self.client.force_login(self.profile.user)
+        # user, crew_id lookup, 4 dashboard queries; the session lives in
+        # the cache
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('crew_portal'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Deck drill')
+        self.assertNotContains(response, 'Engine only')
+
+        # A cache hit only loads the user; the crew_id and fragments are cached.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('crew_portal'))
+        self.assertContains(response, 'Deck drill')
+
+    def test_cached_fragments_hold_no_user_and_follow_user_changes(self):
+        reviewer = User.objects.create_user('hr', 'hr@example.com', 'x', first_name='Tolu')
+        Performance.objects.create(
+            crew=self.profile, review_date=self.today, rating=4, comments='Steady', reviewed_by=reviewer,
+        )
+        self.client.force_login(self.profile.user)
+        for name in ('crew_portal', 'profile', 'tasks', 'shift'):
+            self.client.get(reverse(name))
+        stored = list(cache._cache.values())
+        self.assertTrue(stored)
+        for password in (self.profile.user.password, reviewer.password):
+            self.assertFalse([value for value in stored if password.encode() in value])
+
+        user = self.profile.user
+        user.email = 'ada.okafor@example.com'
+        user.save()
+        reviewer.first_name = 'Tolulope'
+        reviewer.save()
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, 'ada.okafor@example.com')
+        self.assertContains(response, 'Tolulope')
+
+    async def test_portal_views_render_under_async_client(self):
+        # Any lazy query left for the template would raise
+        # SynchronousOnlyOperation here.
+        reviewer = await User.objects.acreate(username='hr', email='hr@example.com', first_name='Tolu')
+        await Performance.objects.acreate(
+            crew=self.profile, review_date=self.today, rating=4, comments='Steady', reviewed_by=reviewer,
+        )
+        await self.async_client.aforce_login(self.profile.user)
+        for name, text in [
+            ('crew_portal', 'Deck drill'), ('profile', 'Tolu'), ('tasks', 'Task 4'),
+            ('attendance', 'Clock'), ('shift', 'Shift'),
+        ]:
+            response = await self.async_client.get(reverse(name))
+            self.assertContains(response, text, msg_prefix=name)
+
+
+class PayrollRunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Deck')
+        cls.other_department = Department.objects.create(name='Engine')
+        cls.crew = [
+            create_crew(f'crew{i}@example.com', department=cls.department)
+            for i in range(3)
+        ]
+        cls.engine_crew = create_crew('engine@example.com', department=cls.other_department)
+        cls.month = date(2026, 9, 1)
+
+        for profile in cls.crew:
+            Payroll.objects.create(
+                crew=profile, month=date(2026, 8, 1),
+                basic_salary=Decimal('1600.00'), deductions=Decimal('25.50'),
+            )
+
+        # 10 hours worked against an 8 hour shift -> 2 overtime hours
+        day = datetime(2026, 9, 10, 8, 0)
+        start = timezone.make_aware(day)
+        Attendance.objects.create(
+            crew=cls.crew[0], date=day.date(),
+            clock_in=start, clock_out=start + timedelta(hours=10),
+        )
+        Shift.objects.create(crew=cls.crew[0], start_time=start, end_time=start + timedelta(hours=8))
+
+    def test_run_matches_payroll_save(self):
+        result = run_payroll(self.month, department=self.department)
+
+        self.assertEqual(result['created'], 3)
+        self.assertEqual(result['skipped'], [])
+        overtime = Payroll.objects.get(crew=self.crew[0], month=self.month)
+        # 1600 / 160 hourly rate * 1.5 multiplier * 2 hours
+        self.assertEqual(overtime.overtime_pay, Decimal('30.00'))
+        for payroll in Payroll.objects.filter(month=self.month):
+            bulk_net = payroll.net_salary
+            payroll.save()
+            payroll.refresh_from_db()
+            self.assertEqual(payroll.net_salary, bulk_net)
+        self.assertFalse(Payroll.objects.filter(crew=self.engine_crew).exists())
+
+    def test_rerun_keeps_manual_edits(self):
+        run_payroll(self.month, department=self.department)
+        Payroll.objects.filter(crew=self.crew[1], month=self.month).update(deductions=Decimal('100.00'))
+
+        result = run_payroll(self.month, department=self.department)
+
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['updated'], 3)
+        payroll = Payroll.objects.get(crew=self.crew[1], month=self.month)
+        self.assertEqual(payroll.net_salary, Decimal('1500.00'))
+
+    def test_crew_without_salary_is_skipped(self):
+        result = run_payroll(self.month, department=self.other_department)
+        self.assertEqual(result['skipped'], [self.engine_crew.pk])
+
+        result = run_payroll(self.month, department=self.other_department, default_basic_salary='1200')
+        self.assertEqual(result['created'], 1)
+
+    @override_settings(PAYROLL_CHUNK_SIZE=2)
+    def test_command_chunk_size_defaults_to_setting(self):
+        with mock.patch('crew_app.management.commands.run_payroll.run_payroll', wraps=run_payroll) as run:
+            call_command('run_payroll', '2026-09', department='Deck', stdout=io.StringIO())
+        self.assertEqual(run.call_args.kwargs['chunk_size'], 2)
+        self.assertEqual(Payroll.objects.filter(month=self.month).count(), 3)
+
+
+class HoursAggregationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+        for day, hours in [(date(2026, 9, 7), 8), (date(2026, 9, 8), 10), (date(2026, 10, 1), 6)]:
+            start = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=8))
+            Attendance.objects.create(
+                crew=cls.profile, date=day, clock_in=start, clock_out=start + timedelta(hours=hours),
+            )
+            Shift.objects.create(crew=cls.profile, start_time=start, end_time=start + timedelta(hours=8))
+        Attendance.objects.create(crew=cls.profile, date=date(2026, 10, 2), clock_in=timezone.now())
+
+    def test_with_hours_sorts_in_database(self):
+        records = list(Attendance.objects.with_hours().filter(worked__isnull=False).order_by('-worked'))
+        self.assertEqual([r.hours_worked() for r in records], [10.0, 8.0, 6.0])
+
+    def test_monthly_totals_single_query(self):
+        with self.assertNumQueries(1):
+            rows = list(Attendance.objects.totals(period='month'))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['total_worked'], timedelta(hours=18))
+        self.assertEqual(rows[1]['total_worked'], timedelta(hours=6))
+        self.assertEqual(rows[1]['days'], 2)
+
+    def test_shift_totals(self):
+        rows = list(Shift.objects.totals())
+        self.assertEqual(rows, [{'crew': self.profile.pk, 'total_duration': timedelta(hours=24), 'shifts': 3}])
+        shift = Shift.objects.with_duration().first()
+        self.assertEqual(shift.shift_duration(), 8.0)
+
+
+class HotQueryIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+
+    def test_per_crew_history_queries_use_composite_indexes(self):
+        plans = {
+            'shift_crew_start_idx': Shift.objects.filter(crew=self.profile).order_by('-start_time'),
+            'task_crew_status_deadline_idx': Task.objects.filter(
+                crew=self.profile, status='pending'
+            ).order_by('deadline'),
+            'crewprofile_status_name_idx': CrewProfile.objects.filter(recruitment_status='pending'),
+        }
+        for index_name, queryset in plans.items():
+            with self.subTest(index=index_name):
+                self.assertIn(index_name, queryset.explain())
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+        start = timezone.now()
+        # Pairs of shifts share a start time, so the id tiebreaker matters.
+        for n in range(25):
+            moment = start - timedelta(days=n // 2)
+            Shift.objects.create(crew=cls.profile, start_time=moment, end_time=moment + timedelta(hours=8))
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self):
+        return KeysetPaginator(Shift.objects.filter(crew=self.profile), ('-start_time', '-id'), 10)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        expected = list(Shift.objects.order_by('-start_time', '-id').values_list('id', flat=True))
+        paginator = self.paginator()
+
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            with self.assertNumQueries(1):
+                pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([shift.id for page in pages for shift in page], expected)
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([shift.id for shift in back], expected[10:20])
+        back = paginator.get_page(back.previous_cursor)
+        self.assertEqual([shift.id for shift in back], expected[:10])
+        self.assertFalse(back.has_previous())
+
+    def test_tampered_cursor_returns_first_page(self):
+        page = self.paginator().get_page('not-a-cursor')
+        self.assertEqual(page[0], Shift.objects.order_by('-start_time', '-id').first())
+
+    def test_tasks_view_keeps_filter_in_cursor_links(self):
+        for n in range(25):
+            Task.objects.create(
+                crew=self.profile, title=f'Task {n}', description='Check lines',
+                deadline=timezone.now() + timedelta(days=n),
+            )
+        self.client.force_login(self.profile.user)
+        response = self.client.get(reverse('tasks'), {'status': 'pending'})
+        self.assertEqual(len(response.context['tasks']), 20)
+        self.assertContains(response, '?status=pending&amp;cursor=')
+
+
+class PortalFragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Deck')
+        cls.profile = create_crew('first@example.com', department=cls.department)
+        cls.other = create_crew('second@example.com', department=cls.department, first_name='Bisi')
+
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.client.force_login(self.profile.user)
+
+    def test_fragments_are_per_user(self):
+        self.client.get(reverse('profile'))
+        self.client.force_login(self.other.user)
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['profile'], self.other)
+        self.assertEqual(cache_stats()['profile'], {'hits': 0, 'misses': 2})
+
+    def test_task_save_invalidates_tasks_and_dashboard(self):
+        self.client.get(reverse('tasks'))
+        self.client.get(reverse('crew_portal'))
+        task = Task.objects.create(
+            crew=self.profile, title='Inspect lifeboats', description='Weekly check',
+            deadline=timezone.now() + timedelta(days=1),
+        )
+        self.assertContains(self.client.get(reverse('tasks')), 'Inspect lifeboats')
+        self.assertContains(self.client.get(reverse('crew_portal')), 'Inspect lifeboats')
+
+        task.delete()
+        self.assertNotContains(self.client.get(reverse('tasks')), 'Inspect lifeboats')
+        self.assertEqual(cache_stats()['tasks'], {'hits': 0, 'misses': 3})
+
+    def test_junk_query_strings_share_the_first_page_entry(self):
+        self.client.get(reverse('tasks'))
+        for params in ({'cursor': 'junk'}, {'cursor': 'x y' * 200}, {'status': 'nonsense', 'cursor': '\x01'}):
+            self.assertEqual(self.client.get(reverse('tasks'), params).status_code, 200)
+        self.client.get(reverse('shift'), {'cursor': 'junk'})
+        self.client.get(reverse('shift'))
+        self.assertEqual(cache_stats()['tasks'], {'hits': 3, 'misses': 1})
+        self.assertEqual(cache_stats()['shifts'], {'hits': 1, 'misses': 1})
+        self.assertTrue(all(len(key) < 250 for key in cache._cache))
+
+    def test_other_crew_writes_keep_cache_warm(self):
+        self.client.get(reverse('profile'))
+        LeaveRequest.objects.create(
+            crew=self.other, start_date=date(2026, 11, 1), end_date=date(2026, 11, 3), reason='Family',
+        )
+        self.client.get(reverse('profile'))
+        self.assertEqual(cache_stats()['profile'], {'hits': 1, 'misses': 1})
+
+    def test_announcement_departments_change_invalidates_dashboard(self):
+        self.client.get(reverse('crew_portal'))
+        announcement = Announcement.objects.create(title='Deck drill', content='Muster at 0800')
+        self.assertNotContains(self.client.get(reverse('crew_portal')), 'Deck drill')
+        announcement.departments.add(self.department)
+        self.assertContains(self.client.get(reverse('crew_portal')), 'Deck drill')
+
+
+class AnnouncementFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deck = Department.objects.create(name='Deck')
+        cls.engine = Department.objects.create(name='Engine')
+        cls.deck_crew = [create_crew(f'deck{i}@example.com', department=cls.deck) for i in range(3)]
+        cls.engine_crew = create_crew('engine@example.com', department=cls.engine)
+        cls.unassigned = create_crew('unassigned@example.com')
+
+    def test_feed_follows_announcement_and_department_changes(self):
+        drill = Announcement.objects.create(title='Deck drill', content='Muster at 0800')
+        drill.departments.add(self.deck)
+        notice = Announcement.objects.create(title='Global notice', content='Payday moved', is_global=True)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(department_feed(self.deck.pk, 5), [notice, drill])
+        self.assertEqual(department_feed(self.engine.pk, 5), [notice])
+        self.assertEqual(department_feed(None, 5), [notice])
+
+        drill.departments.remove(self.deck)
+        self.engine.announcements.add(drill)
+        self.assertEqual(department_feed(self.deck.pk, 5), [notice])
+        self.assertEqual(department_feed(self.engine.pk, 5), [notice, drill])
+
+        catering = Department.objects.create(name='Catering')
+        self.assertEqual(department_feed(catering.pk, 5), [notice])
+
+    def test_send_delivers_to_target_departments_in_chunks(self):
+        drill = Announcement.objects.create(title='Deck drill', content='Muster at 0800')
+        drill.departments.add(self.deck)
+
+        self.assertEqual(send_announcement(drill, chunk_size=2), 3)
+        self.assertEqual(
+            set(AnnouncementDelivery.objects.values_list('crew', flat=True)),
+            {profile.pk for profile in self.deck_crew},
+        )
+
+        notice = Announcement.objects.create(title='Global notice', content='Payday moved', is_global=True)
+        self.assertEqual(send_announcement(notice, chunk_size=2), 5)
+        send_announcement(notice)
+        self.assertEqual(AnnouncementDelivery.objects.filter(announcement=notice).count(), 5)
+
+
+class RosterImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deck = Department.objects.create(name='Deck')
+        cls.bosun = Position.objects.create(title='Bosun', department=cls.deck)
+        create_crew('taken@example.com')
+
+    def roster(self, *lines):
+        header = 'Email,Password,First_Name,Last_Name,Phone_Number,Date_Of_Birth,Address,Department,Position'
+        return read_rows(io.BytesIO('\n'.join([header, *lines]).encode()), 'roster.csv')
+
+    def test_imports_valid_rows_and_reports_errors(self):
+        rows = self.roster(
+            'ada@example.com,s3cret-pass,Ada,Okafor,0801,1990-01-01,1 Marina,deck,bosun',
+            'tunde@example.com,,Tunde,Bello,0802,1991-02-02,2 Marina,Deck,',
+            'taken@example.com,,Bisi,Eze,0803,1992-03-03,3 Marina,Deck,',
+            'ada@example.com,,Ada,Again,0804,1993-04-04,4 Marina,Deck,',
+            'bad-email,,Emeka,Nwosu,0805,not-a-date,5 Marina,Galley,',
+        )
+        # Lookup maps, then for the first chunk an email check, two inserts
+        # and the search index batch in a savepoint. The second chunk has no
+        # valid rows left to check.
+        with self.assertNumQueries(8):
+            result = import_roster(rows, status='approved', chunk_size=3, workers=0)
+
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([line for line, _ in result['errors']], [4, 5, 6])
+        self.assertIn('date_of_birth', result['errors'][2][1])
+        self.assertIn('department', result['errors'][2][1])
+
+        ada = CrewProfile.objects.select_related('user').get(user__email='ada@example.com')
+        self.assertEqual((ada.department, ada.position), (self.deck, self.bosun))
+        self.assertEqual(ada.recruitment_status, 'approved')
+        self.assertTrue(ada.user.check_password('s3cret-pass'))
+        self.assertFalse(User.objects.get(email='tunde@example.com').has_usable_password())
+
+    def test_dry_run_writes_nothing(self):
+        result = import_roster(
+            self.roster('ada@example.com,,Ada,Okafor,0801,1990-01-01,1 Marina,,'),
+            workers=0, dry_run=True,
+        )
+        self.assertEqual(result['created'], 1)
+        self.assertFalse(User.objects.filter(email='ada@example.com').exists())
+
+    def test_admin_upload_hashes_in_process(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin_user)
+        header = 'Email,Password,First_Name,Last_Name,Phone_Number,Date_Of_Birth,Address,Department,Position'
+        rows = [f'crew{n}@example.com,,Ada,Okafor,0801,1990-01-01,{"x" * 200},Deck,' for n in range(400)]
+        roster = SimpleUploadedFile('roster.csv', '\n'.join([header, *rows]).encode())
+        self.assertGreater(roster.size, 64 * 1024)
+        with mock.patch('crew_app.roster_import.process_pool') as pool:
+            response = self.client.post(
+                reverse('admin:crew_app_crewprofile_import_roster'), {'roster': roster, 'status': 'pending'},
+            )
+        pool.assert_not_called()
+        self.assertRedirects(response, reverse('admin:crew_app_crewprofile_changelist'), fetch_redirect_response=False)
+        self.assertEqual(CrewProfile.objects.filter(user__email__startswith='crew').count(), 400)
+
+
+    def test_worker_pools_set_up_django_unless_told_not_to(self):
+        with mock.patch('crew_app.workers.ProcessPoolExecutor') as executor:
+            process_pool(2)
+            process_pool(1, django=False, max_tasks_per_child=5)
+        self.assertEqual(executor.call_args_list, [
+            mock.call(max_workers=2, initializer=init_worker),
+            mock.call(max_workers=1, max_tasks_per_child=5),
+        ])
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deck = Department.objects.create(name='Deck')
+        cls.engine = Department.objects.create(name='Engine')
+        cls.deck_crew = create_crew('deck@example.com', department=cls.deck)
+        cls.engine_crew = create_crew('engine@example.com', department=cls.engine)
+        cls.hr = User.objects.create_user(username='hr@example.com', email='hr@example.com', password='x', is_hr=True)
+        start = timezone.make_aware(datetime(2026, 9, 1, 8))
+        for n in range(30):
+            for profile in (cls.deck_crew, cls.engine_crew):
+                clock_in = start + timedelta(days=n)
+                Attendance.objects.create(
+                    crew=profile, date=clock_in.date(),
+                    clock_in=clock_in, clock_out=clock_in + timedelta(hours=7, minutes=30),
+                )
+
+    def export(self, kind, **params):
+        response = self.client.get(reverse('export_csv', args=[kind]), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_attendance_export_filters_by_range_and_department(self):
+        self.client.force_login(self.hr)
+        lines = self.export(
+            'attendance', start='2026-09-10', end='2026-09-19', department=self.deck.pk,
+        )
+        self.assertEqual(lines[0], 'Crew ID,First name,Last name,Department,Date,Clock in,Clock out,Hours worked')
+        self.assertEqual(len(lines), 11)
+        self.assertTrue(all(line.startswith(str(self.deck_crew.crew_id)) for line in lines[1:]))
+        self.assertTrue(lines[1].endswith(',7.50'))
+
+    def test_export_streams_from_one_cursor(self):
+        self.client.force_login(self.hr)
+        response = self.client.get(reverse('export_csv', args=['attendance']))
+        with self.assertNumQueries(1):
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 61)
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.hr)
+        response = await self.async_client.get(reverse('export_csv', args=['attendance']))
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), 61)
+
+    def test_export_escapes_formula_cells(self):
+        for reason in ('=HYPERLINK("http://example.com")', '+1', '-1', '@SUM(A1)', 'Family visit'):
+            LeaveRequest.objects.create(
+                crew=self.deck_crew, start_date=date(2026, 9, 1), end_date=date(2026, 9, 2), reason=reason,
+            )
+        self.client.force_login(self.hr)
+        reasons = [row[6] for row in csv.reader(self.export('leave')[1:])]
+        self.assertEqual(
+            reasons, ['\'=HYPERLINK("http://example.com")', "'+1", "'-1", "'@SUM(A1)", 'Family visit'],
+        )
+
+    def test_export_requires_hr(self):
+        self.client.force_login(self.deck_crew.user)
+        response = self.client.get(reverse('export_csv', args=['payroll']))
+        self.assertEqual(response.status_code, 403)
+
+
+class ClockEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+        cls.other = create_crew('other@example.com')
+        cls.day = date(2026, 9, 1)
+        cls.morning = timezone.make_aware(datetime(2026, 9, 1, 8))
+
+    def test_clock_in_is_idempotent(self):
+        # conditional update, insert in a savepoint, monthly summary aggregate and upsert
+        with self.assertNumQueries(6):
+            self.assertEqual(clock.clock_in(self.profile, self.day, self.morning), clock.CLOCKED_IN)
+        later = self.morning + timedelta(minutes=5)
+        self.assertEqual(clock.clock_in(self.profile, self.day, later), clock.ALREADY_CLOCKED_IN)
+        self.assertEqual(Attendance.objects.get(crew=self.profile).clock_in, self.morning)
+
+    def test_clock_in_claims_blank_row_with_one_update(self):
+        Attendance.objects.create(crew=self.profile, date=self.day)
+        with self.assertNumQueries(3):  # plus the summary refresh
+            self.assertEqual(clock.clock_in(self.profile, self.day, self.morning), clock.CLOCKED_IN)
+
+    def test_clock_out(self):
+        evening = self.morning + timedelta(hours=9)
+        self.assertEqual(clock.clock_out(self.profile, self.day, evening), clock.NOT_CLOCKED_IN)
+        clock.clock_in(self.profile, self.day, self.morning)
+        with self.assertNumQueries(3):  # plus the summary refresh
+            self.assertEqual(clock.clock_out(self.profile, self.day, evening), clock.CLOCKED_OUT)
+        self.assertEqual(clock.clock_out(self.profile, self.day, evening), clock.ALREADY_CLOCKED_OUT)
+
+    def test_batch_applies_first_event_per_crew(self):
+        unknown = uuid.uuid4()
+        events = [
+            (self.profile.crew_id, 'in', self.morning + timedelta(minutes=2)),
+            (self.profile.crew_id, 'in', self.morning),
+            (self.other.crew_id, 'out', self.morning),
+            (unknown, 'in', self.morning),
+            (self.profile.crew_id, 'out', self.morning + timedelta(hours=8)),
+        ]
+        with self.assertNumQueries(10):
+            results = clock.record_events(events)
+        self.assertEqual(results, [
+            clock.ALREADY_CLOCKED_IN, clock.CLOCKED_IN, clock.NOT_CLOCKED_IN,
+            clock.UNKNOWN_CREW, clock.CLOCKED_OUT,
+        ])
+        attendance = Attendance.objects.get(crew=self.profile)
+        self.assertEqual(attendance.hours_worked(), 8.0)
+        self.assertFalse(Attendance.objects.filter(crew=self.other).exists())
+
+        results = clock.record_events([(self.profile.crew_id, 'in', self.morning)])
+        self.assertEqual(results, [clock.ALREADY_CLOCKED_IN])
+
+    def test_batch_endpoint_requires_permission(self):
+        self.client.force_login(self.profile.user)
+        response = self.client.post(
+            reverse('clock_batch'), {'events': []}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+        kiosk = User.objects.create_superuser('kiosk', 'kiosk@example.com', 'x')
+        self.client.force_login(kiosk)
+        response = self.client.post(reverse('clock_batch'), {'events': [
+            {'crew_id': str(self.profile.crew_id), 'action': 'in', 'timestamp': self.morning.isoformat()},
+        ]}, content_type='application/json')
+        self.assertEqual(response.json(), {'status': 'success', 'results': [clock.CLOCKED_IN]})
+
+        response = self.client.post(reverse('clock_batch'), {'events': [
+            {'crew_id': str(self.profile.crew_id), 'action': 'lunch'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ClockQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+        cls.morning = timezone.make_aware(datetime(2026, 9, 1, 8))
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(CLOCK_INGESTION='queue', CLOCK_QUEUE_PATH=f'{directory.name}/queue.sqlite3')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_view_enqueues_and_worker_persists(self):
+        self.client.force_login(self.profile.user)
+        with self.assertNumQueries(2):  # user, crew profile; no attendance writes
+            self.client.post(reverse('clock_in'))
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(clock_queue.pending_count(), 1)
+
+        self.assertEqual(clock_queue.drain(), 1)
+        self.assertEqual(clock_queue.pending_count(), 0)
+        self.assertTrue(Attendance.objects.filter(crew=self.profile, clock_in__isnull=False).exists())
+        self.assertEqual(clock_queue.drain(), 0)
+
+    def test_drain_coalesces_duplicates_in_batches(self):
+        clock_queue.enqueue_many([
+            (self.profile.crew_id, 'in', self.morning + timedelta(minutes=minute))
+            for minute in range(5)
+        ] + [(self.profile.crew_id, 'out', self.morning + timedelta(hours=8))])
+        self.assertEqual(clock_queue.drain(batch_size=4), 4)
+        self.assertEqual(clock_queue.drain(batch_size=4), 2)
+        attendance = Attendance.objects.get(crew=self.profile)
+        self.assertEqual(attendance.clock_in, self.morning)
+        self.assertEqual(attendance.hours_worked(), 8.0)
+
+    def test_batch_endpoint_acknowledges_without_writing(self):
+        kiosk = User.objects.create_superuser('kiosk', 'kiosk@example.com', 'x')
+        self.client.force_login(kiosk)
+        response = self.client.post(reverse('clock_batch'), {'events': [
+            {'crew_id': str(self.profile.crew_id), 'action': 'in', 'timestamp': self.morning.isoformat()},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'status': 'queued', 'queued': 1})
+        self.assertFalse(Attendance.objects.exists())
+
+
+class ShiftSchedulingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deck = Department.objects.create(name='Deck')
+        cls.engine = Department.objects.create(name='Engine')
+        cls.profile = create_crew(department=cls.deck)
+        cls.on_leave = create_crew('leave@example.com', department=cls.deck)
+        cls.engineer = create_crew('engine@example.com', department=cls.engine)
+        # 2026-11-02 is a Monday.
+        LeaveRequest.objects.create(
+            crew=cls.on_leave, start_date=date(2026, 11, 3), end_date=date(2026, 11, 4),
+            reason='Family', status='approved',
+        )
+        LeaveRequest.objects.create(
+            crew=cls.profile, start_date=date(2026, 11, 2), end_date=date(2026, 11, 6), reason='Pending',
+        )
+        Shift.objects.create(
+            crew=cls.profile,
+            start_time=timezone.make_aware(datetime(2026, 11, 2, 12)),
+            end_time=timezone.make_aware(datetime(2026, 11, 2, 20)),
+        )
+        cls.template = parse_template([
+            {'weekdays': [0, 1, 2, 3, 4], 'start': '08:00', 'end': '16:00', 'description': 'Day watch'},
+            {'weekdays': [4], 'start': '22:00', 'end': '06:00', 'description': 'Night watch'},
+        ])
+
+    def test_interval_index(self):
+        index = IntervalIndex([(1, 4), (3, 6), (10, 12)])
+        self.assertEqual((index.starts, index.ends), ([1, 10], [6, 12]))
+        self.assertTrue(index.overlaps(5, 7))
+        self.assertTrue(index.overlaps(0, 2))
+        self.assertFalse(index.overlaps(6, 10))
+        index.add(7, 9)
+        self.assertTrue(index.overlaps(8, 8.5))
+
+    def test_schedules_department_without_double_booking(self):
+        # roster lock, existing shifts, approved leave and bulk insert in a savepoint
+        with self.assertNumQueries(6):
+            result = schedule_shifts(self.template, date(2026, 11, 2), date(2026, 11, 6), departments=[self.deck])
+        self.assertEqual(result['created'], 5 + 4)
+        self.assertEqual(
+            sorted((crew_id == self.on_leave.crew_id, reason) for crew_id, _, _, reason in result['conflicts']),
+            [(False, 'shift'), (True, 'leave'), (True, 'leave')],
+        )
+        self.assertFalse(Shift.objects.filter(crew=self.engineer).exists())
+        night = Shift.objects.get(crew=self.profile, description='Night watch')
+        self.assertEqual(night.shift_duration(), 8.0)
+
+        again = schedule_shifts(self.template, date(2026, 11, 2), date(2026, 11, 6), departments=[self.deck])
+        self.assertEqual(again['created'], 0)
+        self.assertEqual(len(again['conflicts']), 12)
+
+    def test_dry_run_and_manual_entry_check(self):
+        result = schedule_shifts(self.template, date(2026, 11, 2), date(2026, 11, 2), dry_run=True)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(Shift.objects.count(), 1)
+
+        form = ShiftForm(data={
+            'crew': self.on_leave.pk, 'start_time': '2026-11-04 09:00', 'end_time': '2026-11-04 17:00',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('approved leave', str(form.errors))
+        form = ShiftForm(data={
+            'crew': self.on_leave.pk, 'start_time': '2026-11-05 09:00', 'end_time': '2026-11-05 17:00',
+        })
+        self.assertTrue(form.is_valid())
+
+
+class LeaveCoverageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deck = Department.objects.create(name='Deck')
+        cls.engine = Department.objects.create(name='Engine')
+        cls.first = create_crew(department=cls.deck)
+        cls.second = create_crew('second@example.com', department=cls.deck)
+        cls.engineer = create_crew('engine@example.com', department=cls.engine)
+        cls.long_leave = LeaveRequest.objects.create(
+            crew=cls.first, start_date=date(2026, 1, 10), end_date=date(2026, 3, 10), reason='Study',
+        )
+        cls.short_leave = LeaveRequest.objects.create(
+            crew=cls.second, start_date=date(2026, 3, 9), end_date=date(2026, 3, 12), reason='Family',
+        )
+        Shift.objects.create(
+            crew=cls.engineer,
+            start_time=timezone.make_aware(datetime(2026, 3, 10, 8)),
+            end_time=timezone.make_aware(datetime(2026, 3, 10, 16)),
+        )
+
+    def deck_on_leave(self, start=date(2026, 3, 8), end=date(2026, 3, 13)):
+        groups = {group['name']: group for group in coverage_calendar(start, end)['groups']}
+        return groups['Deck']['on_leave']
+
+    def test_approval_updates_counts_incrementally(self):
+        self.assertEqual(self.deck_on_leave(), [0] * 6)
+        set_leave_status(LeaveRequest.objects.all(), 'approved')
+        self.assertEqual(self.deck_on_leave(), [1, 2, 2, 1, 1, 0])
+
+        set_leave_status(LeaveRequest.objects.filter(pk=self.short_leave.pk), 'rejected')
+        self.assertEqual(self.deck_on_leave(), [1, 1, 1, 0, 0, 0])
+
+        # Saves outside the service are tracked by signals.
+        self.long_leave.refresh_from_db()
+        self.long_leave.end_date = date(2026, 3, 8)
+        self.long_leave.save()
+        self.assertEqual(self.deck_on_leave(), [1, 0, 0, 0, 0, 0])
+
+        self.first.department = self.engine
+        self.first.save()
+        self.assertEqual(self.deck_on_leave(), [0] * 6)
+
+        self.short_leave.status = 'approved'
+        self.short_leave.save()
+        incremental = coverage_calendar(date(2026, 1, 1), date(2026, 12, 31))
+        rebuild_coverage()
+        self.assertEqual(coverage_calendar(date(2026, 1, 1), date(2026, 12, 31)), incremental)
+
+    def test_year_calendar_in_fixed_queries(self):
+        set_leave_status(LeaveRequest.objects.all(), 'approved')
+        # baseline, in-range deltas, shifts, headcount, names
+        with self.assertNumQueries(5):
+            calendar = coverage_calendar(date(2026, 1, 1), date(2026, 12, 31))
+        self.assertEqual(len(calendar['days']), 365)
+        engine = next(group for group in calendar['groups'] if group['name'] == 'Engine')
+        self.assertEqual(engine['headcount'], 1)
+        self.assertEqual(engine['scheduled'][calendar['days'].index(date(2026, 3, 10))], 1)
+        self.assertEqual(sum(engine['scheduled']), 1)
+
+    def test_shift_counts_use_datetime_bounds(self):
+        # Local midnight either side of the range: the first counts, the second does not.
+        for moment in (datetime(2026, 3, 8, 0, 0), datetime(2026, 3, 14, 0, 0)):
+            Shift.objects.create(
+                crew=self.first, start_time=timezone.make_aware(moment),
+                end_time=timezone.make_aware(moment + timedelta(hours=8)),
+            )
+        with CaptureQueriesContext(connection) as queries:
+            calendar = coverage_calendar(date(2026, 3, 8), date(2026, 3, 13))
+        deck = next(group for group in calendar['groups'] if group['name'] == 'Deck')
+        self.assertEqual(deck['scheduled'], [1, 0, 0, 0, 0, 0])
+        shift_sql = next(query['sql'] for query in queries if '"crew_app_shift"' in query['sql'])
+        where = shift_sql.split(' WHERE ', 1)[1].split(' GROUP BY ', 1)[0]
+        self.assertNotIn('cast_date', where)
+
+    def test_calendar_endpoint(self):
+        self.client.force_login(self.first.user)
+        url = reverse('coverage_calendar')
+        self.assertEqual(self.client.get(url, {'start': '2026-03-08', 'end': '2026-03-13'}).status_code, 403)
+
+        hr = User.objects.create_user('hr', 'hr@example.com', 'x', is_hr=True)
+        self.client.force_login(hr)
+        set_leave_status(LeaveRequest.objects.all(), 'approved')
+        response = self.client.get(url, {'start': '2026-03-08', 'end': '2026-03-13', 'group_by': 'department'})
+        self.assertEqual(response.json()['days'][0], '2026-03-08')
+        self.assertEqual(response.json()['groups'][0]['on_leave'], [1, 2, 2, 1, 1, 0])
+        self.assertEqual(self.client.get(url, {'start': '2026-03-13', 'end': '2026-03-08'}).status_code, 400)
+
+
+class AttendanceSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+        cls.other = create_crew('other@example.com')
+
+    def setUp(self):
+        cache.clear()
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, datetime.min.time().replace(hour=hour, minute=minute)))
+
+    def summary(self, month=date(2026, 9, 1)):
+        return AttendanceSummary.objects.get(crew=self.profile, month=month)
+
+    def test_maintained_from_attendance_writes(self):
+        first = Attendance.objects.create(
+            crew=self.profile, date=date(2026, 9, 1),
+            clock_in=self.at(date(2026, 9, 1), 8), clock_out=self.at(date(2026, 9, 1), 16),
+        )
+        clock.clock_in(self.profile, date(2026, 9, 2), self.at(date(2026, 9, 2), 9, 30))
+        summary = self.summary()
+        self.assertEqual(
+            (summary.days_present, summary.hours_worked(), summary.late_arrivals, summary.missing_clock_outs),
+            (2, 8.0, 1, 1),
+        )
+
+        clock.clock_out(self.profile, date(2026, 9, 2), self.at(date(2026, 9, 2), 17, 30))
+        clock.record_events([(self.other.crew_id, 'in', self.at(date(2026, 9, 2), 8))])
+        summary = self.summary()
+        self.assertEqual((summary.hours_worked(), summary.missing_clock_outs), (16.0, 0))
+        self.assertEqual(AttendanceSummary.objects.get(crew=self.other).days_present, 1)
+
+        first.date = date(2026, 10, 1)
+        first.save()
+        self.assertEqual(self.summary().days_present, 1)
+        self.assertEqual(self.summary(date(2026, 10, 1)).days_present, 1)
+        first.delete()
+        self.assertFalse(AttendanceSummary.objects.filter(crew=self.profile, month=date(2026, 10, 1)).exists())
+
+        incremental = list(AttendanceSummary.objects.order_by('pk').values_list(
+            'crew', 'month', 'days_present', 'total_worked', 'late_arrivals', 'missing_clock_outs',
+        ))
+        self.assertEqual(rebuild_month(date(2026, 9, 15)), 2)
+        self.assertEqual(sorted(incremental), sorted(AttendanceSummary.objects.values_list(
+            'crew', 'month', 'days_present', 'total_worked', 'late_arrivals', 'missing_clock_outs',
+        )))
+
+    def test_profile_page_reads_summaries(self):
+        Attendance.objects.create(
+            crew=self.profile, date=date(2026, 9, 1),
+            clock_in=self.at(date(2026, 9, 1), 8), clock_out=self.at(date(2026, 9, 1), 16),
+        )
+        self.client.force_login(self.profile.user)
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(list(response.context['monthly_summaries']), [self.summary()])
+        self.assertContains(response, 'September 2026')
+
+    def test_rebuild_command_runs_in_process_on_sqlite(self):
+        Attendance.objects.create(
+            crew=self.profile, date=date(2026, 9, 1),
+            clock_in=self.at(date(2026, 9, 1), 8), clock_out=self.at(date(2026, 9, 1), 16),
+        )
+        AttendanceSummary.objects.all().delete()
+        out = io.StringIO()
+        with mock.patch('crew_app.management.commands.rebuild_attendance_summary.process_pool') as pool:
+            call_command('rebuild_attendance_summary', stdout=out)
+        pool.assert_not_called()
+        self.assertIn('2026-09: 1 summaries', out.getvalue())
+        self.assertEqual(self.summary().days_present, 1)
+
+
+class HRMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deck = Department.objects.create(name='Deck')
+        cls.engine = Department.objects.create(name='Engine')
+        cls.first = create_crew(department=cls.deck)
+        cls.applicant = create_crew('applicant@example.com', department=cls.deck, recruitment_status='pending')
+        cls.engineer = create_crew('engine@example.com', department=cls.engine)
+        cls.hr = User.objects.create_user('hr', 'hr@example.com', 'x', is_hr=True)
+        refresh_metrics()
+
+    def metrics(self, department):
+        return DepartmentMetrics.objects.get(department=department)
+
+    def snapshot(self):
+        return sorted(DepartmentMetrics.objects.values_list(
+            'department', 'pending_crew', 'approved_crew', 'rejected_crew', 'open_leave', 'overdue_tasks',
+            'payroll_month', 'payroll_crew', 'payroll_total', 'payroll_unpaid', 'rating_total', 'rating_count',
+        ))
+
+    def test_writes_refresh_affected_departments(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(
+                crew=self.first, title='Paint', description='Hull', deadline=timezone.now() - timedelta(days=1),
+            )
+            LeaveRequest.objects.create(
+                crew=self.first, start_date=date(2026, 3, 1), end_date=date(2026, 3, 2), reason='Rest',
+            )
+            Performance.objects.create(crew=self.first, review_date=date(2026, 3, 1), rating=4, comments='Good')
+            Performance.objects.create(crew=self.engineer, review_date=date(2026, 3, 1), rating=2, comments='Late')
+            Payroll.objects.create(crew=self.first, month=date(2026, 2, 1), basic_salary=Decimal('1000.00'), net_salary=0)
+        # The writes only flag their departments.
+        self.assertEqual((self.metrics(self.deck).stale, self.metrics(self.deck).open_leave), (True, 0))
+        self.assertTrue(self.metrics(self.engine).stale)
+        dashboard_metrics()
+        deck = self.metrics(self.deck)
+        self.assertFalse(deck.stale)
+        self.assertEqual(
+            (deck.approved_crew, deck.pending_crew, deck.open_leave, deck.overdue_tasks),
+            (1, 1, 1, 1),
+        )
+        self.assertEqual((deck.payroll_month, deck.payroll_total, deck.average_rating()), (date(2026, 2, 1), Decimal('1000.00'), 4))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.department = self.engine
+            self.first.save()
+        refresh_stale()
+        self.assertEqual((self.metrics(self.deck).approved_crew, self.metrics(self.deck).open_leave), (0, 0))
+        self.assertEqual(self.metrics(self.engine).approved_crew, 2)
+        self.assertEqual(self.metrics(self.engine).average_rating(), 3)
+
+        incremental = self.snapshot()
+        refresh_metrics()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_bulk_services_refresh_metrics(self):
+        leave = LeaveRequest.objects.create(
+            crew=self.first, start_date=date(2026, 3, 1), end_date=date(2026, 3, 2), reason='Rest',
+        )
+        refresh_metrics()
+        self.assertEqual(self.metrics(self.deck).open_leave, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            set_leave_status(LeaveRequest.objects.filter(pk=leave.pk), 'approved')
+            run_payroll(date(2026, 2, 1), default_basic_salary='1200.00')
+        totals = dashboard_metrics()['totals']
+        self.assertEqual(self.metrics(self.deck).open_leave, 0)
+        self.assertEqual((totals['payroll_month'], totals['payroll_crew'], totals['payroll_total']), (date(2026, 2, 1), 2, Decimal('2400.00')))
+
+    def test_write_marks_its_department_in_one_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(crew=self.first, title='Paint', description='Hull', deadline=timezone.now())
+        DepartmentMetrics.objects.update(stale=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            task.status = 'completed'
+            task.save()
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(
+            list(DepartmentMetrics.objects.filter(stale=True).values_list('department', flat=True)), [self.deck.pk]
+        )
+
+        new = Department.objects.create(name='Galley')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_crew('cook@example.com', department=new)
+        self.assertTrue(self.metrics(new).stale)
+        self.assertEqual(refresh_stale(), 2)
+        self.assertEqual((self.metrics(new).approved_crew, self.metrics(new).stale), (1, False))
+
+    def test_dashboard_reads_metrics_in_fixed_queries(self):
+        for n in range(30):
+            create_crew(f'applicant{n}@example.com', department=self.engine, recruitment_status='pending')
+        refresh_metrics()
+        self.client.force_login(self.hr)
+        # user, department metrics, pending page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['metrics']['totals']['pending_crew'], 31)
+        self.assertEqual(len(response.context['pending_profiles']), 25)
+        self.assertTrue(response.context['pending_profiles'].has_next())
+        self.assertContains(response, 'Engine')
+
+        self.client.force_login(self.first.user)
+        self.assertRedirects(self.client.get(reverse('admin_dashboard')), reverse('login'), fetch_redirect_response=False)
+
+
+class AdminChangelistQueryTests(TestCase):
+    CHANGELISTS = [
+        'crewprofile', 'position', 'document', 'attendance', 'attendancesummary', 'shift',
+        'leaverequest', 'task', 'payroll', 'performance', 'announcement', 'departmentmetrics',
+        'statuschange',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'x')
+        cls.deck = Department.objects.create(name='Deck')
+        cls.bosun = Position.objects.create(title='Bosun', department=cls.deck)
+
+    def setUp(self):
+        self.crew = []
+        self.client.force_login(self.admin)
+
+    def add_crew(self, count):
+        start = timezone.make_aware(datetime(2026, 9, 1, 8))
+        for n in range(len(self.crew), len(self.crew) + count):
+            profile = create_crew(f'admin{n}@example.com', department=self.deck, position=self.bosun)
+            self.crew.append(profile)
+            Attendance.objects.create(crew=profile, date=date(2026, 9, 1), clock_in=start, clock_out=start + timedelta(hours=8))
+            Shift.objects.create(crew=profile, start_time=start, end_time=start + timedelta(hours=8))
+            Task.objects.create(crew=profile, title='Paint', description='Hull', deadline=start)
+            LeaveRequest.objects.create(crew=profile, start_date=date(2026, 9, 2), end_date=date(2026, 9, 3), reason='Rest')
+            Payroll.objects.create(crew=profile, month=date(2026, 9, 1), basic_salary=Decimal('1000.00'), net_salary=0)
+            Performance.objects.create(crew=profile, review_date=date(2026, 9, 1), rating=3, comments='Fine', reviewed_by=self.admin)
+            profile.documents.create(title='Passport', file='crew_documents/passport.pdf')
+            Announcement.objects.create(title=f'Notice {n}', content='Muster at 8', created_by=self.admin)
+        refresh_metrics()
+
+    def changelist_queries(self, name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:crew_app_{name}_changelist'), params)
+        self.assertEqual(response.status_code, 200, name)
+        return len(queries)
+
+    def test_changelists_use_fixed_queries(self):
+        self.add_crew(2)
+        small = {name: self.changelist_queries(name) for name in self.CHANGELISTS}
+        self.add_crew(8)
+        for name in self.CHANGELISTS:
+            with self.subTest(changelist=name):
+                self.assertEqual(self.changelist_queries(name), small[name])
+                self.assertLessEqual(small[name], 8)
+
+    def test_autocomplete_filter_renders_selected_crew_only(self):
+        self.add_crew(3)
+        profile = self.crew[0]
+        response = self.client.get(reverse('admin:crew_app_shift_changelist'), {'crew__id__exact': profile.pk})
+        self.assertEqual(list(response.context['cl'].result_list), list(profile.shifts.all()))
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, 'select2')
+        self.assertEqual(
+            self.changelist_queries('shift', crew__id__exact=profile.pk),
+            self.changelist_queries('shift') + 1,  # the selected crew member's label
+        )
+
+    def test_estimated_count_only_for_large_unfiltered_tables(self):
+        self.add_crew(2)
+        with mock.patch('crew_app.pagination.estimated_row_count', return_value=250_000):
+            self.assertEqual(EstimatedCountPaginator(Task.objects.all(), 100).count, 250_000)
+            self.assertEqual(EstimatedCountPaginator(Task.objects.filter(crew=self.crew[0]), 100).count, 1)
+        with mock.patch('crew_app.pagination.estimated_row_count', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(Task.objects.all(), 100).count, 2)
+        # SQLite keeps no estimate.
+        self.assertIsNone(estimated_row_count(Task))
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = create_crew(phone_number='08031234567')
+        cls.tunde = create_crew('tunde@example.com', first_name='Tunde', last_name='Adeyemi')
+        cls.passport = cls.ada.documents.create(title='Passport scan', file='crew_documents/passport.pdf')
+        cls.task = Task.objects.create(
+            crew=cls.tunde, title='Paint the hull', description='Port side', deadline=timezone.now(),
+        )
+        cls.drill = Announcement.objects.create(title='Fire drill', content='Muster at the lifeboats')
+
+    def found(self, query, kinds=None):
+        return {(result['kind'], result['id']) for result in search(query, kinds=kinds)}
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.found('ada oka'), {('crew', self.ada.pk), ('document', self.passport.pk)})
+        self.assertEqual(self.found('0803123'), {('crew', self.ada.pk)})
+        self.assertEqual(self.found(str(self.ada.crew_id)), {('crew', self.ada.pk)})
+        self.assertEqual(self.found('lifeboat'), {('announcement', self.drill.pk)})
+        self.assertEqual(self.found('hull', kinds=['crew']), set())
+
+        self.ada.last_name = 'Nwosu'
+        self.ada.save()
+        self.assertEqual(self.found('okafor'), set())
+        self.assertEqual(self.found('nwosu'), {('crew', self.ada.pk), ('document', self.passport.pk)})
+
+        self.task.delete()
+        self.assertEqual(self.found('hull'), set())
+
+        incremental = {kind: self.found('a', kinds=[kind]) for kind in ('crew', 'document', 'announcement', 'task')}
+        self.assertEqual(rebuild_index(), {'crew': 2, 'document': 1, 'announcement': 1, 'task': 0})
+        self.assertEqual({kind: self.found('a', kinds=[kind]) for kind in incremental}, incremental)
+
+    def test_search_is_one_query_and_matches_fallback(self):
+        with self.assertNumQueries(1):
+            search('tunde')
+        fallback = DatabaseBackend()
+        for query in ('ada', 'Adeyemi hull', 'passport', '0803'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    set(filter_queryset(CrewProfile.objects.all(), query)),
+                    set(fallback.filter(CrewProfile.objects.all(), 'crew', query)),
+                )
+        self.assertEqual(search('!!'), [])
+
+    def test_admin_and_endpoint_use_the_index(self):
+        root = User.objects.create_superuser('root', 'root@example.com', 'x')
+        self.client.force_login(root)
+        response = self.client.get(reverse('admin:crew_app_crewprofile_changelist'), {'q': 'tun'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.tunde])
+        response = self.client.get(reverse('admin:crew_app_task_changelist'), {'q': 'adeyemi'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.task])
+
+        response = self.client.get(reverse('search'), {'q': 'passport', 'kind': 'document'})
+        self.assertEqual(response.json()['results'], [{'kind': 'document', 'id': self.passport.pk, 'title': 'Passport scan'}])
+        self.assertEqual(self.client.get(reverse('search')).status_code, 400)
+        self.client.force_login(self.ada.user)
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'ada'}).status_code, 403)
+
+
+class EmailAuthBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew('Ada.Okafor@Example.com')
+        cls.staff = User.objects.create_user('harbourmaster', 'harbour@example.com', 'pass12345', is_staff=True)
+
+    def test_one_lookup_with_the_profile_joined(self):
+        self.assertEqual(self.profile.user.email, 'ada.okafor@example.com')
+        with self.assertNumQueries(1):
+            user = EmailAuthBackend().authenticate(None, username=' ADA.okafor@example.COM', password='pass12345')
+            self.assertEqual(user.crew_profile, self.profile)
+        with self.assertNumQueries(1):
+            self.assertEqual(EmailAuthBackend().authenticate(None, username='harbourmaster', password='pass12345'), self.staff)
+        with self.assertNumQueries(1):
+            self.assertIsNone(EmailAuthBackend().authenticate(None, username='ada.okafor@example.com', password='wrong'))
+
+    def test_unknown_account_still_hashes(self):
+        with mock.patch.object(User, 'set_password', autospec=True) as set_password, self.assertNumQueries(1):
+            self.assertIsNone(EmailAuthBackend().authenticate(None, username='nobody@example.com', password='x'))
+        set_password.assert_called_once()
+
+    def test_outdated_hash_upgrade_is_configurable(self):
+        user = self.profile.user
+        user.password = make_password('pass12345', hasher='pbkdf2_sha1')
+        user.save()
+        with override_settings(PASSWORD_UPGRADE_ON_LOGIN=False):
+            self.assertTrue(self.client.login(username='ada.okafor@example.com', password='pass12345'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha1$'))
+
+        self.assertTrue(self.client.login(username='ada.okafor@example.com', password='pass12345'))
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+    def test_crew_login_view(self):
+        response = self.client.post(reverse('crew_login'), {'email': 'Ada.Okafor@example.com', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('crew_portal'), fetch_redirect_response=False)
+
+
+class StatusTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'x')
+        cls.deck = Department.objects.create(name='Deck')
+        cls.crew = [
+            create_crew(f'applicant{n}@example.com', department=cls.deck, recruitment_status='pending')
+            for n in range(5)
+        ]
+
+    def receive(self):
+        events = []
+        handler = lambda sender, **kwargs: events.append((sender, kwargs))
+        status_changed.connect(handler)
+        self.addCleanup(status_changed.disconnect, handler)
+        return events
+
+    def metrics_approved(self):
+        return DepartmentMetrics.objects.get(department=self.deck).approved_crew
+
+    def test_chunks_are_audited_and_announced_once(self):
+        events = self.receive()
+        CrewProfile.objects.filter(pk=self.crew[0].pk).update(recruitment_status='approved')
+        before = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            changed = transition(CrewProfile.objects.all(), 'recruitment_status', 'approved', changed_by=self.admin, chunk_size=2)
+        self.assertEqual(changed, 4)
+        self.assertFalse(CrewProfile.objects.exclude(recruitment_status='approved').exists())
+        self.assertFalse(CrewProfile.objects.filter(pk__in=[c.pk for c in self.crew[1:]], last_modified__lt=before).exists())
+
+        audit = StatusChange.objects.all()
+        self.assertEqual(sorted(audit.values_list('object_id', flat=True)), sorted(c.pk for c in self.crew[1:]))
+        self.assertEqual(set(audit.values_list('old_value', 'new_value', 'changed_by')), {('pending', 'approved', self.admin.pk)})
+        self.assertEqual(audit.values('batch').distinct().count(), 1)
+
+        self.assertEqual(len(events), 1)
+        sender, event = events[0]
+        self.assertIs(sender, CrewProfile)
+        self.assertEqual(len(event['rows']), 4)
+        self.assertEqual(event['rows'][0]['department_id'], self.deck.pk)
+        refresh_stale()
+        self.assertEqual(self.metrics_approved(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(transition(CrewProfile.objects.all(), 'recruitment_status', 'approved'), 0)
+        self.assertEqual(len(events), 1)
+
+    def test_queries_grow_per_chunk_not_per_row(self):
+        transition(CrewProfile.objects.filter(pk=self.crew[0].pk), 'recruitment_status', 'rejected', chunk_size=2)
+        with CaptureQueriesContext(connection) as queries:
+            transition(CrewProfile.objects.all(), 'recruitment_status', 'approved', chunk_size=100)
+        # pks, then per chunk: savepoint, locked read, update, audit insert, release
+        self.assertEqual(len(queries), 6)
+
+    def test_admin_actions(self):
+        self.client.force_login(self.admin)
+        document = self.crew[0].documents.create(title='Passport', file='crew_documents/passport.pdf')
+        leave = LeaveRequest.objects.create(crew=self.crew[1], start_date=date(2026, 3, 1), end_date=date(2026, 3, 2), reason='Rest')
+        for name, action, pks in [
+            ('crewprofile', 'reject_profile', [self.crew[2].pk, self.crew[3].pk]),
+            ('document', 'verify_document', [document.pk]),
+            ('leaverequest', 'approve_leave', [leave.pk]),
+        ]:
+            response = self.client.post(
+                reverse(f'admin:crew_app_{name}_changelist'),
+                {'action': action, '_selected_action': pks},
+                follow=True,
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '1 leave request(s) approved.')
+        self.assertEqual(CrewProfile.objects.filter(recruitment_status='rejected').count(), 2)
+        document.refresh_from_db()
+        self.assertTrue(document.is_verified)
+        self.assertEqual(
+            sorted(StatusChange.objects.values_list('content_type__model', 'new_value')),
+            [('crewprofile', 'rejected'), ('crewprofile', 'rejected'), ('document', 'True'), ('leaverequest', 'approved')],
+        )
+        response = self.client.get(reverse('admin:crew_app_statuschange_changelist'), {'q': 'not-a-batch'})
+        self.assertEqual(response.status_code, 200)
+
+
+class DocumentStorageTests(TestCase):
+    DATA = b'%PDF-1.4 scanned passport ' * 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew()
+        cls.other = create_crew('other@example.com')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        override = override_settings(MEDIA_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, profile, name='passport.PDF', data=DATA):
+        return profile.documents.create(title='Passport', file=SimpleUploadedFile(name, data))
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(path, name), self.root)
+            for path, _, names in os.walk(self.root) for name in names
+        )
+
+    def test_identical_uploads_are_stored_once(self):
+        digest = hashlib.sha256(self.DATA).hexdigest()
+        first = self.upload(self.profile)
+        second = self.upload(self.other, name='copy.pdf')
+        self.assertEqual(first.file.name, f'crew_documents/{digest[:2]}/{digest}.pdf')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(content_hash(first.file.name), digest)
+        self.assertEqual(self.stored_files(), [first.file.name])
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_uploads_on_disk_are_moved_into_place(self):
+        request = RequestFactory().post('/', {'file': SimpleUploadedFile('passport.pdf', self.DATA)})
+        upload = request.FILES['file']
+        temporary = upload.temporary_file_path()
+        with mock.patch('crew_app.documents._digest') as digest:
+            document = self.profile.documents.create(title='Passport', file=upload)
+        # Hashed by the upload handler, not read again.
+        digest.assert_not_called()
+        upload.close()  # as the request handler would
+        digest = hashlib.sha256(self.DATA).hexdigest()
+        self.assertEqual(document.file.name, f'crew_documents/{digest[:2]}/{digest}.pdf')
+        # Moved into place rather than copied.
+        self.assertFalse(os.path.exists(temporary))
+        with document.file.open('rb') as file:
+            self.assertEqual(file.read(), self.DATA)
+
+    def test_uploads_in_memory_are_not_hashed_again(self):
+        request = RequestFactory().post('/', {'file': SimpleUploadedFile('passport.pdf', self.DATA)})
+        upload = request.FILES['file']
+        digest = hashlib.sha256(self.DATA).hexdigest()
+        self.assertEqual(upload.content_hash, digest)
+        with mock.patch('crew_app.documents.hashlib.sha256') as sha256:
+            document = self.profile.documents.create(title='Passport', file=upload)
+        sha256.assert_not_called()
+        self.assertEqual(document.file.name, f'crew_documents/{digest[:2]}/{digest}.pdf')
+        with document.file.open('rb') as file:
+            self.assertEqual(file.read(), self.DATA)
+
+    def test_prune_documents_deletes_only_unreferenced_files(self):
+        first = self.upload(self.profile)
+        second = self.upload(self.other)
+        other = self.upload(self.other, name='visa.pdf', data=b'%PDF-1.4 visa')
+        first.delete()
+        other.delete()
+
+        call_command('prune_documents', stdout=io.StringIO())
+        self.assertEqual(len(self.stored_files()), 2)  # too recent to prune
+
+        out = io.StringIO()
+        call_command('prune_documents', min_age=0, stdout=out)
+        self.assertIn('Deleted 1 unreferenced files; kept 1.', out.getvalue())
+        self.assertEqual(self.stored_files(), [second.file.name])
+
+    def test_download_ranges(self):
+        document = self.upload(self.profile)
+        url = reverse('document_download', args=[document.pk])
+        self.client.force_login(self.profile.user)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.DATA)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('Passport.pdf', response['Content-Disposition'])
+        etag = response['ETag']
+
+        size = len(self.DATA)
+        for header, start, end in [('bytes=2-9', 2, 9), ('bytes=-5', size - 5, size - 1), (f'bytes={size - 3}-', size - 3, size - 1)]:
+            with self.subTest(range=header):
+                response = self.client.get(url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), self.DATA[start:end + 1])
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{size}')
+
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={size}-').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=2-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with override_settings(DOCUMENT_SENDFILE_HEADER='X-Accel-Redirect'):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{document.file.name}')
+        self.assertEqual(response.content, b'')
+
+        self.client.force_login(self.other.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_dedupe_documents_moves_legacy_files(self):
+        os.makedirs(os.path.join(self.root, 'crew_documents'))
+        for name in ('passport.pdf', 'passport_x1.pdf'):
+            with open(os.path.join(self.root, 'crew_documents', name), 'wb') as file:
+                file.write(self.DATA)
+        first = self.profile.documents.create(title='Passport', file='crew_documents/passport.pdf')
+        second = self.other.documents.create(title='Passport', file='crew_documents/passport_x1.pdf')
+
+        call_command('dedupe_documents', stdout=io.StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(self.stored_files(), [first.file.name])
+
+
+def pdf_bytes(pages):
+    objects = b''.join(b'%d 0 obj << /Type /Page /Parent 1 0 R >> endobj\n' % (n + 2) for n in range(pages))
+    return b'%PDF-1.4\n1 0 obj << /Type /Pages /Count ' + str(pages).encode() + b' >> endobj\n' + objects + b'%%EOF\n'
+
+
+class DocumentInspectionTests(TestCase):
+    LIMITS = (1024, ['application/pdf', 'image/png'], 3, 64)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'x')
+        cls.profile = create_crew()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        override = override_settings(
+            MEDIA_ROOT=self.root, DOCUMENT_MAX_SIZE=self.LIMITS[0], DOCUMENT_ALLOWED_TYPES=self.LIMITS[1],
+            DOCUMENT_MAX_PAGES=self.LIMITS[2],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def inspect(self, name, data):
+        path = os.path.join(self.root, 'inspected')
+        with open(path, 'wb') as file:
+            file.write(data)
+        return document_inspection.inspect_file(path, name, *self.LIMITS)
+
+    def upload(self, name, data):
+        return self.profile.documents.create(title=name, file=SimpleUploadedFile(name, data))
+
+    def test_pages_are_counted_across_chunk_boundaries(self):
+        data = pdf_bytes(3)
+        with mock.patch.object(document_inspection, 'READ_SIZE', 7):
+            self.assertEqual(document_inspection.count_pdf_pages(io.BytesIO(data)), 3)
+        # Page objects hidden in object streams: the page tree's count.
+        self.assertEqual(document_inspection.count_pdf_pages(io.BytesIO(b'%PDF-1.5 /Type /Pages /Count 12')), 12)
+
+    def test_flags(self):
+        png = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+        for name, data, mime_type, flags in [
+            ('passport.pdf', pdf_bytes(2), 'application/pdf', []),
+            ('passport.pdf', pdf_bytes(4), 'application/pdf', ['too_many_pages']),
+            ('passport.pdf', png, 'image/png', ['extension_mismatch']),
+            ('passport.pdf', b'hello', '', ['type_not_allowed']),
+            ('passport.pdf', b'%PDF-' + b'x' * 2000, 'application/pdf', ['too_large']),
+            ('passport.gif', b'GIF89a', 'image/gif', ['type_not_allowed']),
+        ]:
+            with self.subTest(data=data[:10], flags=flags):
+                result = self.inspect(name, data)
+                self.assertEqual((result['mime_type'], result['flags']), (mime_type, flags))
+        self.assertEqual(self.inspect('passport.pdf', pdf_bytes(2))['page_count'], 2)
+
+    def test_upload_is_queued_and_inspected_off_the_request(self):
+        document = self.upload('passport.pdf', pdf_bytes(2))
+        self.assertEqual(document.job.status, 'pending')
+        flagged = self.upload('certificate.pdf', b'not a pdf')
+
+        with DocumentWorker(workers=0) as worker:
+            self.assertEqual(worker.run_once(), {'passed': 1, 'flagged': 1})
+            self.assertEqual(worker.run_once(), {})
+        job = DocumentJob.objects.get(document=document)
+        self.assertEqual((job.status, job.mime_type, job.page_count, job.attempts), ('done', 'application/pdf', 2, 1))
+        self.assertTrue(job.passed())
+        self.assertEqual(DocumentJob.objects.get(document=flagged).flags, ['type_not_allowed'])
+
+        # A new file queues the document again; other edits do not.
+        document.title = 'Passport'
+        document.save()
+        self.assertEqual(DocumentJob.objects.get(document=document).status, 'done')
+        document.file = SimpleUploadedFile('passport.pdf', pdf_bytes(1))
+        document.save()
+        self.assertEqual(DocumentJob.objects.get(document=document).status, 'pending')
+
+    def test_process_pool(self):
+        self.upload('passport.pdf', pdf_bytes(2))
+        self.upload('scan.png', b'\x89PNG\r\n\x1a\n' + b'\x00' * 32)
+        with DocumentWorker(workers=1) as worker:
+            outcomes = worker.run_once()
+        self.assertEqual(sum(outcomes.values()), 2)
+        self.assertFalse(DocumentJob.objects.exclude(status='done').exists())
+
+    def test_requeued_job_is_not_overwritten(self):
+        document = self.upload('passport.pdf', pdf_bytes(2))
+        [job] = claim()
+        DocumentJob.objects.filter(pk=job.pk).update(status='pending', claimed_at=None)
+        record_result(job, self.inspect('passport.pdf', pdf_bytes(2)))
+        self.assertEqual(DocumentJob.objects.get(document=document).status, 'pending')
+
+    def test_admin_previews_and_verifies_passed_documents(self):
+        passed = self.upload('passport.pdf', pdf_bytes(2))
+        flagged = self.upload('certificate.pdf', b'not a pdf')
+        [first, second] = claim()
+        record_result(first, {**self.inspect('passport.pdf', pdf_bytes(2)), 'thumbnail': b'\x89PNG thumbnail'})
+        record_result(second, self.inspect('certificate.pdf', b'not a pdf'))
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:crew_app_document_changelist'))
+        self.assertContains(response, 'Flagged: type_not_allowed')
+        self.assertContains(response, reverse('document_thumbnail', args=[passed.pk]))
+        thumbnail = self.client.get(reverse('document_thumbnail', args=[passed.pk]))
+        self.assertEqual(b''.join(thumbnail.streaming_content), b'\x89PNG thumbnail')
+        self.assertEqual(self.client.get(reverse('document_thumbnail', args=[flagged.pk])).status_code, 404)
+
+        self.client.post(
+            reverse('admin:crew_app_document_changelist'),
+            {'action': 'verify_passed_documents', '_selected_action': [passed.pk, flagged.pk]},
+        )
+        self.assertEqual(list(Document.objects.filter(is_verified=True)), [passed])
+
+
+class InactivityTimeoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew(recruitment_status='approved')
+
+    def setUp(self):
+        self.client.force_login(self.profile.user)
+        self.now = 1_000_000
+        patcher = mock.patch('crew_app.middleware.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, name):
+        response = self.client.get(reverse(name))
+        return response, settings.SESSION_COOKIE_NAME in response.cookies
+
+    def test_activity_is_written_once_per_resolution(self):
+        response, saved = self.get('tasks')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(saved)
+        self.assertEqual(self.client.session['_last_activity'], 1_000_000)
+
+        self.now += settings.SESSION_ACTIVITY_RESOLUTION - 1
+        response, saved = self.get('crew_portal')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(saved)
+
+        self.now += 1
+        response, saved = self.get('attendance')
+        self.assertTrue(saved)
+        self.assertEqual(self.client.session['_last_activity'], self.now)
+
+    def test_other_paths_are_not_tracked(self):
+        self.client.force_login(User.objects.create_user('hr', 'hr@example.com', 'pass12345', is_hr=True))
+        response, saved = self.get('admin_dashboard')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_last_activity', self.client.session)
+
+    def test_inactive_session_is_signed_out(self):
+        self.get('tasks')
+        self.now += settings.SESSION_INACTIVITY_TIMEOUT + 1
+        response = self.client.get(reverse('crew_portal'))
+        self.assertRedirects(response, reverse('crew_login'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+        response = self.client.get(reverse('tasks'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('next=', response.url)
+
+    def test_idle_kiosk_batch_is_not_signed_out(self):
+        kiosk = User.objects.create_superuser('kiosk', 'kiosk@example.com', 'x')
+        self.client.force_login(kiosk)
+        session = self.client.session
+        session['_last_activity'] = self.now
+        session.save()
+        self.now += settings.SESSION_INACTIVITY_TIMEOUT + 1
+        response = self.client.post(reverse('clock_batch'), {'events': [
+            {'crew_id': str(self.profile.crew_id), 'action': 'in'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [clock.CLOCKED_IN])
+        self.assertEqual(self.client.session['_auth_user_id'], str(kiosk.pk))
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seed_dataset(self):
+        profile_ids = seed_dataset(crew_count=4, days=100, seed=7)
+        self.assertEqual(CrewProfile.objects.count(), 4)
+        crew = profile_ids[0]
+        self.assertEqual(Shift.objects.filter(crew=crew).count(), 100)
+        self.assertEqual(Performance.objects.filter(crew=crew).count(), 1)
+        payrolls = Payroll.objects.filter(crew=crew).order_by('month')
+        self.assertGreaterEqual(payrolls.count(), 4)
+        self.assertFalse(payrolls.last().payment_status)
+        self.assertTrue(all(p.net_salary == p.basic_salary + p.overtime_pay - p.deductions for p in payrolls))
+        self.assertTrue(DepartmentMetrics.objects.exists())
+        # Nothing seeded can be signed in to.
+        self.assertFalse(User.objects.filter(is_hr=True).exists())
+        self.assertFalse(any(user.has_usable_password() for user in User.objects.all()))
+
+    def test_benchmark_compares_with_baseline(self):
+        seed_dataset(crew_count=3, days=10, seed=7)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f'{directory.name}/baseline.json'
+
+        call_command('benchmark_urls', requests=1, save=path, stdout=io.StringIO())
+        with open(path) as file:
+            results = json.load(file)['results']
+        self.assertEqual(results['crew_portal']['status'], 200)
+        self.assertIn('admin:crew_app_crewprofile_changelist', results)
+        self.assertNotIn('clock_in', results)  # POST only
+        self.assertNotIn('logout', results)
+        self.assertFalse(User.objects.filter(is_superuser=True).exists())
+
+        # A baseline that needed fewer queries fails the run.
+        results['crew_portal']['queries'] -= 1
+        for row in results.values():
+            row['p50_ms'] = row['p95_ms'] = 10_000
+        with open(path, 'w') as file:
+            json.dump({'results': results}, file)
+        output = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 regression(s): crew_portal'):
+            call_command('benchmark_urls', requests=1, baseline=path, fail_on_regression=True, stdout=output)
+        self.assertIn('improved', output.getvalue())
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.profile = create_crew(recruitment_status='approved')
+        cls.hr = User.objects.create_user('hr', 'hr@example.com', 'pass12345', is_hr=True)
+
+    def setUp(self):
+        instrumentation.reset_metrics()
+        self.addCleanup(instrumentation.reset_metrics)
+
+    def timings(self, response):
+        return dict(
+            (part.split(';', 1) + [''])[:2] for part in response.headers['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_counts_the_requests_queries(self):
+        self.client.force_login(self.hr)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'))
+        timings = self.timings(response)
+        self.assertIn(f'desc="{len(queries)} queries"', timings['db'])
+        self.assertEqual(set(timings), {'db', 'tpl', 'total'})
+
+    def test_async_views_and_cache_lookups_are_measured(self):
+        self.client.force_login(self.profile.user)
+        self.client.get(reverse('crew_portal'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('crew_portal'))
+        timings = self.timings(response)
+        self.assertIn(f'desc="{len(queries)} queries"', timings['db'])
+        self.assertRegex(timings['cache'], r'desc="[1-9]\d* hits / 0 misses"')
+
+    @override_settings(QUERY_BUDGETS={'admin_dashboard': 1})
+    def test_view_over_its_budget_is_logged(self):
+        self.client.force_login(self.hr)
+        with self.assertLogs('crew_app.middleware', 'WARNING') as logs:
+            self.client.get(reverse('admin_dashboard'))
+        self.assertIn('(admin_dashboard) ran', logs.output[0])
+        self.assertIn('over its budget of 1', logs.output[0])
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('crew_query_budget_exceeded_total{view="admin_dashboard"} 1', metrics)
+
+    def test_metrics_endpoint(self):
+        self.client.force_login(self.hr)
+        self.client.get(reverse('admin_dashboard'))
+        self.client.get('/no-such-page/')
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], instrumentation.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertIn('# TYPE crew_http_request_duration_seconds histogram', text)
+        self.assertIn('crew_http_requests_total{view="admin_dashboard",method="GET",status="200"} 1', text)
+        self.assertIn('crew_http_requests_total{view="unresolved",method="GET",status="404"} 1', text)
+        self.assertIn('crew_db_queries_per_request_count{view="admin_dashboard"} 1', text)
+        self.assertIn('crew_http_request_duration_seconds_bucket{view="admin_dashboard",le="+Inf"} 1', text)
+        self.assertNotIn('crew_query_budget_exceeded_total{', text)
+
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.8').status_code, 404)
@@ -0,0 +1,82 @@
+import uuid
+from typing import NamedTuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import CrewProfile, Document, LeaveRequest, StatusChange
+
+CHUNK_SIZE = 1000
+
+# Sent once per ``transition()`` call, after its last chunk commits, with the
+# model as ``sender`` and ``field``, ``value``, ``batch`` and ``rows``: one
+# dict per changed object holding its ``pk``, previous value (under
+# ``field``) and the ``columns`` of its transition.
+status_changed = Signal()
+
+
+class Transition(NamedTuple):
+    timestamp: str | None  # auto_now field that update() leaves alone
+    columns: tuple  # values each changed row carries to receivers
+
+
+TRANSITIONS = {
+    (CrewProfile, 'recruitment_status'): Transition('last_modified', ('crew_id', 'department_id')),
+    (LeaveRequest, 'status'): Transition(
+        'updated_at',
+        ('crew__crew_id', 'crew__department_id', 'crew__position_id', 'start_date', 'end_date'),
+    ),
+    (Document, 'is_verified'): Transition(None, ('crew_profile__crew_id',)),
+}
+
+
+def transition(queryset, field, value, changed_by=None, on_chunk=None, chunk_size=CHUNK_SIZE):
+    """
+    Set ``field`` to ``value`` on the objects of ``queryset`` not already
+    there, ``chunk_size`` rows per transaction. Each chunk stamps the
+    modification time and appends a ``StatusChange`` per row; ``on_chunk``,
+    if given, is called with the chunk's rows inside its transaction for
+    derived data that must commit with it. Returns the number of objects
+    changed.
+    """
+    model = queryset.model
+    spec = TRANSITIONS[model, field]
+    manager = model._default_manager
+    pks = list(queryset.exclude(**{field: value}).order_by('pk').values_list('pk', flat=True))
+    content_type = ContentType.objects.get_for_model(model)
+    batch = uuid.uuid4()
+    changed = []
+    try:
+        for start in range(0, len(pks), chunk_size):
+            with transaction.atomic():
+                # Re-read under lock: rows may have moved since the pks were listed.
+                rows = list(
+                    manager.filter(pk__in=pks[start:start + chunk_size]).exclude(**{field: value})
+                    .select_for_update().values('pk', field, *spec.columns)
+                )
+                if not rows:
+                    continue
+                now = timezone.now()
+                updates = {field: value}
+                if spec.timestamp:
+                    updates[spec.timestamp] = now
+                manager.filter(pk__in=[row['pk'] for row in rows]).update(**updates)
+                StatusChange.objects.bulk_create([
+                    StatusChange(
+                        batch=batch, content_type=content_type, object_id=row['pk'], field=field,
+                        old_value=str(row[field]), new_value=str(value), changed_by=changed_by, changed_at=now,
+                    )
+                    for row in rows
+                ])
+                if on_chunk is not None:
+                    on_chunk(rows)
+            changed.extend(rows)
+    finally:
+        # Chunks that committed before a failure are announced too.
+        if changed:
+            transaction.on_commit(lambda: status_changed.send(
+                sender=model, field=field, value=value, batch=batch, rows=changed,
+            ))
+    return len(changed)
@@ -15,6 +15,15 @@ urlpatterns = [
     # Home and Status URLs
     path('', views.home, name='home'),
     path('recruitment-status/', views.recruitment_status, name='recruitment_status'),
+    path('hr/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+
+    # HR export URLs
+    path('exports/<str:kind>.csv', views.export_csv, name='export_csv'),
+    path('coverage/calendar/', views.coverage_calendar_view, name='coverage_calendar'),
+    path('search/', views.search_view, name='search'),
+    path('documents/<int:document_id>/download/', views.document_download, name='document_download'),
+    path('documents/<int:document_id>/thumbnail/', views.document_thumbnail, name='document_thumbnail'),
+    path('metrics/', views.metrics_view, name='metrics'),
 
     # Portal URLs - all under /portal namespace
     path('portal/', views.crew_portal, name='crew_portal'),
@@ -30,4 +39,5 @@ urlpatterns = [
     path('portal/attendance/', views.attendance_view, name='attendance'),
     path('portal/attendance/clock-in/', views.clock_in, name='clock_in'),
     path('portal/attendance/clock-out/', views.clock_out, name='clock_out'),
+    path('portal/attendance/clock-batch/', views.clock_batch, name='clock_batch'),
 ]
@@ -1,31 +1,46 @@
 # Imports
+import asyncio
 from datetime import date, timedelta
+import json
 import logging
+import uuid
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
-from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponse, JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_POST
-from django.views.decorators.cache import cache_page
-import time
-from django.db.models import Q
-
+from django.db.models import F, Q
+
+from . import cache as crew_cache
+from . import clock, clock_queue, instrumentation
+from .cache import acrew_id_for_user, aget_fragment
+from .dashboard import abuild_portal_context
+from .documents import document_response, stored_file_response
+from .coverage import coverage_calendar
+from .exports import EXPORTS, csv_response, export_queryset
+from .hr_metrics import dashboard_metrics
+from .search import search
 from .forms import (
     CrewRegistrationForm, CrewProfileForm, DocumentUploadForm, LoginForm,
-    TaskFilterForm, LeaveRequestForm
+    TaskFilterForm, LeaveRequestForm, ExportFilterForm, CoverageFilterForm, SearchForm
 )
+from .pagination import KeysetPaginator, valid_cursor
 from .models import (
-    User, CrewProfile, Document, Attendance, LeaveRequest, Task,
+    User, CrewProfile, Document, Attendance, AttendanceSummary, LeaveRequest, Task,
     Announcement, Shift, Performance, Payroll
 )
 
 # Configuration
 logger = logging.getLogger(__name__)
+MAX_CLOCK_BATCH = 200
+PROFILE_SUMMARY_MONTHS = 6
+PENDING_PROFILES_PER_PAGE = 25
 
 
 def home(request):
@@ -109,8 +124,9 @@ def crew_login_view(request):
             
             user = authenticate(request, username=email, password=password)
             if user is not None:
+                # Joined by EmailAuthBackend, so this costs no query.
                 profile = getattr(user, 'crew_profile', None)
-                
+
                 if profile and profile.recruitment_status == 'approved':
                     login(request, user)
                     messages.success(request, 'Login successful! Welcome to the crew portal.')
@@ -141,87 +157,175 @@ def recruitment_status(request):
 
 @login_required
 def admin_dashboard(request):
+    """
+    HR figures per department from the precomputed ``DepartmentMetrics``
+    plus a page of pending applications: two queries whatever the data size.
+    """
     if request.user.is_hr:
-        pending_profiles = CrewProfile.objects.filter(recruitment_status='pending')
+        pending = CrewProfile.objects.filter(recruitment_status='pending').select_related('department', 'position')
+        paginator = KeysetPaginator(pending, ('last_name', 'first_name', 'id'), PENDING_PROFILES_PER_PAGE)
         return render(request, 'crew/admin_dashboard.html', {
-            'pending_profiles': pending_profiles
+            'metrics': dashboard_metrics(),
+            'pending_profiles': paginator.get_page(request.GET.get('cursor')),
         })
     return redirect('login')
 
 
-# === Portal Views ===
+@login_required
+def export_csv(request, kind):
+    """Stream an HR export as CSV, filtered by ?start=&end=&department=."""
+    if not (request.user.is_hr or request.user.is_staff):
+        raise PermissionDenied
+    if kind not in EXPORTS:
+        raise Http404('Unknown export.')
+
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+
+    queryset = export_queryset(kind, **form.cleaned_data)
+    return csv_response(request, kind, queryset, f'{kind}-{date.today():%Y%m%d}.csv')
 
-from django.utils import timezone
-from django.shortcuts import redirect
 
 @login_required
-def crew_portal(request):
-    """Main portal dashboard view with 10-minute inactivity logout."""
-    profile = request.user.crew_profile
-    today = date.today()
+def coverage_calendar_view(request):
+    """
+    Crew on leave and on shift per day and department (or position) as JSON,
+    for ?start=&end=&group_by=department|position.
+    """
+    if not (request.user.is_hr or request.user.is_staff):
+        raise PermissionDenied
+
+    form = CoverageFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+
+    calendar = coverage_calendar(**form.cleaned_data)
+    return JsonResponse({
+        'status': 'success',
+        'group_by': form.cleaned_data['group_by'],
+        'days': [day.isoformat() for day in calendar['days']],
+        'groups': calendar['groups'],
+    })
+
 
-   # Set session timeout for 10 minutes of inactivity
-    request.session.set_expiry(600)
+@login_required
+def search_view(request):
+    """Best-ranked crew, documents, announcements and tasks for ?q= (and ?kind=) as JSON."""
+    if not (request.user.is_hr or request.user.is_staff):
+        raise PermissionDenied
+
+    form = SearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        'results': search(form.cleaned_data['q'], kinds=form.cleaned_data['kind']),
+    })
 
-    current_timestamp = int(time.time())
-    last_activity = request.session.get('_last_activity')
 
-    if last_activity is None:
-        request.session['_last_activity'] = current_timestamp
-    elif current_timestamp - last_activity > 600:
-        return redirect('crew_login')
+def _readable_document(request, document_id):
+    document = get_object_or_404(Document.objects.select_related('crew_profile', 'job'), pk=document_id)
+    if not (request.user.is_hr or request.user.is_staff or document.crew_profile.user_id == request.user.pk):
+        raise PermissionDenied
+    return document
 
-    request.session['_last_activity'] = current_timestamp
 
-    # Other crew portal logic
-    attendance, _ = Attendance.objects.get_or_create(
-        crew=profile,
-        date=today,
-        defaults={'clock_in': None, 'clock_out': None}
-    )
+@login_required
+def document_download(request, document_id):
+    """A crew member's own document, or any document for HR and staff; supports byte ranges."""
+    return document_response(request, _readable_document(request, document_id))
 
-    active_tasks = Task.objects.filter(
-        crew=profile, status__in=['pending', 'in_progress']
-    ).order_by('deadline')[:3]
 
-   # Fetching the upcoming shifts for the logged-in user
-    upcoming_shifts = Shift.objects.filter(crew=profile).order_by('-start_time')
+@login_required
+def document_thumbnail(request, document_id):
+    """The preview made by document inspection, under the same access rules as the document."""
+    document = _readable_document(request, document_id)
+    job = getattr(document, 'job', None)
+    if job is None or not job.thumbnail:
+        raise Http404
+    return stored_file_response(request, job.thumbnail, f'{document.title}.png', as_attachment=False)
 
-    
-   # Fetch announcements and paginate them to show only 2 per page
-    announcements = Announcement.objects.filter(
-        Q(departments=profile.department) | Q(is_global=True)
-    ).distinct().order_by('-created_at')[:2]
-    
-    # Set up paginator: 1 announcement per page
-    paginator = Paginator(announcements, 2)  
-    page_number = request.GET.get('page')
-    page_announcements = paginator.get_page(page_number)
 
-    context = {
-    'profile': profile,
-    'attendance': attendance,
-    'active_tasks': active_tasks,
-    'upcoming_shifts': upcoming_shifts,
-    'announcements': page_announcements,
-    'active_view': 'dashboard'
-}
+def metrics_view(request):
+    """This process's request metrics in the Prometheus text format, for a local scraper only."""
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1']):
+        raise Http404
+    return HttpResponse(instrumentation.render_metrics(), content_type=instrumentation.CONTENT_TYPE)
+
+
+# === Portal Views ===
+
+# The portal views are async: under ASGI a request waiting on the database
+# does not hold a worker thread. Everything a template reads is fetched
+# before rendering, since lazy queries are not allowed in async code.
+
+def _portal_profile_queryset():
+    """
+    Crew profiles with everything the portal sidebar renders. The email is
+    annotated rather than the user joined, so cached fragments never hold a
+    ``User`` (or its password hash).
+    """
+    return CrewProfile.objects.select_related('department', 'position').annotate(email=F('user__email'))
+
+
+async def _portal_user(request):
+    """
+    The authenticated user, also stored on ``request.user`` so the auth
+    context processor does not load it again synchronously.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+@login_required
+async def crew_portal(request):
+    """Main portal dashboard view; InactivityTimeoutMiddleware handles the inactivity logout."""
+    user = await _portal_user(request)
+    today = date.today()
+
+    context = await aget_fragment(
+        await acrew_id_for_user(user),
+        crew_cache.DASHBOARD,
+        lambda: abuild_portal_context(user, today),
+        vary=(today,),
+        depends_on=('announcements',),
+    )
+    context = dict(context, active_view='dashboard')
+    user.crew_profile = context['profile']
 
     return render(request, 'crew/portal.html', context)
 
 
 @login_required
-def tasks_view(request):
-    profile = request.user.crew_profile
+async def tasks_view(request):
+    user = await _portal_user(request)
     filter_form = TaskFilterForm(request.GET)
-    tasks = Task.objects.filter(crew=profile).order_by('deadline')
-    
-    if filter_form.is_valid() and filter_form.cleaned_data['status'] != 'all':
-        tasks = tasks.filter(status=filter_form.cleaned_data['status'])
+    status = 'all'
+    if filter_form.is_valid():
+        status = filter_form.cleaned_data['status']
+    cursor = valid_cursor(request.GET.get('cursor'))
+
+    async def build():
+        tasks = Task.objects.filter(crew__user=user)
+        if status != 'all':
+            tasks = tasks.filter(status=status)
+        paginator = KeysetPaginator(tasks, ('deadline', 'id'), 20)
+        profile, page = await asyncio.gather(
+            _portal_profile_queryset().aget(user=user),
+            paginator.aget_page(cursor),
+        )
+        return {'profile': profile, 'tasks': page}
+
+    context = await aget_fragment(
+        await acrew_id_for_user(user), crew_cache.TASKS, build, vary=(status, cursor)
+    )
+    user.crew_profile = context['profile']
     
     return render(request, 'crew/portal/tasks.html', {
-        'profile': profile,
-        'tasks': tasks,
+        'profile': context['profile'],
+        'tasks': context['tasks'],
         'filter_form': filter_form,
         'active_view': 'tasks'
     })
@@ -242,18 +346,22 @@ def update_task_status(request, task_id):
 
 
 @login_required
-def attendance_view(request):
+async def attendance_view(request):
     """View for displaying attendance page with clock in/out functionality."""
-    profile = request.user.crew_profile
+    user = await _portal_user(request)
     today = date.today()
-    
-    attendance, _ = Attendance.objects.get_or_create(
-        crew=profile, date=today, defaults={'clock_in': None, 'clock_out': None}
+
+    async def fetch_recent():
+        recent = Attendance.objects.filter(crew__user=user).order_by('-date')[:7]
+        return [attendance async for attendance in recent]
+
+    # Reading the page must not write; clock_in creates the row.
+    profile, attendance, recent_attendance = await asyncio.gather(
+        _portal_profile_queryset().aget(user=user),
+        Attendance.objects.filter(crew__user=user, date=today).afirst(),
+        fetch_recent(),
     )
-    
-    recent_attendance = Attendance.objects.filter(
-        crew=profile
-    ).order_by('-date')[:7]
+    user.crew_profile = profile
     
     context = {
         'profile': profile,
@@ -272,16 +380,14 @@ def clock_in(request):
     today = date.today()
     current_time = timezone.now()
 
-    attendance, created = Attendance.objects.get_or_create(
-        crew=profile, date=today, defaults={'clock_in': current_time}
-    )
-    
-    if not created and attendance.clock_in:
+    if clock_queue.queue_enabled():
+        clock_queue.enqueue(profile.crew_id, 'in', current_time)
+        messages.success(request, f'Clock-in received at {current_time.strftime("%H:%M")}.')
+        return redirect('crew_portal')
+
+    if clock.clock_in(profile, today, current_time) == clock.ALREADY_CLOCKED_IN:
         messages.warning(request, 'You have already clocked in for today.')
         return redirect('crew_portal')
-        
-    attendance.clock_in = current_time
-    attendance.save()
     
     messages.success(request, f'Clocked in successfully at {current_time.strftime("%H:%M")}.')
     return redirect('crew_portal')
@@ -294,23 +400,59 @@ def clock_out(request):
     profile = request.user.crew_profile
     today = date.today()
     current_time = timezone.now()
-    
-    try:
-        attendance = Attendance.objects.get(crew=profile, date=today)
-        
-        if attendance.clock_out:
-            messages.warning(request, 'You have already clocked out for today.')
-            return redirect('crew_portal')
-            
-        attendance.clock_out = current_time
-        attendance.save()
-        
-        messages.success(request, f'Clocked out successfully at {current_time.strftime("%H:%M")}.')
+
+    if clock_queue.queue_enabled():
+        clock_queue.enqueue(profile.crew_id, 'out', current_time)
+        messages.success(request, f'Clock-out received at {current_time.strftime("%H:%M")}.')
         return redirect('crew_portal')
-        
-    except Attendance.DoesNotExist:
+    
+    result = clock.clock_out(profile, today, current_time)
+    if result == clock.ALREADY_CLOCKED_OUT:
+        messages.warning(request, 'You have already clocked out for today.')
+    elif result == clock.NOT_CLOCKED_IN:
         messages.error(request, 'No clock-in record found for today.')
-        return redirect('crew_portal')
+    else:
+        messages.success(request, f'Clocked out successfully at {current_time.strftime("%H:%M")}.')
+    return redirect('crew_portal')
+
+
+@login_required
+@require_POST
+def clock_batch(request):
+    """
+    Record many badge events from a kiosk terminal in one request.
+
+    Expects JSON ``{"events": [{"crew_id": ..., "action": "in"|"out",
+    "timestamp": ISO 8601 (optional)}]}`` and answers with one status per
+    event, in order. In queue ingestion mode the events are only appended to
+    the clock queue and the answer is ``202`` with ``"status": "queued"``.
+    """
+    if not request.user.has_perm('crew_app.change_attendance'):
+        raise PermissionDenied
+    try:
+        payload = json.loads(request.body)
+        raw_events = payload['events']
+        if not isinstance(raw_events, list) or len(raw_events) > MAX_CLOCK_BATCH:
+            raise ValueError(f'events must be a list of at most {MAX_CLOCK_BATCH} items')
+        events = []
+        for raw in raw_events:
+            if raw['action'] not in ('in', 'out'):
+                raise ValueError(f"unknown action {raw['action']!r}")
+            moment = parse_datetime(raw['timestamp']) if raw.get('timestamp') else timezone.now()
+            if moment is None:
+                raise ValueError(f"invalid timestamp {raw['timestamp']!r}")
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            events.append((uuid.UUID(str(raw['crew_id'])), raw['action'], moment))
+    except (ValueError, KeyError, TypeError) as e:
+        return JsonResponse({'status': 'error', 'error': str(e)}, status=400)
+
+    if clock_queue.queue_enabled():
+        queued = clock_queue.enqueue_many(events) if events else 0
+        return JsonResponse({'status': 'queued', 'queued': queued}, status=202)
+
+    results = clock.record_events(events) if events else []
+    return JsonResponse({'status': 'success', 'results': results})
 
 
 @login_required
@@ -340,53 +482,80 @@ def leave_view(request):
     })
 
 
-@cache_page(60 * 15)  # Cache for 15 minutes
 @login_required
-def profile_view(request):
-    profile = get_object_or_404(CrewProfile, user=request.user)
-    
-    recent_performance = Performance.objects.filter(
-        crew=profile
-    ).select_related('reviewed_by').order_by('-review_date').first()
-    
-    attendance_list = Attendance.objects.filter(crew=profile).order_by('-date')
-    paginator = Paginator(attendance_list, 10)
-    page = request.GET.get('page')
-    recent_attendance = paginator.get_page(page)
-    
-    active_tasks = Task.objects.filter(
-        crew=profile, status__in=['pending', 'in_progress']
-    ).order_by('deadline')
-    
-    pending_leaves = LeaveRequest.objects.filter(
-        crew=profile, status='pending'
-    ).order_by('start_date')
-    
-    latest_payroll = Payroll.objects.filter(
-        crew=profile
-    ).order_by('-month').first()
-    
-    return render(request, 'crew/portal/profile.html', {
-        'profile': profile,
-        'recent_performance': recent_performance,
-        'recent_attendance': recent_attendance,
-        'active_tasks': active_tasks,
-        'pending_leaves': pending_leaves,
-        'latest_payroll': latest_payroll,
-        'active_view': 'profile'
-    })
+async def profile_view(request):
+    user = await _portal_user(request)
+    try:
+        crew_id = await acrew_id_for_user(user)
+    except CrewProfile.DoesNotExist:
+        raise Http404('No crew profile for this user.')
+    cursor = valid_cursor(request.GET.get('cursor'))
+
+    async def build():
+        profile = await _portal_profile_queryset().aget(user=user)
+
+        attendance_list = Attendance.objects.filter(crew=profile).with_hours()
+        paginator = KeysetPaginator(attendance_list, ('-date', '-id'), 10)
+        active_tasks = Task.objects.filter(
+            crew=profile, status__in=['pending', 'in_progress']
+        ).order_by('deadline')
+        pending_leaves = LeaveRequest.objects.filter(
+            crew=profile, status='pending'
+        ).order_by('start_date')
+
+        async def fetch(queryset):
+            return [obj async for obj in queryset]
+
+        (
+            recent_performance, recent_attendance, active_tasks, pending_leaves, latest_payroll,
+            monthly_summaries,
+        ) = await asyncio.gather(
+            Performance.objects.filter(crew=profile).annotate(
+                reviewer_first_name=F('reviewed_by__first_name'), reviewer_last_name=F('reviewed_by__last_name'),
+            ).order_by('-review_date').afirst(),
+            paginator.aget_page(cursor),
+            fetch(active_tasks),
+            fetch(pending_leaves),
+            Payroll.objects.filter(crew=profile).order_by('-month').afirst(),
+            fetch(AttendanceSummary.objects.filter(crew=profile).order_by('-month')[:PROFILE_SUMMARY_MONTHS]),
+        )
+
+        return {
+            'profile': profile,
+            'recent_performance': recent_performance,
+            'recent_attendance': recent_attendance,
+            'active_tasks': active_tasks,
+            'pending_leaves': pending_leaves,
+            'latest_payroll': latest_payroll,
+            'monthly_summaries': monthly_summaries,
+        }
+
+    context = await aget_fragment(crew_id, crew_cache.PROFILE, build, vary=(cursor,))
+    user.crew_profile = context['profile']
+
+    return render(request, 'crew/portal/profile.html', dict(context, active_view='profile'))
 
 @login_required
-def shift_view(request):
-    
+async def shift_view(request):
+    user = await _portal_user(request)
+    cursor = valid_cursor(request.GET.get('cursor'))
+
+    async def build():
+        # Retrieve shifts associated with this user's CrewProfile
+        shifts = Shift.objects.filter(crew__user=user).with_duration()
+        paginator = KeysetPaginator(shifts, ('-start_time', '-id'), 20)
+        profile, page = await asyncio.gather(
+            _portal_profile_queryset().aget(user=user),
+            paginator.aget_page(cursor),
+        )
+        return {'profile': profile, 'upcoming_shifts': page}
+
     try:
-        profile = request.user.crew_profile
-        # Retrieve shifts associated with this CrewProfile
-        upcoming_shifts = Shift.objects.filter(crew=profile).order_by('-start_time')
+        context = await aget_fragment(
+            await acrew_id_for_user(user), crew_cache.SHIFTS, build, vary=(cursor,)
+        )
+        user.crew_profile = context['profile']
     except CrewProfile.DoesNotExist:
-        upcoming_shifts = None  # If no profile exists, set upcoming_shifts to None
+        context = {'profile': None, 'upcoming_shifts': None}  # If no profile exists, set upcoming_shifts to None
 
-    context = {
-        'upcoming_shifts': upcoming_shifts,
-    }
-    return render(request, 'crew/portal/shifts.html', context)
\ No newline at end of file
+    return render(request, 'crew/portal/shifts.html', dict(context, active_view='shift'))
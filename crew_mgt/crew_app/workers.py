@@ -0,0 +1,28 @@
+"""
+Process pools for CPU-bound work: roster password hashing, attendance
+summary rebuilds and document inspection.
+
+This module is imported by the pool's child processes, so it imports
+nothing from Django at module level.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def init_worker():
+    # Workers started with "spawn" need their own configured Django.
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crew_mgt.settings')
+    django.setup()
+
+
+def process_pool(max_workers=None, django=True, **kwargs):
+    """
+    A ``ProcessPoolExecutor`` whose workers set up Django before their first
+    task. Pass ``django=False`` for tasks that never touch it, such as
+    ``document_inspection``, so the workers stay light.
+    """
+    if django:
+        kwargs['initializer'] = init_worker
+    return ProcessPoolExecutor(max_workers=max_workers, **kwargs)
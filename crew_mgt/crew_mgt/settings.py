@@ -41,12 +41,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'crew_app.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'crew_app.middleware.InactivityTimeoutMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -54,7 +56,8 @@ ROOT_URLCONF = 'crew_mgt.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The Django backend, timing renders for RequestMetricsMiddleware.
+        'BACKEND': 'crew_app.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -118,6 +121,31 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = 'media/'
+
+# Uploads are hashed as they stream in, for the content-addressed document
+# storage (crew_app.documents); large ones are spooled to disk as usual.
+FILE_UPLOAD_HANDLERS = [
+    'crew_app.documents.HashingMemoryFileUploadHandler',
+    'crew_app.documents.HashingTemporaryFileUploadHandler',
+]
+
+# Hand document downloads to the web server, e.g. 'X-Accel-Redirect' with an
+# nginx internal location at DOCUMENT_SENDFILE_PREFIX aliased to MEDIA_ROOT.
+# Unset, Django streams them itself with FileResponse.
+DOCUMENT_SENDFILE_HEADER = None
+DOCUMENT_SENDFILE_PREFIX = '/protected/'
+
+# Document inspection (crew_app.document_jobs, run by process_documents).
+DOCUMENT_MAX_SIZE = 20 * 1024 * 1024
+DOCUMENT_ALLOWED_TYPES = ['application/pdf', 'image/jpeg', 'image/png', 'image/tiff']
+DOCUMENT_MAX_PAGES = 50
+DOCUMENT_THUMBNAIL_SIZE = 256
+DOCUMENT_WORKERS = 2
+DOCUMENT_JOB_TIMEOUT = 300
+DOCUMENT_JOB_ATTEMPTS = 3
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -128,12 +156,68 @@ PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
 ]
 
+# EmailAuthBackend also accepts usernames and serves permissions, so it
+# replaces ModelBackend rather than running after it.
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',  # default
-    'crew_app.backends.EmailAuthBackend',  # add your custom backend
+    'crew_app.backends.EmailAuthBackend',
 ]
 
+# Rehash outdated password hashes at login (see `manage.py password_hashes`).
+PASSWORD_UPGRADE_ON_LOGIN = True
+
 
 AUTH_USER_MODEL = 'crew_app.User'  # Replace with your actual user model
 
-LOGIN_URL = '/crew-login/'
\ No newline at end of file
+LOGIN_URL = '/crew-login/'
+# Payroll run settings
+PAYROLL_STANDARD_MONTHLY_HOURS = 160
+PAYROLL_OVERTIME_MULTIPLIER = '1.5'
+PAYROLL_CHUNK_SIZE = 500
+
+# Clock-ins after this local time count as late in attendance summaries.
+ATTENDANCE_LATE_AFTER = '09:00'
+
+# Clock ingestion: 'sync' writes attendance in the request; 'queue' appends
+# to a local SQLite (WAL) queue drained by `manage.py process_clock_queue`.
+CLOCK_INGESTION = 'sync'
+CLOCK_QUEUE_PATH = BASE_DIR / 'clock_queue.sqlite3'
+
+# Per-crew portal fragments are invalidated by model signals, so every web
+# worker must share one cache. Point this at Redis or Memcached in production.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'crew-portal',
+    },
+    # Sessions live only here, so this cache must be shared by every worker
+    # and must not evict them early: in production, a Redis instance (or
+    # database) of its own rather than the fragment cache.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'crew-sessions',
+        'TIMEOUT': None,
+    },
+}
+
+# Sessions are kept in the cache rather than the database, so page views
+# never write the session table.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Portal inactivity logout (crew_app.middleware.InactivityTimeoutMiddleware).
+# The last-activity timestamp is rewritten at most once per resolution.
+SESSION_INACTIVITY_TIMEOUT = 600
+SESSION_ACTIVITY_RESOLUTION = 60
+SESSION_INACTIVITY_PATHS = ['/portal/']
+# URL names under those paths that machines call, exempt from the timeout.
+SESSION_INACTIVITY_EXEMPT_URLS = ['clock_batch']
+
+# Request metrics (crew_app.middleware.RequestMetricsMiddleware). Views over
+# their query budget are logged; QUERY_BUDGETS overrides it per URL name,
+# e.g. {'admin_dashboard': 5}. /metrics/ serves this process's totals in the
+# Prometheus text format to METRICS_ALLOWED_IPS only, so with several
+# workers, scrape each one on its own port.
+QUERY_BUDGET = 25
+QUERY_BUDGETS = {}
+REQUEST_METRICS_SERVER_TIMING = True
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']